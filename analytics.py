@@ -0,0 +1,248 @@
+"""
+Columnar trend analytics over snapshot history.
+
+Series are held as columns (NumPy arrays when NumPy is installed, stdlib
+array('d') otherwise) and summarized in one pass per statistic: min/max/avg,
+percentiles, rolling average, least-squares slope, EWMA and a single
+mean-shift change point.
+"""
+
+import math
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional; the stdlib path gives the same answers, just slower
+    np = None
+
+# Series readable from any snapshot: name -> reader
+SNAPSHOT_SERIES: Dict[str, Callable[[Dict[str, Any]], Optional[float]]] = {
+    "cpu": lambda s: s.get("cpu_percent"),
+    "memory": lambda s: (s.get("memory") or {}).get("percent_used"),
+    "load": lambda s: (s.get("load_avg") or [None])[0],
+    "iowait": lambda s: s.get("cpu_iowait_percent"),
+}
+
+# Samples covered by the trailing rolling average
+ROLLING_WINDOW = 10
+EWMA_ALPHA = 0.3
+# A change point is reported when a step in the mean leaves at most this
+# fraction of the squared error a straight-line fit leaves, so steady ramps
+# are reported as slope rather than as a change point
+CHANGE_POINT_SSE_RATIO = 0.5
+
+
+def tier_samples(snapshots: Iterable[Dict[str, Any]], tier: str) -> Iterator[Dict[str, Any]]:
+    """Snapshots holding a new collection of one collector tier, stamped with when it was collected.
+
+    Live snapshots merge the latest value of every tier, so a slow tier
+    (processes, disks) repeats until it runs again; each collection is kept
+    once. Snapshots without a collected_at for the tier (stored records,
+    which only hold a tier when it was collected) pass through.
+    """
+    last = None
+    for snapshot in snapshots:
+        if "error" in snapshot:
+            continue
+        collected = (snapshot.get("collected_at") or {}).get(tier)
+        if collected is None:
+            yield snapshot
+        elif collected != last:
+            last = collected
+            yield dict(snapshot, timestamp=collected)
+
+
+def process_rss_reader(process_name: str) -> Callable[[Dict[str, Any]], Optional[float]]:
+    """Total RSS (MB) of processes named process_name in a snapshot's memory ranking."""
+    def read(snapshot):
+        matches = [p["rss_mb"] for p in snapshot.get("top_mem_processes") or [] if p.get("name") == process_name]
+        return sum(matches) if matches else None
+    read.tier = "processes"
+    return read
+
+
+def disk_percent_reader(location: Optional[str] = None) -> Callable[[Dict[str, Any]], Optional[float]]:
+    """percent_used of one mount (or the fullest one) in a snapshot."""
+    def read(snapshot):
+        usage = (snapshot.get("disk_usage") or {}).get("usage") or []
+        if location:
+            usage = [u for u in usage if u.get("location") == location]
+        values = [u["percent_used"] for u in usage if u.get("percent_used") is not None]
+        return max(values) if values else None
+    read.tier = "disks"
+    return read
+
+
+def coverage(snapshots: Iterable[Dict[str, Any]],
+             read: Callable[[Dict[str, Any]], Optional[float]]) -> Optional[Dict[str, Any]]:
+    """How much of a tiered reader's series the snapshots hold.
+
+    `coverage` is the fraction of the tier's collections with a value (a
+    process missing from a top-10 list reads as None), and `max_gap_s` the
+    longest stretch between two values, which the trend bridges as if
+    continuous.
+    """
+    collections = 0
+    present = []
+    for snapshot in tier_samples(snapshots, read.tier):
+        collections += 1
+        if read(snapshot) is not None:
+            present.append(snapshot["timestamp"])
+    if not collections:
+        return None
+    gaps = [b - a for a, b in zip(present, present[1:])]
+    return {"coverage": round(len(present) / collections, 2), "max_gap_s": round(max(gaps)) if gaps else None}
+
+
+def columns(snapshots: Iterable[Dict[str, Any]],
+            readers: Dict[str, Callable[[Dict[str, Any]], Optional[float]]]) -> Dict[str, Tuple[Any, Any]]:
+    """(timestamps, values) columns per series, skipping samples a series lacks.
+
+    A reader with a `tier` attribute reads a slow collector tier; each
+    collection of it counts once, at the time it was collected (see tier_samples).
+    """
+    raw = {name: (array('d'), array('d')) for name in readers}
+    tiers = {name: getattr(read, "tier", None) for name, read in readers.items()}
+    last_collected: Dict[str, float] = {}
+    for snapshot in snapshots:
+        if "error" in snapshot:
+            continue
+        collected_at = snapshot.get("collected_at") or {}
+        for name, read in readers.items():
+            timestamp = snapshot["timestamp"]
+            collected = collected_at.get(tiers[name]) if tiers[name] else None
+            if collected is not None:
+                if last_collected.get(name) == collected:
+                    continue  # the same collection, merged into a later sample
+                last_collected[name] = timestamp = collected
+            value = read(snapshot)
+            if value is not None:
+                raw[name][0].append(timestamp)
+                raw[name][1].append(value)
+    if np is not None:
+        return {name: (np.frombuffer(ts), np.frombuffer(vs)) for name, (ts, vs) in raw.items()}
+    return raw
+
+
+def _percentile(ordered, q: float) -> float:
+    """Linear-interpolated percentile of an already sorted sequence."""
+    pos = (len(ordered) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def _ewma_py(values, alpha: float) -> float:
+    current = values[0]
+    for v in values:
+        current = alpha * v + (1 - alpha) * current
+    return current
+
+
+def _summarize_numpy(ts, vs) -> Dict[str, Any]:
+    n = len(vs)
+    mean = float(vs.mean())
+    p50, p95, p99 = (float(x) for x in np.percentile(vs, [50, 95, 99]))
+    t = ts - ts[0]
+    t_centered = t - t.mean()
+    denom = float((t_centered * t_centered).sum())
+    centered = vs - mean
+    s_tv = float((t_centered * centered).sum())
+    s_vv = float((centered * centered).sum())
+    slope = s_tv / denom if denom > 0 else 0.0
+    # EWMA as a weighted sum: weights alpha*(1-alpha)^(n-1-i), seeded by the first value
+    decay = (1 - EWMA_ALPHA) ** np.arange(n - 1, -1, -1)
+    ewma = float(EWMA_ALPHA * (decay * vs).sum() + (1 - EWMA_ALPHA) ** n * vs[0])
+    cusum = np.cumsum(vs - mean)
+    k = int(np.abs(cusum[:-1]).argmax()) + 1
+    return {
+        "min": float(vs.min()), "max": float(vs.max()), "avg": mean, "std": float(vs.std()),
+        "p50": p50, "p95": p95, "p99": p99,
+        "rolling_avg": float(vs[-ROLLING_WINDOW:].mean()),
+        "slope": slope, "ewma": ewma,
+        "_split": (k, float(vs[:k].mean()), float(vs[k:].mean())),
+        "_sse_linear": s_vv - (s_tv * s_tv / denom if denom > 0 else 0.0), "_s_vv": s_vv
+    }
+
+
+def _summarize_py(ts, vs) -> Dict[str, Any]:
+    n = len(vs)
+    mean = math.fsum(vs) / n
+    ordered = sorted(vs)
+    t0 = ts[0]
+    t_mean = math.fsum(t - t0 for t in ts) / n
+    cov = var_t = var_v = 0.0
+    cusum = best = 0.0
+    k = 1
+    for i in range(n):
+        dt = ts[i] - t0 - t_mean
+        dv = vs[i] - mean
+        cov += dt * dv
+        var_t += dt * dt
+        var_v += dv * dv
+        if i < n - 1:
+            cusum += dv
+            if abs(cusum) > best:
+                best, k = abs(cusum), i + 1
+    tail = vs[-ROLLING_WINDOW:]
+    return {
+        "min": ordered[0], "max": ordered[-1], "avg": mean, "std": math.sqrt(var_v / n),
+        "p50": _percentile(ordered, 50), "p95": _percentile(ordered, 95), "p99": _percentile(ordered, 99),
+        "rolling_avg": math.fsum(tail) / len(tail),
+        "slope": cov / var_t if var_t > 0 else 0.0, "ewma": _ewma_py(vs, EWMA_ALPHA),
+        "_split": (k, math.fsum(vs[:k]) / k, math.fsum(vs[k:]) / (n - k)),
+        "_sse_linear": var_v - (cov * cov / var_t if var_t > 0 else 0.0), "_s_vv": var_v
+    }
+
+
+def summarize(ts, vs) -> Optional[Dict[str, Any]]:
+    """Trend statistics for one (timestamps, values) column; None below 2 samples."""
+    if len(vs) < 2:
+        return None
+    stats = _summarize_numpy(ts, vs) if np is not None else _summarize_py(ts, vs)
+    n = len(vs)
+    k, before, after = stats.pop("_split")
+    sse_linear = stats.pop("_sse_linear")
+    s_vv = stats.pop("_s_vv")
+    current = float(vs[-1])
+    first = float(vs[0])
+    stats.update({
+        "current": current,
+        "change": current - first,
+        "slope_per_hour": stats.pop("slope") * 3600,
+        "trend": "increasing" if current > first else "decreasing" if current < first else "flat",
+        "samples": n,
+    })
+    # Squared error left by a two-level step at k, from the split means
+    mean = stats["avg"]
+    sse_step = s_vv - k * (before - mean) ** 2 - (n - k) * (after - mean) ** 2
+    if s_vv > 0 and sse_step <= CHANGE_POINT_SSE_RATIO * sse_linear:
+        stats["change_point"] = {"timestamp": float(ts[k]), "mean_before": round(before, 3),
+                                 "mean_after": round(after, 3)}
+    return {key: round(v, 3) if isinstance(v, float) else v for key, v in stats.items()}
+
+
+def analyze(snapshots: Iterable[Dict[str, Any]],
+            readers: Dict[str, Callable[[Dict[str, Any]], Optional[float]]]) -> Dict[str, Any]:
+    """summarize() for every series; series with too few samples are omitted."""
+    results = {}
+    for name, (ts, vs) in columns(snapshots, readers).items():
+        stats = summarize(ts, vs)
+        if stats is not None:
+            results[name] = stats
+    return results
+
+
+def analyze_points(points: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """summarize() over rollup points (bucket averages, or raw values)."""
+    ts = array('d', (p["t"] for p in points))
+    vs = array('d', (p.get("avg", p.get("value")) for p in points))
+    if np is not None:
+        ts, vs = np.frombuffer(ts), np.frombuffer(vs)
+    stats = summarize(ts, vs)
+    if stats is not None and points and "max" in points[0]:
+        # Bucket extremes are tighter than extremes of the bucket averages
+        stats["min"] = round(min(p["min"] for p in points), 3)
+        stats["max"] = round(max(p["max"] for p in points), 3)
+    return stats
@@ -0,0 +1,295 @@
+"""
+Collector overhead benchmark.
+
+Times what the daemon does on every sample and what chat turns ask of it:
+- collectors: get_snapshot, top_cpu, top_mem, disk_usage, and persisting a
+  sample (shared ring, time-series store, rollups), under each load condition
+  from cpu_spam.Load (idle processes, busy loops, held memory, held fds,
+  disk writes)
+- history queries: last N, time ranges, rollups and trend analysis over
+  stores pre-filled with synthetic samples, at each history size
+
+Each case reports p50/p99/mean latency and CPU seconds per call; each
+condition and history size also reports this process's RSS, which stands in
+for the daemon's since it holds the same collectors and stores. If a daemon
+is running, its own RSS and CPU use over the run are reported too.
+
+Results are written as JSON; pass an earlier results file as --baseline to
+flag cases whose p50 or p99 regressed by more than --tolerance:
+
+    python bench.py --output before.json
+    python bench.py --baseline before.json --output after.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+from analytics import SNAPSHOT_SERIES, analyze
+from cpu_spam import Load
+from rollups import RollupStore
+from shm_ring import RingWriter
+from sys_tools import disk_usage, get_snapshot, top_cpu, top_mem
+from tsstore import TimeSeriesStore
+
+BYTES_PER_MB = 1024 * 1024
+
+# Load per condition, as cpu_spam.Load arguments; scaled by command-line flags
+CONDITIONS = {
+    "baseline": lambda a: {},
+    "idle_procs": lambda a: {"idle": a.idle_procs},
+    "cpu": lambda a: {"cpu": a.cpu_workers},
+    "memory": lambda a: {"memory_mb": a.memory_mb},
+    "fds": lambda a: {"fds": a.fds},
+    "disk_write": lambda a: {"disk_mb_per_s": a.disk_mb_per_s},
+}
+# Seconds to let a load settle before timing under it
+SETTLE_S = 2.0
+# Spacing of synthetic history samples, like the daemon's default interval
+HISTORY_INTERVAL_S = 10
+# Calls before timing starts (the first scan warms the process registry)
+WARMUP_CALLS = 2
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_REGRESSION_MS = 0.1
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def measure(fn: Callable[[], Any], iterations: int, budget_s: float) -> Dict[str, Any]:
+    """Latency and CPU cost of fn over up to `iterations` calls or `budget_s` seconds (at least 3 calls)."""
+    samples = []
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    while len(samples) < iterations and (len(samples) < 3 or time.perf_counter() - started < budget_s):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    cpu_s = time.process_time() - cpu_started
+    ordered = sorted(samples)
+    return {
+        "calls": len(samples),
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "cpu_s_per_call": round(cpu_s / len(samples), 6),
+    }
+
+
+def rss_mb() -> float:
+    return round(psutil.Process().memory_info().rss / BYTES_PER_MB, 1)
+
+
+class Persistence:
+    """The daemon's per-sample writes, into a scratch directory."""
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.ring = RingWriter(directory / "ring.bin")
+        # Keep everything: synthetic histories span months
+        self.store = TimeSeriesStore(directory / "series", retention_s=float("inf"), max_total_bytes=2 ** 62)
+        self.rollups = RollupStore()
+
+    def append(self, snapshot: Dict[str, Any]) -> None:
+        self.ring.append(snapshot)
+        self.store.append(snapshot)
+        self.rollups.add(snapshot)
+
+    def close(self) -> None:
+        self.store.close()
+        self.ring.close()
+
+
+def bench_collectors(args, scratch: Path) -> Dict[str, Any]:
+    results = {}
+    for name in args.conditions:
+        load = Load(disk_dir=str(scratch), **CONDITIONS[name](args))
+        print(f"[{name}] {load.describe()}", flush=True)
+        with load:
+            time.sleep(SETTLE_S if name != "baseline" else 0)
+            persistence = Persistence(scratch / f"persist-{name}")
+            snapshot = get_snapshot()
+            cases = {
+                "get_snapshot": get_snapshot,
+                "top_cpu": lambda: top_cpu(10),
+                "top_mem": lambda: top_mem(10),
+                "disk_usage": disk_usage,
+                "persist": lambda: persistence.append(dict(snapshot, timestamp=time.time())),
+            }
+            for fn in cases.values():
+                for _ in range(WARMUP_CALLS):
+                    fn()
+            condition = {case: measure(fn, args.iterations, args.budget_s) for case, fn in cases.items()}
+            condition["process_count"] = len(psutil.pids())
+            condition["rss_mb"] = rss_mb()
+            persistence.close()
+        results[name] = condition
+        _print_cases(condition)
+    return results
+
+
+def _synthetic(base: Dict[str, Any], i: int, timestamp: float) -> Dict[str, Any]:
+    """The base snapshot with a slow wave through the headline metrics."""
+    wave = (i % 360) / 360
+    memory = dict(base.get("memory") or {}, percent_used=40 + 20 * wave)
+    return dict(base, timestamp=timestamp, cpu_percent=10 + 60 * wave, cpu_iowait_percent=wave * 5,
+                memory=memory, load_avg=[1 + wave, 1.0, 1.0])
+
+
+def bench_history(args, scratch: Path) -> Dict[str, Any]:
+    base = get_snapshot()
+    results = {}
+    for size in args.history_sizes:
+        directory = scratch / f"history-{size}"
+        persistence = Persistence(directory)
+        end = time.time()
+        start = end - size * HISTORY_INTERVAL_S
+        print(f"[history {size}] filling store", flush=True)
+        build_started = time.perf_counter()
+        for i in range(size):
+            persistence.append(_synthetic(base, i, start + i * HISTORY_INTERVAL_S))
+        build_s = time.perf_counter() - build_started
+
+        store, rollups = persistence.store, persistence.rollups
+        cases = {
+            "last_100": lambda: store.last(100),
+            "range_1h": lambda: store.range(end - 3600),
+            "range_24h": lambda: store.range(end - 86400),
+            "rollups_24h": lambda: rollups.query("cpu_percent", end - 86400, end),
+            "rollups_30d": lambda: rollups.query("cpu_percent", end - 30 * 86400, end),
+            "analyze_24h": lambda: analyze(store.iter_range(end - 86400), SNAPSHOT_SERIES),
+        }
+        history = {case: measure(fn, args.iterations, args.budget_s) for case, fn in cases.items()}
+        history["append_us_per_sample"] = round(build_s / max(size, 1) * 1e6, 1)
+        history["rss_mb"] = rss_mb()
+        persistence.close()
+        shutil.rmtree(directory, ignore_errors=True)
+        results[str(size)] = history
+        _print_cases(history)
+    return results
+
+
+def _print_cases(group: Dict[str, Any]) -> None:
+    for case, stats in group.items():
+        if isinstance(stats, dict):
+            print(f"  {case:>14}: p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+                  f"cpu {stats['cpu_s_per_call'] * 1000:8.3f} ms/call  ({stats['calls']} calls)")
+        else:
+            print(f"  {case:>14}: {stats}")
+
+
+def _running_daemon() -> Optional[psutil.Process]:
+    from daemon import get_pid_file, is_daemon_running
+    if not is_daemon_running():
+        return None
+    try:
+        return psutil.Process(int(get_pid_file().read_text().strip()))
+    except (OSError, ValueError, psutil.Error):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Cases whose p50 or p99 grew by more than tolerance (a fraction) and MIN_REGRESSION_MS over the baseline."""
+    regressions = []
+    for section in ("collectors", "history"):
+        for group, cases in (results.get(section) or {}).items():
+            before_group = (baseline.get(section) or {}).get(group) or {}
+            for case, stats in cases.items():
+                before = before_group.get(case)
+                if not isinstance(stats, dict) or not isinstance(before, dict):
+                    continue
+                for metric in ("p50_ms", "p99_ms"):
+                    if (stats[metric] > before[metric] * (1 + tolerance)
+                            and stats[metric] - before[metric] >= MIN_REGRESSION_MS):
+                        regressions.append(f"{section}/{group}/{case} {metric}: {before[metric]:.3f} -> "
+                                           f"{stats[metric]:.3f} ({stats[metric] / before[metric]:.2f}x)")
+    return regressions
+
+
+def _sizes(text: str) -> List[int]:
+    return [int(float(s)) for s in text.split(",") if s]
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark sysdoctor collector and history query overhead")
+    parser.add_argument("--conditions", default=",".join(CONDITIONS),
+                        help=f"Load conditions to run, comma separated (default: all of {', '.join(CONDITIONS)})")
+    parser.add_argument("--history-sizes", type=_sizes, default=[100, 10000, 1000000],
+                        help="Samples per synthetic history, comma separated; 1e6 takes a minute or two and ~500MB of scratch")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per case")
+    parser.add_argument("--budget-s", type=float, default=10.0, help="Stop a case after this long (at least 3 calls)")
+    parser.add_argument("--idle-procs", type=int, default=2000)
+    parser.add_argument("--cpu-workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--memory-mb", type=int, default=1024)
+    parser.add_argument("--fds", type=int, default=10000)
+    parser.add_argument("--disk-mb-per-s", type=float, default=50)
+    parser.add_argument("--output", default="bench-results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50/p99 growth over the baseline")
+    args = parser.parse_args(argv)
+    args.conditions = [c for c in args.conditions.split(",") if c]
+    unknown = set(args.conditions) - set(CONDITIONS)
+    if unknown:
+        parser.error(f"unknown conditions: {', '.join(sorted(unknown))}")
+
+    daemon = _running_daemon()
+    daemon_cpu = sum(daemon.cpu_times()[:2]) if daemon else None
+    started = time.time()
+    scratch = Path(tempfile.mkdtemp(prefix="sysdoctor-bench-"))
+    try:
+        results = {
+            "meta": {
+                "started_at": started, "hostname": socket.gethostname(), "platform": platform.platform(),
+                "python": platform.python_version(), "cpus": os.cpu_count(),
+                "memory_gb": round(psutil.virtual_memory().total / 1024 ** 3, 1),
+                "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+            },
+            "collectors": bench_collectors(args, scratch),
+            "history": bench_history(args, scratch) if args.history_sizes else {},
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if daemon is not None:
+        try:
+            elapsed = time.time() - started
+            results["running_daemon"] = {
+                "pid": daemon.pid,
+                "rss_mb": round(daemon.memory_info().rss / BYTES_PER_MB, 1),
+                "cpu_percent": round((sum(daemon.cpu_times()[:2]) - daemon_cpu) / elapsed * 100, 2),
+            }
+        except psutil.Error:
+            pass
+    results["meta"]["duration_s"] = round(time.time() - started, 1)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.tolerance:.0%} of {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Tiered collectors with independent cadences for the daemon.
+
+Each metric family is registered with its own interval (optionally a faster
+one while the scheduler is in high-rate mode) and a cost budget. On every
+tick only the collectors that are due run. The live view (the in-memory
+store and the shared ring) is the merge of the latest value from every tier,
+with each tier's collection time; the on-disk history holds only the tiers
+collected that tick, so a slow tier is not stored again under a new
+timestamp. A collector that keeps overrunning its budget is backed off to a
+longer interval until it gets cheap again.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from scheduler import HIGH
+
+# A backed-off collector never runs less often than this multiple of its interval
+MAX_BACKOFF = 8
+
+
+class Collector:
+    """One metric family: what to call, how often, and what it may cost."""
+
+    def __init__(self, name: str, collect: Callable[[], Dict[str, Any]], interval_s: float,
+                 high_interval_s: Optional[float] = None, budget_s: float = 0.5):
+        self.name = name
+        self.collect = collect
+        self.interval_s = interval_s
+        self.high_interval_s = interval_s if high_interval_s is None else high_interval_s
+        self.budget_s = budget_s
+
+        self.backoff = 1
+        self.value: Optional[Dict[str, Any]] = None
+        self.collected_at: Optional[float] = None
+        self._last_run: Optional[float] = None
+        self.last_duration_s = 0.0
+
+    def due(self, now: float, mode: str) -> bool:
+        if self._last_run is None:
+            return True
+        interval = self.high_interval_s if mode == HIGH else self.interval_s
+        return now - self._last_run >= interval * self.backoff
+
+    def run(self, now: float) -> None:
+        self._last_run = now
+        started = time.perf_counter()
+        try:
+            value = self.collect()
+        finally:
+            self.last_duration_s = time.perf_counter() - started
+            self._adjust_backoff()
+        self.value = value
+        self.collected_at = time.time()
+
+    def _adjust_backoff(self) -> None:
+        if self.last_duration_s > self.budget_s and self.backoff < MAX_BACKOFF:
+            self.backoff *= 2
+            logging.info(f"Collector {self.name}: {self.last_duration_s:.3f}s over {self.budget_s}s budget, "
+                         f"backing off to {self.backoff}x interval")
+        elif self.last_duration_s < self.budget_s / 2 and self.backoff > 1:
+            self.backoff //= 2
+
+
+class CollectorSet:
+    """Runs due collectors each tick and merges the latest value of every tier."""
+
+    def __init__(self):
+        self._collectors: List[Collector] = []
+
+    def register(self, name: str, collect: Callable[[], Dict[str, Any]], interval_s: float,
+                 high_interval_s: Optional[float] = None, budget_s: float = 0.5) -> Collector:
+        collector = Collector(name, collect, interval_s, high_interval_s, budget_s)
+        self._collectors.append(collector)
+        return collector
+
+    def get(self, name: str) -> Optional[Collector]:
+        return next((c for c in self._collectors if c.name == name), None)
+
+    def run_due(self, mode: str, now: Optional[float] = None) -> List[str]:
+        """Run every collector that is due; returns the names that ran."""
+        now = time.monotonic() if now is None else now
+        ran = []
+        for collector in self._collectors:
+            if not collector.due(now, mode):
+                continue
+            try:
+                collector.run(now)
+                ran.append(collector.name)
+            except Exception as e:
+                # Keep the tier's previous value; the others still merge
+                logging.error(f"Collector {collector.name} failed: {e}")
+        return ran
+
+    def merged(self, tiers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Latest value from every tier (or only the named ones), plus when each was collected."""
+        snapshot: Dict[str, Any] = {"collected_at": {}}
+        for collector in self._collectors:
+            if collector.value is not None and (tiers is None or collector.name in tiers):
+                snapshot.update(collector.value)
+                snapshot["collected_at"][collector.name] = collector.collected_at
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-collector cost and cadence, for diagnostics."""
+        return {c.name: {"interval_s": c.interval_s, "high_interval_s": c.high_interval_s,
+                         "backoff": c.backoff, "last_duration_s": round(c.last_duration_s, 4),
+                         "budget_s": c.budget_s}
+                for c in self._collectors}
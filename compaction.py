@@ -0,0 +1,205 @@
+"""
+Compaction of tool results before they are sent to the model.
+
+Raw results are JSON with 15-digit floats, every key repeated per record and
+histories of up to a hundred samples. compact_tool_result() turns one into a
+much smaller JSON string:
+- floats are rounded to three significant digits (whole numbers from 100 up,
+  whole seconds for timestamps)
+- lists of records become {"columns": [...], "rows": [[...], ...]}
+- timestamped series longer than SERIES_MAX_ROWS become per-column stats,
+  the rows that stand out, and the first and last few rows
+- the result is held to a per-tool token budget, shrinking tables further
+  and finally dropping trailing rows, list items and whole fields (largest
+  first) until it fits, with counts of what was left out; the output is
+  always complete JSON
+"""
+
+import json
+import math
+from typing import Any, Dict, List, Optional
+
+from analytics import columns, summarize
+
+# Rough size of one token in characters of JSON
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 1500
+TOOL_TOKEN_BUDGETS = {
+    "get_snapshot_history": 1200,
+    "analyze_trends": 1200,
+    "find_process_history": 1500,
+}
+
+# Series longer than this are summarized instead of listed
+SERIES_MAX_ROWS = 30
+# Rows kept verbatim from each end of a summarized series
+SERIES_EDGE_ROWS = 3
+# Rows flagged as anomalies: at least this many standard deviations out
+ANOMALY_Z = 3.0
+MAX_ANOMALIES = 5
+# Summary statistics kept per column
+SERIES_STATS = ("min", "avg", "max", "p95", "current", "slope_per_hour", "trend", "change_point")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _round(value: float) -> Any:
+    if not math.isfinite(value):
+        return None
+    if abs(value) >= 100:  # includes epoch timestamps
+        return int(round(value))
+    return float(f"{value:.3g}")
+
+
+def _is_records(value: Any) -> bool:
+    return isinstance(value, list) and len(value) >= 2 and all(isinstance(v, dict) for v in value)
+
+
+def _numeric(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _table(records: List[Dict[str, Any]], max_rows: Optional[int],
+           series_max_rows: int = SERIES_MAX_ROWS) -> Dict[str, Any]:
+    """Column-major header plus positional rows; ranked lists keep their first rows."""
+    names: List[str] = []
+    for record in records:
+        names.extend(k for k in record if k not in names)
+    kept = records if max_rows is None else records[:max_rows]
+    table = {"columns": names, "rows": [[_compact(r.get(k), max_rows, series_max_rows) for k in names] for r in kept]}
+    if len(kept) < len(records):
+        table["omitted_rows"] = len(records) - len(kept)
+    return table
+
+
+def _anomalies(records: List[Dict[str, Any]], names: List[str]) -> List[Dict[str, Any]]:
+    """Rows furthest from their column's mean, if any is ANOMALY_Z deviations out."""
+    scored = []
+    for name in names:
+        values = [r[name] for r in records if _numeric(r.get(name))]
+        if len(values) < 3:
+            continue
+        mean = math.fsum(values) / len(values)
+        std = math.sqrt(math.fsum((v - mean) ** 2 for v in values) / len(values))
+        if std == 0:
+            continue
+        for i, record in enumerate(records):
+            value = record.get(name)
+            if _numeric(value) and abs(value - mean) / std >= ANOMALY_Z:
+                scored.append((abs(value - mean) / std, i, name))
+    scored.sort(reverse=True)
+    flagged = {}
+    for z, i, name in scored:
+        if i not in flagged and len(flagged) < MAX_ANOMALIES:
+            flagged[i] = {"row": i, "column": name, "z": _round(z)}
+    return [dict(anomaly, timestamp=_round(records[i]["timestamp"]), value=_compact(records[i][anomaly["column"]], None))
+            for i, anomaly in sorted(flagged.items())]
+
+
+def _series_summary(records: List[Dict[str, Any]], max_rows: Optional[int]) -> Dict[str, Any]:
+    """Per-column trend stats, anomalies and edge rows of a long timestamped series."""
+    names = [k for k in records[0] if k != "timestamp" and _numeric(records[0].get(k))]
+    readers = {name: (lambda r, name=name: r.get(name) if _numeric(r.get(name)) else None) for name in names}
+    stats = {}
+    for name, (ts, vs) in columns(records, readers).items():
+        summary = summarize(ts, vs)
+        if summary is not None:
+            stats[name] = {k: summary[k] for k in SERIES_STATS if k in summary}
+    edge = SERIES_EDGE_ROWS if max_rows is None else min(SERIES_EDGE_ROWS, max(max_rows // 2, 1))
+    return {
+        "samples": len(records),
+        "from": _round(records[0]["timestamp"]),
+        "to": _round(records[-1]["timestamp"]),
+        "stats": _compact(stats, max_rows),
+        "anomalies": _anomalies(records, names),
+        "first": _table(records[:edge], None) if edge > 1 else _compact(records[0], None),
+        "last": _table(records[-edge:], None) if edge > 1 else _compact(records[-1], None),
+    }
+
+
+def _compact(value: Any, max_rows: Optional[int], series_max_rows: int = SERIES_MAX_ROWS) -> Any:
+    if isinstance(value, float):
+        return _round(value)
+    if isinstance(value, dict):
+        return {k: _compact(v, max_rows, series_max_rows) for k, v in value.items()}
+    if _is_records(value):
+        if len(value) > series_max_rows and all(_numeric(r.get("timestamp")) for r in value):
+            return _series_summary(value, max_rows)
+        return _table(value, max_rows, series_max_rows)
+    if isinstance(value, list):
+        return [_compact(v, max_rows, series_max_rows) for v in value]
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _largest(value: Any) -> Optional[tuple]:
+    """(container, owner) of the largest non-empty list inside value, or failing that the largest dict."""
+    best_list = best_dict = None
+    stack = [(value, None)]
+    while stack:
+        current, owner = stack.pop()
+        if isinstance(current, dict):
+            if current:
+                size = len(_dumps(current))
+                if best_dict is None or size > best_dict[0]:
+                    best_dict = (size, current, owner)
+            stack.extend((v, current) for v in current.values())
+        elif isinstance(current, list):
+            # A table's column names stay; only its rows are dropped
+            if current and not (owner is not None and owner.get("columns") is current):
+                size = len(_dumps(current))
+                if best_list is None or size > best_list[0]:
+                    best_list = (size, current, owner)
+            stack.extend((v, None) for v in current)
+    best = best_list or best_dict
+    return best[1:] if best else None
+
+
+def _fit(value: Any, limit_chars: int) -> Dict[str, Any]:
+    """Drop trailing rows and list items, then whole fields, largest first, until value fits."""
+    result = value if isinstance(value, dict) else {"items": value}
+    omitted_items = 0
+    omitted_fields: List[str] = []
+    while len(_dumps(result)) > limit_chars:
+        found = _largest(result)
+        if found is None:
+            break
+        container, owner = found
+        if isinstance(container, list):
+            container.pop()
+            if owner is not None and owner.get("rows") is container:
+                owner["omitted_rows"] = owner.get("omitted_rows", 0) + 1
+            else:
+                omitted_items += 1
+        else:
+            # A whole series, table or nested object
+            key = max(container, key=lambda k: len(_dumps(container[k])))
+            del container[key]
+            omitted_fields.append(key)
+    result["truncated"] = True
+    if omitted_items:
+        result["omitted_items"] = omitted_items
+    if omitted_fields:
+        more = len(omitted_fields) - 5
+        result["omitted_fields"] = omitted_fields[:5] + ([f"+{more} more"] if more > 0 else [])
+    return result
+
+
+def compact_tool_result(tool_name: str, result: Any, budget_tokens: Optional[int] = None) -> str:
+    """JSON for one tool result, compacted to fit the tool's token budget."""
+    budget_tokens = budget_tokens or TOOL_TOKEN_BUDGETS.get(tool_name, DEFAULT_TOKEN_BUDGET)
+    compacted = None
+    # Progressively smaller encodings: full tables, then fewer rows per table
+    # with shorter series summarized too
+    for max_rows, series_max_rows in ((None, SERIES_MAX_ROWS), (20, 20), (10, 10), (5, 5)):
+        compacted = _compact(result, max_rows, series_max_rows)
+        text = _dumps(compacted)
+        if estimate_tokens(text) <= budget_tokens:
+            return text
+    # Leave room for the omission counts added at the end
+    return _dumps(_fit(compacted, budget_tokens * CHARS_PER_TOKEN - 120))
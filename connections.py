@@ -0,0 +1,247 @@
+"""
+Socket table summary streamed from /proc/net.
+
+psutil.net_connections() resolves the owning pid of every socket by reading
+every fd of every process, which takes seconds on hosts with 100k+ sockets.
+Here /proc/net/tcp, tcp6, udp and udp6 are read line by line instead, and
+counted by state, local port and remote peer in one pass:
+- addresses stay in their raw hex form while counting and are decoded only
+  for the groups that get reported
+- port and peer groups are held to MAX_GROUPS each; past that the smallest
+  are pruned, so counts for the reported groups are lower bounds
+- only the top groups are attributed to processes, from a few sample socket
+  inodes each, by an fd walk that stops once every sample is found
+Where /proc/net is missing, psutil.net_connections() feeds the same counters.
+"""
+
+import logging
+import os
+import socket
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import psutil
+
+PROC_NET_FILES = (("tcp", "/proc/net/tcp"), ("tcp6", "/proc/net/tcp6"),
+                  ("udp", "/proc/net/udp"), ("udp6", "/proc/net/udp6"))
+
+# Kernel state codes (include/net/tcp_states.h)
+TCP_STATES = {
+    "01": "ESTABLISHED", "02": "SYN_SENT", "03": "SYN_RECV", "04": "FIN_WAIT1", "05": "FIN_WAIT2",
+    "06": "TIME_WAIT", "07": "CLOSE", "08": "CLOSE_WAIT", "09": "LAST_ACK", "0A": "LISTEN",
+    "0B": "CLOSING", "0C": "NEW_SYN_RECV",
+}
+# UDP sockets only use two codes; the others never appear
+UDP_STATES = {"01": "ESTABLISHED", "07": "UNCONN"}
+
+# Distinct local ports / remote peers counted before the smallest are pruned
+MAX_GROUPS = 4096
+# Socket inodes kept per group for attributing it to processes
+SAMPLE_INODES = 8
+# Time the fd walk for attribution may take
+ATTRIBUTION_BUDGET_S = 0.5
+# Listening sockets reported (and attributed) per summary
+MAX_LISTENERS = 200
+
+
+class _GroupCounter:
+    """Counts per key, held to max_groups keys by pruning the smaller half.
+
+    Counts are exact until the first prune; after that they are lower
+    bounds, each missing at most `max_pruned` hits per prune it lived through.
+    Up to SAMPLE_INODES socket inodes are kept per key for attribution.
+    """
+
+    def __init__(self, max_groups: int = MAX_GROUPS):
+        self.max_groups = max_groups
+        self.counts: Dict[Any, int] = {}
+        self.inodes: Dict[Any, List[str]] = {}
+        self.max_pruned = 0
+
+    def add(self, key: Any, inode: str) -> None:
+        count = self.counts.get(key)
+        if count is None:
+            if len(self.counts) >= self.max_groups:
+                self._prune()
+            self.counts[key] = 1
+            self.inodes[key] = [inode] if inode != "0" else []
+            return
+        self.counts[key] = count + 1
+        samples = self.inodes[key]
+        if len(samples) < SAMPLE_INODES and inode != "0":  # TIME_WAIT sockets have no inode
+            samples.append(inode)
+
+    def _prune(self) -> None:
+        ordered = sorted(self.counts.values())
+        cutoff = ordered[len(ordered) // 2]
+        self.max_pruned = max(self.max_pruned, cutoff)
+        for key in [k for k, c in self.counts.items() if c <= cutoff]:
+            del self.counts[key]
+            del self.inodes[key]
+
+    def top(self, n: int) -> List[Tuple[Any, int]]:
+        return Counter(self.counts).most_common(n)
+
+
+def _decode_ip(hex_ip: str) -> str:
+    """Kernel hex address (32-bit words in host order) to text form."""
+    raw = bytes.fromhex(hex_ip)
+    if len(raw) == 4:
+        return socket.inet_ntop(socket.AF_INET, raw[::-1])
+    words = b"".join(raw[i:i + 4][::-1] for i in range(0, 16, 4))
+    ip = socket.inet_ntop(socket.AF_INET6, words)
+    return ip[7:] if ip.startswith("::ffff:") and "." in ip else ip
+
+
+Socket = Tuple[str, str, str, str, str, str, str]
+
+
+def _proc_net_sockets() -> Iterator[Socket]:
+    """(proto, state, local ip, local port, remote ip, remote port, inode), addresses in kernel hex."""
+    for proto, path in PROC_NET_FILES:
+        states = TCP_STATES if proto.startswith("tcp") else UDP_STATES
+        try:
+            with open(path) as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 10:
+                        continue
+                    local_ip, _, local_port = fields[1].partition(":")
+                    remote_ip, _, remote_port = fields[2].partition(":")
+                    state = states.get(fields[3], fields[3])
+                    if remote_port == "0000":
+                        remote_ip = ""  # unconnected
+                    yield proto, state, local_ip, local_port, remote_ip, remote_port, fields[9]
+        except FileNotFoundError:
+            continue  # e.g. IPv6 disabled
+
+
+def _psutil_sockets() -> Iterator[Socket]:
+    """Same tuples from psutil where /proc/net is unavailable; ips are already text."""
+    for conn in psutil.net_connections(kind="inet"):
+        proto = ("tcp" if conn.type == socket.SOCK_STREAM else "udp") + ("6" if conn.family == socket.AF_INET6 else "")
+        state = conn.status if conn.status != psutil.CONN_NONE else "UNCONN"
+        local = conn.laddr or ("", 0)
+        remote = conn.raddr or ("", 0)
+        # No inodes here; the pid stands in for the sample so attribution is free
+        yield (proto, state, local[0], f"{local[1]:04X}", remote[0], f"{remote[1]:04X}",
+               f"pid:{conn.pid}" if conn.pid else "")
+
+
+def socket_owners(inodes: Set[str], budget_s: float = ATTRIBUTION_BUDGET_S) -> Tuple[Dict[str, int], bool]:
+    """Map socket inodes to owning pids by walking /proc/<pid>/fd.
+
+    Stops as soon as every inode is found or the budget runs out; returns
+    ({inode: pid}, complete). Processes we may not inspect are skipped.
+    """
+    owners: Dict[str, int] = {}
+    wanted = {f"socket:[{inode}]": inode for inode in inodes if inode and not inode.startswith("pid:")}
+    owners.update({inode: int(inode[4:]) for inode in inodes if inode.startswith("pid:")})
+    if not wanted:
+        return owners, True
+    deadline = time.monotonic() + budget_s
+    try:
+        pids = [entry.name for entry in os.scandir("/proc") if entry.name.isdigit()]
+    except OSError:
+        return owners, False
+    for pid in pids:
+        if time.monotonic() > deadline:
+            return owners, False
+        try:
+            for fd in os.scandir(f"/proc/{pid}/fd"):
+                if time.monotonic() > deadline:
+                    return owners, False  # one process can hold 100k+ fds
+                target = wanted.pop(os.readlink(fd.path), None)
+                if target is not None:
+                    owners[target] = int(pid)
+                    if not wanted:
+                        return owners, True
+        except OSError:
+            continue  # exited, or not ours to read
+    return owners, not wanted
+
+
+def _process_name(pid: int) -> Optional[str]:
+    try:
+        return psutil.Process(pid).name()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+def summarize_connections(limit: int = 0, states: Optional[List[str]] = None, top_n: int = 5) -> Dict[str, Any]:
+    """Counts by protocol, state, local port and remote peer in one pass.
+
+    `states` (e.g. ["ESTABLISHED", "TIME_WAIT"]) filters which sockets are
+    counted; `limit` is how many individual sockets to return as samples.
+    The top_n ports, top_n peers and every listener (up to MAX_LISTENERS)
+    are attributed to processes.
+    """
+    wanted_states = {s.upper() for s in states} if states else None
+    use_proc = os.path.exists(PROC_NET_FILES[0][1])
+    started = time.perf_counter()
+
+    total = 0
+    by_proto: Counter = Counter()
+    by_state: Counter = Counter()
+    ports = _GroupCounter()
+    peers = _GroupCounter()
+    listeners: Dict[Tuple[str, str, str], str] = {}
+    samples = []
+    sockets = _proc_net_sockets() if use_proc else _psutil_sockets()
+    for proto, state, local_ip, local_port, remote_ip, remote_port, inode in sockets:
+        if wanted_states is not None and state not in wanted_states:
+            continue
+        total += 1
+        by_proto[proto] += 1
+        by_state[state] += 1
+        if state == "LISTEN" or (state == "UNCONN" and not remote_ip):
+            if len(listeners) < MAX_LISTENERS and inode != "0":
+                listeners.setdefault((proto, local_ip, local_port), inode)
+            continue  # a listener's local port is not a traffic group
+        ports.add(local_port, inode)
+        if remote_ip:
+            peers.add(remote_ip, inode)
+        if len(samples) < limit:
+            samples.append((proto, state, local_ip, local_port, remote_ip, remote_port))
+
+    decode = _decode_ip if use_proc else (lambda ip: ip)
+    top_ports = ports.top(top_n)
+    top_peers = peers.top(top_n)
+    inodes = {i for key, _ in top_ports for i in ports.inodes[key]}
+    inodes |= {i for key, _ in top_peers for i in peers.inodes[key]}
+    inodes |= {i for i in listeners.values() if i}
+    owners, complete = socket_owners(inodes)
+    names: Dict[int, Optional[str]] = {}
+
+    def processes(sample_inodes: List[str]) -> List[Dict[str, Any]]:
+        pids = Counter(owners[i] for i in sample_inodes if i in owners)
+        for pid in pids:
+            if pid not in names:
+                names[pid] = _process_name(pid)
+        return [{"pid": pid, "name": names[pid]} for pid, _ in pids.most_common(3)]
+
+    result = {
+        "source": "proc" if use_proc else "psutil",
+        "total": total,
+        "by_protocol": dict(by_proto),
+        "by_state": dict(by_state.most_common()),
+        "listeners": sorted(({"protocol": proto, "address": decode(ip), "port": int(port, 16),
+                              "processes": processes([inode])}
+                             for (proto, ip, port), inode in listeners.items()), key=lambda x: x["port"]),
+        "top_local_ports": [{"port": int(port, 16), "count": count, "processes": processes(ports.inodes[port])}
+                            for port, count in top_ports],
+        "top_remote_peers": [{"address": decode(ip), "count": count, "processes": processes(peers.inodes[ip])}
+                             for ip, count in top_peers],
+        "samples": [{"protocol": proto, "state": state, "local": f"{decode(lip)}:{int(lport, 16)}",
+                     "remote": f"{decode(rip)}:{int(rport, 16)}" if rip else None}
+                    for proto, state, lip, lport, rip, rport in samples],
+    }
+    if ports.max_pruned or peers.max_pruned:
+        result["approximate"] = True  # some group counts are lower bounds
+    if not complete:
+        result["attribution_partial"] = True  # out of time, or owners we may not inspect
+    logging.debug(f"summarize_connections: {total} sockets in {time.perf_counter() - started:.3f}s "
+                  f"({result['source']}), {len(owners)}/{len(inodes)} sample sockets attributed")
+    return result
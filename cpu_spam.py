@@ -1,25 +1,168 @@
+"""
+Synthetic load generator for exercising sysdoctor and benchmarking the daemon.
+
+Each kind of load runs in its own child processes:
+- cpu: busy-loop workers
+- memory: one process holding (and touching) N MB
+- fds: one process holding N open descriptors
+- disk: one process writing and fsyncing at N MB/s to a scratch file
+- idle: N sleeping processes, to grow the process table
+
+With no arguments it spins one busy loop per core for 300 seconds. The Load
+class is what bench.py uses to set up each condition.
+"""
+
+import argparse
 import multiprocessing
+import os
+import tempfile
 import time
+from typing import List, Optional
+
+BYTES_PER_MB = 1024 * 1024
+# The disk writer wraps its scratch file at this size
+DISK_FILE_MAX_MB = 256
+PAGE_SIZE = 4096
+
 
 def cpu_spam():
     while True:
         pass  # Busy loop
 
-if __name__ == "__main__":
-    duration = 300  # seconds
-    print(f"Spamming CPU for {duration} seconds. Press Ctrl+C to stop early.")
-    procs = []
-    for _ in range(multiprocessing.cpu_count()):
-        p = multiprocessing.Process(target=cpu_spam)
+
+def _sleep_forever():
+    while True:
+        time.sleep(3600)
+
+
+def _hold_memory(mb: int):
+    block = bytearray(mb * BYTES_PER_MB)
+    for i in range(0, len(block), PAGE_SIZE):
+        block[i] = 1  # touch every page so it counts toward RSS
+    _sleep_forever()
+
+
+def _hold_fds(count: int):
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = count + 64
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+    except (ImportError, ValueError, OSError):
+        pass  # hold as many as the limit allows
+    held = []
+    try:
+        for _ in range(count):
+            held.append(os.open(os.devnull, os.O_RDONLY))
+    except OSError as e:
+        print(f"fd load: stopped at {len(held)} fds ({e})")
+    _sleep_forever()
+
+
+def _write_disk(mb_per_s: float, path: str):
+    chunk = os.urandom(BYTES_PER_MB)
+    with open(path, "wb") as f:
+        written = 0
+        started = time.monotonic()
+        while True:
+            f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+            written += 1
+            if written % DISK_FILE_MAX_MB == 0:
+                f.seek(0)
+            # Throttle to the requested rate
+            ahead = written / mb_per_s - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+class Load:
+    """A set of load processes; start() launches them, stop() ends them and cleans up."""
+
+    def __init__(self, cpu: int = 0, memory_mb: int = 0, fds: int = 0, disk_mb_per_s: float = 0,
+                 idle: int = 0, disk_dir: Optional[str] = None):
+        self.cpu = cpu
+        self.memory_mb = memory_mb
+        self.fds = fds
+        self.disk_mb_per_s = disk_mb_per_s
+        self.idle = idle
+        self.disk_dir = disk_dir
+        self._procs: List[multiprocessing.Process] = []
+        self._disk_file: Optional[str] = None
+
+    def _spawn(self, target, *args) -> None:
+        p = multiprocessing.Process(target=target, args=args, daemon=True)
         p.start()
-        procs.append(p)
+        self._procs.append(p)
+
+    def start(self) -> "Load":
+        for _ in range(self.cpu):
+            self._spawn(cpu_spam)
+        if self.memory_mb:
+            self._spawn(_hold_memory, self.memory_mb)
+        if self.fds:
+            self._spawn(_hold_fds, self.fds)
+        if self.disk_mb_per_s:
+            fd, self._disk_file = tempfile.mkstemp(prefix="cpu_spam-", dir=self.disk_dir)
+            os.close(fd)
+            self._spawn(_write_disk, self.disk_mb_per_s, self._disk_file)
+        for _ in range(self.idle):
+            self._spawn(_sleep_forever)
+        return self
+
+    def stop(self) -> None:
+        for p in self._procs:
+            p.terminate()
+        for p in self._procs:
+            p.join()
+        self._procs = []
+        if self._disk_file:
+            try:
+                os.unlink(self._disk_file)
+            except OSError:
+                pass
+            self._disk_file = None
+
+    def describe(self) -> str:
+        parts = [f"{self.cpu} busy loops" if self.cpu else "",
+                 f"{self.memory_mb}MB held" if self.memory_mb else "",
+                 f"{self.fds} fds held" if self.fds else "",
+                 f"{self.disk_mb_per_s:g}MB/s disk writes" if self.disk_mb_per_s else "",
+                 f"{self.idle} idle processes" if self.idle else ""]
+        return ", ".join(p for p in parts if p) or "no load"
+
+    def __enter__(self) -> "Load":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic CPU, memory, fd, disk and process-table load")
+    parser.add_argument("--duration", type=float, default=300, help="Seconds to run")
+    parser.add_argument("--cpu", type=int, default=multiprocessing.cpu_count(), help="Busy-loop processes")
+    parser.add_argument("--memory-mb", type=int, default=0, help="MB of memory to hold")
+    parser.add_argument("--fds", type=int, default=0, help="File descriptors to hold open")
+    parser.add_argument("--disk-mb-per-s", type=float, default=0, help="Disk write rate (fsynced)")
+    parser.add_argument("--disk-dir", help="Directory for the disk writer's scratch file (default: temp dir)")
+    parser.add_argument("--idle", type=int, default=0, help="Idle processes to spawn")
+    args = parser.parse_args(argv)
+
+    load = Load(cpu=args.cpu, memory_mb=args.memory_mb, fds=args.fds, disk_mb_per_s=args.disk_mb_per_s,
+                idle=args.idle, disk_dir=args.disk_dir)
+    print(f"Generating load for {args.duration:g} seconds ({load.describe()}). Press Ctrl+C to stop early.")
+    load.start()
     try:
-        time.sleep(duration)
+        time.sleep(args.duration)
     except KeyboardInterrupt:
         print("Interrupted by user.")
     finally:
-        for p in procs:
-            p.terminate()
-        for p in procs:
-            p.join()
-    print("CPU spam finished.")
\ No newline at end of file
+        load.stop()
+    print("Load finished.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,311 @@
 from collections import deque
 from pathlib import Path
-import json
 import logging
 import os
 import signal
+import socket
 import sys
 import threading
 import time
 
-from sys_tools import get_snapshot
+from collectors import CollectorSet
+from digest import DiagnosticDigest
+from process_history import ProcessHistoryIndex
+from sys_tools import (PROCESS_REGISTRY, collect_connections, collect_disks, collect_io, collect_processes,
+                       collect_system, get_snapshot, top_cpu, top_mem, disk_usage, disk_io_brief, net_io_brief,
+                       connections_summary, process_info, proc_tree, top_parents, list_open_files)
+from query_server import QueryClient, QueryServer
+from rollups import ROLLUP_METRICS, RollupStore
+from scheduler import AdaptiveScheduler
+from shm_ring import RingReader, RingWriter
+from tsstore import TimeSeriesStore
 
 # Ring buffer to store recent snapshots
 SNAPSHOT_STORE = deque(maxlen=100)  # Store last 100 snapshots
 
-def get_snapshots_file():
-    """Return path to snapshots.json"""
-    return Path.home() / ".sysdoctor" / "snapshots.json"
+# Serializes the shared samplers and process registry between the collector
+# thread and query handlers
+COLLECT_LOCK = threading.Lock()
 
-def save_snapshots(snapshots):
-    """Save deque to JSON file"""
-    with open(get_snapshots_file(), "w") as f:
-        json.dump(list(snapshots), f)
+# Set by start_daemon; cached samples younger than this answer live queries
+SAMPLE_INTERVAL_S = 10
 
-def load_snapshots():
-    """Load JSON file back to deque, handle missing file"""
+# The collector thread's tiers, for query handlers to judge freshness
+COLLECTORS = None
+
+# Raw/1-minute/15-minute rollups for long-range trend queries
+ROLLUPS = None
+
+# Per-process series for every process that has ranked near the top
+PROCESS_HISTORY = ProcessHistoryIndex()
+
+# Deltas, movers, heavy process events and breaches, updated on every sample
+DIGEST = DiagnosticDigest()
+
+# On-disk history, appended to on every sample (opened lazily in the daemon)
+SERIES_STORE = None
+
+# Shared-memory ring of recent snapshots for CLI readers (daemon side)
+RING_WRITER = None
+
+def get_ring_file():
+    """Return path to the shared snapshot ring"""
+    return Path.home() / ".sysdoctor" / "ring.bin"
+
+def get_ring_writer():
+    """Return the daemon's ring writer, creating the ring on first use"""
+    global RING_WRITER
+    if RING_WRITER is None:
+        get_data_dir()
+        RING_WRITER = RingWriter(get_ring_file())
+    return RING_WRITER
+
+def get_snapshot_ring():
+    """Map the daemon's snapshot ring read-only; None if it does not exist yet"""
     try:
-        with open(get_snapshots_file(), "r") as f:
-            snapshots = json.load(f)
-            SNAPSHOT_STORE.clear()
-            max_items = SNAPSHOT_STORE.maxlen or len(snapshots)
-            SNAPSHOT_STORE.extend(snapshots[-max_items:])
-    except FileNotFoundError:
-        pass
-    except json.JSONDecodeError:
-        pass
+        return RingReader(get_ring_file())
+    except (OSError, ValueError):
+        return None
+
+def get_series_dir():
+    """Return path to the time-series store directory"""
+    return Path.home() / ".sysdoctor" / "series"
+
+def get_series_store():
+    """Return the daemon's time-series store, opening it on first use"""
+    global SERIES_STORE
+    if SERIES_STORE is None:
+        SERIES_STORE = TimeSeriesStore(get_series_dir())
+    return SERIES_STORE
+
+def get_rollups_file():
+    """Return path to the persisted 1m/15m rollup buckets"""
+    return Path.home() / ".sysdoctor" / "rollups.json"
+
+def load_rollups():
+    """Restore saved rollups and replay stored samples taken since they were saved"""
+    global ROLLUPS
+    rollups = RollupStore(get_rollups_file())
+    rollups.load()
+    for snapshot in get_series_store().iter_range(rollups.replay_from()):
+        rollups.add(snapshot)
+    ROLLUPS = rollups
+    return rollups
+
+def collect_processes_indexed():
+    """Process rankings, also folding the full scan into the per-process history index"""
+    PROCESS_REGISTRY.detail_pids = PROCESS_HISTORY.tracked_pids()
+    result = collect_processes()
+    PROCESS_HISTORY.update(PROCESS_REGISTRY.last_scan)
+    return result
+
+def build_collectors():
+    """Metric families and their cadences: counters and I/O rates every tick, processes, connections and mounts less often"""
+    collectors = CollectorSet()
+    collectors.register("system", collect_system, interval_s=0, budget_s=0.05)
+    collectors.register("io", collect_io, interval_s=0, budget_s=0.05)
+    collectors.register("processes", collect_processes_indexed, interval_s=30, high_interval_s=2, budget_s=0.5)
+    collectors.register("connections", collect_connections, interval_s=30, high_interval_s=10, budget_s=0.5)
+    collectors.register("disks", collect_disks, interval_s=60, budget_s=0.5)
+    return collectors
 
 def snapshot_collector(sample_interval_s: int = 10):
-    """Background thread to collect snapshots periodically"""
-    snapshot_count = 0
-    
+    """Background thread to collect snapshots on an adaptive schedule"""
+    # SNAPSHOT_STORE starts empty rather than from stored records, which lack
+    # fields of the live view; _query_range reads older history from disk
+    rollups = load_rollups()
+    global COLLECTORS
+    scheduler = AdaptiveScheduler(low_interval_s=sample_interval_s)
+    collectors = COLLECTORS = build_collectors()
+
     while True:
         try:
-            snapshot = get_snapshot()
-            snapshot['timestamp'] = time.time()
-            SNAPSHOT_STORE.append(snapshot)
-            
-            snapshot_count += 1
-            if snapshot_count % 10 == 0:  # Save every 10 snapshots
-                save_snapshots(SNAPSHOT_STORE)
+            with COLLECT_LOCK:
+                ran = collectors.run_due(scheduler.mode)
+            timestamp = time.time()
+            snapshot = collectors.merged()
+            # Only this tick's tiers go to disk; the live view keeps every tier
+            fresh = collectors.merged(tiers=ran)
+            if "system" not in snapshot["collected_at"]:
+                snapshot = fresh = {"timestamp": timestamp, "hostname": socket.gethostname(),
+                                    "error": "system counters unavailable"}
+            else:
+                snapshot.update(timestamp=timestamp, sampling_mode=scheduler.mode)
+                fresh.update(timestamp=timestamp, sampling_mode=scheduler.mode)
         except Exception as e:
-            # Silently continue on errors TODO: log these
-            pass
-        
-        time.sleep(sample_interval_s)
+            logging.exception(f"Snapshot collection failed: {e}")
+            scheduler.wait()
+            continue
+
+        # Each sink on its own, so one failing store does not starve the others
+        sinks = (
+            ("snapshot store", lambda: SNAPSHOT_STORE.append(snapshot)),
+            ("ring", lambda: get_ring_writer().append(snapshot)),
+            ("series store", lambda: get_series_store().append(fresh)),
+            ("rollups", lambda: rollups.add(snapshot)),
+            ("digest", lambda: DIGEST.update(snapshot, PROCESS_REGISTRY.last_scan if "processes" in ran else None)),
+            ("scheduler", lambda: scheduler.observe(snapshot)),
+        )
+        for name, sink in sinks:
+            try:
+                sink()
+            except Exception as e:
+                logging.exception(f"Snapshot sink {name} failed: {e}")
+
+        scheduler.wait()
+
+def get_socket_file():
+    """Return path to the daemon's query socket"""
+    return Path.home() / ".sysdoctor" / "daemon.sock"
+
+def get_query_client(timeout_s: float = 5.0):
+    """Client for the daemon's query socket (connects on first query)"""
+    return QueryClient(get_socket_file(), timeout_s=timeout_s)
+
+def _fresh_snapshot(max_age_s=None, tier="system"):
+    """Latest collected snapshot if the given collector tier in it is recent enough, else None"""
+    if max_age_s is None:
+        # Fresh means no older than that tier's own cadence allows
+        collector = COLLECTORS.get(tier) if COLLECTORS else None
+        tier_interval_s = collector.interval_s * collector.backoff if collector else 0
+        max_age_s = max(SAMPLE_INTERVAL_S, tier_interval_s) * 1.5
+    latest = SNAPSHOT_STORE[-1] if SNAPSHOT_STORE else None
+    if not latest or "error" in latest:
+        return None
+    collected = latest.get("collected_at", {}).get(tier)
+    return latest if collected is not None and time.time() - collected <= max_age_s else None
+
+def _query_latest(args):
+    latest = _fresh_snapshot(args.get("max_age_s"))
+    processes_fresh = _fresh_snapshot(args.get("max_age_s"), tier="processes")
+    if latest is not None and processes_fresh is not None:
+        return latest
+    with COLLECT_LOCK:
+        return get_snapshot()
+
+def _query_range(args):
+    start_ts = args.get("start_ts", 0)
+    end_ts = args.get("end_ts")
+    limit = args.get("limit", 1000)
+    recent = list(SNAPSHOT_STORE)
+    if recent and recent[0]["timestamp"] <= start_ts:
+        snapshots = [s for s in recent
+                     if s["timestamp"] >= start_ts and (end_ts is None or s["timestamp"] <= end_ts)]
+    else:
+        # Older than the in-memory window; the collector owns the writer, so read separately
+        snapshots = TimeSeriesStore(get_series_dir()).range(start_ts, end_ts)
+    return {"snapshots": snapshots[-limit:]}
+
+def _query_process_history(args):
+    process_name = args.get("process_name")
+    target_pid = args.get("pid")
+    with COLLECT_LOCK:
+        processes = PROCESS_HISTORY.lookup(process_name, target_pid, limit=args.get("limit", 20))
+    return {"process_name": process_name, "target_pid": target_pid, "processes": processes}
+
+def _query_process_rss(args):
+    with COLLECT_LOCK:
+        return PROCESS_HISTORY.rss_series(args["process_name"], args.get("since", 0))
+
+def _query_digest(args):
+    return DIGEST.to_dict()
+
+def _query_rollups(args):
+    if ROLLUPS is None:
+        raise RuntimeError("rollups not loaded yet")
+    end_ts = args.get("end_ts")
+    start_ts = args.get("start_ts")
+    if start_ts is None:
+        start_ts = (end_ts or time.time()) - args.get("window_minutes", 60) * 60
+    metrics = args.get("metrics") or list(ROLLUP_METRICS)
+    return {"series": [ROLLUPS.query(m, start_ts, end_ts, args.get("resolution")) for m in metrics]}
+
+def _query_top(key, count_key, scan):
+    def handler(args):
+        n = args.get("n", 10)
+        latest = _fresh_snapshot(args.get("max_age_s"), tier="processes")
+        if latest is not None and n <= len(latest[key]):
+            return {key: latest[key][:n], count_key: latest.get("num_processes")}
+        # Deeper than the collected lists: rescan with the warm process registry
+        with COLLECT_LOCK:
+            return scan(n)
+    return handler
+
+def _query_io(key, sample):
+    def handler(args):
+        top_n = args.get("top_n", 5)
+        latest = _fresh_snapshot(args.get("max_age_s"), tier="io")
+        if latest is not None and key in latest:
+            rates = latest[key]
+            devices = "disks" if "disks" in rates else "nics"
+            return dict(rates, **{devices: rates[devices][:top_n]})
+        with COLLECT_LOCK:
+            return sample(top_n)
+    return handler
+
+def _query_disk_usage(args):
+    paths = args.get("paths")
+    top_n = args.get("top_n", 5)
+    latest = _fresh_snapshot(args.get("max_age_s"), tier="disks")
+    if not paths and latest is not None and top_n <= len(latest["disk_usage"]["usage"]):
+        return {"usage": latest["disk_usage"]["usage"][:top_n]}
+    return disk_usage(paths=paths, top_n=top_n)
+
+def _query_connections(args):
+    limit = args.get("limit", 0)
+    states = args.get("states")
+    top_n = args.get("top_n", 5)
+    latest = _fresh_snapshot(args.get("max_age_s"), tier="connections")
+    summary = latest.get("network_connections") if latest is not None else None
+    if summary and "error" not in summary and not limit and not states and top_n <= 5:
+        return dict(summary, top_local_ports=summary["top_local_ports"][:top_n],
+                    top_remote_peers=summary["top_remote_peers"][:top_n])
+    # Samples or a state filter: one streaming pass over /proc/net, no collector state involved
+    return connections_summary(limit=limit, states=states, top_n=top_n)
+
+def _query_process_info(args):
+    with COLLECT_LOCK:
+        return process_info(args["pid"])
+
+def _query_proc_tree(args):
+    with COLLECT_LOCK:
+        return proc_tree(args["pid"], args.get("depth", 2))
+
+def _query_top_parents(args):
+    with COLLECT_LOCK:
+        return top_parents(args.get("limit", 3))
+
+def _query_open_files(args):
+    pid = args["pid"]
+    result = list_open_files(pid, limit=args.get("limit", 100))
+    if "error" not in result:
+        with COLLECT_LOCK:
+            tracked = PROCESS_HISTORY.lookup(pid=pid, limit=0)
+        if tracked:
+            # Newest series for this pid: how its fd count has moved while tracked
+            result["fd_slope_per_hour"] = tracked[0]["fd_slope_per_hour"]
+            result["tracked_for_s"] = round(tracked[0]["last_seen"] - tracked[0]["first_seen"])
+    return result
+
+# Ops served on the query socket
+QUERY_HANDLERS = {
+    "latest": _query_latest,
+    "range": _query_range,
+    "process_history": _query_process_history,
+    "process_rss": _query_process_rss,
+    "rollups": _query_rollups,
+    "digest": _query_digest,
+    "top_cpu": _query_top("top_cpu_processes", "num_processes", top_cpu),
+    "top_mem": _query_top("top_mem_processes", "total_processes", top_mem),
+    "disk_usage": _query_disk_usage,
+    "disk_io": _query_io("disk_io", disk_io_brief),
+    "network_io": _query_io("network_io", net_io_brief),
+    "connections": _query_connections,
+    "process_info": _query_process_info,
+    "proc_tree": _query_proc_tree,
+    "top_parents": _query_top_parents,
+    "open_files": _query_open_files,
+}
 
 def get_data_dir():
     data_dir = Path.home() / ".sysdoctor"
@@ -120,6 +373,7 @@ def daemonize():
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully"""
     get_pid_file().unlink(missing_ok=True)
+    get_socket_file().unlink(missing_ok=True)
     sys.exit(0)
 
 
@@ -139,13 +393,20 @@ def start_daemon(sample_interval_s: int = 10):
     with open(get_pid_file(), "w") as f:
         f.write(str(os.getpid()))
     
+    global SAMPLE_INTERVAL_S
+    SAMPLE_INTERVAL_S = sample_interval_s
     snapshot_thread = threading.Thread(target=snapshot_collector, args=(sample_interval_s,), daemon=True)
     snapshot_thread.start()
 
+    # Answer CLI tool calls from the collector's warm state
+    query_server = QueryServer(get_socket_file(), QUERY_HANDLERS)
+    query_server.start()
+
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
+        query_server.stop()
         get_pid_file().unlink(missing_ok=True)
         return True
 
@@ -190,13 +451,21 @@ def stop_daemon():
 
 def get_recent_snapshots(count: int = 10):
     """Get recent snapshots for the CLI to use"""
-    snapshots_file = get_snapshots_file()
-    if not snapshots_file.exists():
+    if not get_series_dir().exists():
+        return []
+    
+    try:
+        return TimeSeriesStore(get_series_dir()).last(count)
+    except (OSError, ValueError):
+        return []
+
+
+def get_snapshots_between(start_ts: float, end_ts: float = None):
+    """Get stored snapshots in a time range for the CLI to use"""
+    if not get_series_dir().exists():
         return []
     
     try:
-        with open(snapshots_file, 'r') as f:
-            snapshots = json.load(f)
-            return snapshots[-count:] if snapshots else []
-    except (json.JSONDecodeError, IOError):
+        return TimeSeriesStore(get_series_dir()).range(start_ts, end_ts)
+    except (OSError, ValueError):
         return []
\ No newline at end of file
@@ -0,0 +1,275 @@
+"""
+Local rule-based diagnosis over recent snapshots.
+
+Rules look for the usual culprits: a CPU hog, a process whose RSS keeps
+climbing, memory pressure, a nearly full disk, load above the core count and
+runaway process spawning. A question that clearly asks about one of these
+(and nothing more) is answered from the rules in milliseconds with no
+network; otherwise the findings are passed to the model as hints, and they
+are the answer of last resort when the model cannot be reached.
+"""
+
+import os
+import re
+import time
+from array import array
+from typing import Any, Callable, Dict, List, Optional
+
+from analytics import np, summarize, tier_samples
+
+# Samples the rules look back over
+RULE_WINDOW = 360
+# The latest sample must be this fresh for a local answer
+MAX_SAMPLE_AGE_S = 120
+
+CPU_HOG_PERCENT = 80.0
+# A hog must stay above the bar for at least this long to be "sustained"
+CPU_HOG_MIN_S = 30
+LEAK_MIN_SAMPLES = 8
+LEAK_MIN_SPAN_S = 120
+LEAK_MB_PER_HOUR = 100.0
+LEAK_MIN_GROWTH = 0.10
+MEMORY_HIGH_PERCENT = 90.0
+DISK_FULL_PERCENT = 90.0
+DISK_CRITICAL_PERCENT = 95.0
+RUNAWAY_GROWTH = 50
+RUNAWAY_GROWTH_RATIO = 0.25
+RUNAWAY_CHILDREN = 50
+
+# Intent -> pattern a question must match to be about it. Each names the
+# resource itself; verbs like "eating" or "leaking" say nothing about which one.
+INTENTS = {
+    "cpu": re.compile(r"\b(cpu|processor|fans?)\b", re.I),
+    "memory": re.compile(r"\b(memory|ram|rss|swap|oom)\b", re.I),
+    # Space only: "disk" alone may be about I/O, which the rules do not cover
+    "disk": re.compile(r"\b(full|space|free)\b", re.I),
+    "load": re.compile(r"\b(load ?average|loadavg|overloaded|system load|(high|the|my|cpu|server|machine) load|"
+                       r"load (is|so|too|on))\b", re.I),
+    "processes": re.compile(r"\b(fork bomb|fork\w*|child process\w*|spawn\w*|too many processes|runaway)\b", re.I),
+}
+# Nouns that make a question about something other than the matched intent
+OTHER_SUBJECTS = re.compile(r"\b(network|internet|wifi|battery|gpu|browser|tabs?|page|app|website|inbox|mailbox|"
+                            r"folder|directory|table|queue|cache)\b", re.I)
+# A matched word right after one of these is a verb ("won't load"), not the subject
+VERB_CONTEXT = re.compile(r"\b(won'?t|can'?t|cannot|doesn'?t|don'?t|didn'?t|not|to|will|would|should|could)"
+                          r"(\s+\w+)?\s*$", re.I)
+# Questions that need history, explanation, a specific process or disk I/O go to the model
+NEEDS_MODEL = re.compile(r"\b(trend|history|yesterday|hours?|days?|since|compare|explain|how (do|can|should)|"
+                         r"fix|pid|that|it|this|those|slow\w*|busy|writ\w*|read\w*|i/?o|iops|throughput|"
+                         r"latency)\b|\d", re.I)
+MAX_LOCAL_QUESTION_WORDS = 12
+
+
+def _valid(snapshots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [s for s in snapshots if "error" not in s]
+
+
+def _finding(rule: str, intent: str, severity: str, summary: str, **evidence) -> Dict[str, Any]:
+    return {"rule": rule, "intent": intent, "severity": severity, "summary": summary, "evidence": evidence}
+
+
+def cpu_hog(snapshots: List[Dict[str, Any]], cores: int) -> Optional[Dict[str, Any]]:
+    """A process at CPU_HOG_PERCENT or more, sustained for CPU_HOG_MIN_S if possible."""
+    valid = [s for s in tier_samples(snapshots, "processes") if s.get("top_cpu_processes")]
+    if not valid:
+        return None
+    top = valid[-1]["top_cpu_processes"][0]
+    if top["cpu_percent"] < CPU_HOG_PERCENT:
+        return None
+    # How long this process has stayed above the bar, walking back from now
+    since = valid[-1]["timestamp"]
+    for snapshot in reversed(valid[:-1]):
+        match = next((p for p in snapshot["top_cpu_processes"] if p["pid"] == top["pid"]), None)
+        if match is None or match["cpu_percent"] < CPU_HOG_PERCENT:
+            break
+        since = snapshot["timestamp"]
+    duration_s = valid[-1]["timestamp"] - since
+    sustained = duration_s >= CPU_HOG_MIN_S
+    summary = (f"{top['name']} (pid {top['pid']}) is using {top['cpu_percent']:.0f}% CPU"
+               + (f" and has been for {duration_s:.0f}s" if sustained else " right now")
+               + f" ({top['cpu_percent'] / 100:.1f} of {cores} cores)")
+    return _finding("cpu_hog", "cpu", "warning" if sustained else "info", summary,
+                    pid=top["pid"], name=top["name"], cpu_percent=top["cpu_percent"], duration_s=round(duration_s))
+
+
+def memory_leak(snapshots: List[Dict[str, Any]], cores: int) -> Optional[Dict[str, Any]]:
+    """The process whose RSS climbs fastest, if it climbs fast and steadily enough."""
+    series: Dict[tuple, tuple] = {}
+    for snapshot in tier_samples(snapshots, "processes"):
+        for proc in snapshot.get("top_mem_processes") or []:
+            ts, vs = series.setdefault((proc["pid"], proc["name"]), (array('d'), array('d')))
+            ts.append(snapshot["timestamp"])
+            vs.append(proc["rss_mb"])
+    worst = None
+    for (pid, name), (ts, vs) in series.items():
+        if len(vs) < LEAK_MIN_SAMPLES or ts[-1] - ts[0] < LEAK_MIN_SPAN_S or vs[0] <= 0:
+            continue
+        stats = summarize(np.frombuffer(ts), np.frombuffer(vs)) if np is not None else summarize(ts, vs)
+        growth = (vs[-1] - vs[0]) / vs[0]
+        if stats["slope_per_hour"] >= LEAK_MB_PER_HOUR and growth >= LEAK_MIN_GROWTH:
+            if worst is None or stats["slope_per_hour"] > worst[0]:
+                worst = (stats["slope_per_hour"], pid, name, vs[0], vs[-1], ts[-1] - ts[0])
+    if worst is None:
+        return None
+    slope, pid, name, first, last, span_s = worst
+    return _finding("memory_leak", "memory", "warning",
+                    f"{name} (pid {pid}) RSS grew from {first:.0f}MB to {last:.0f}MB over {span_s / 60:.0f} min "
+                    f"(~{slope:.0f}MB/hour); this looks like a leak",
+                    pid=pid, name=name, slope_mb_per_hour=round(slope), rss_mb=round(last, 1))
+
+
+def memory_pressure(snapshots: List[Dict[str, Any]], cores: int) -> Optional[Dict[str, Any]]:
+    valid = _valid(snapshots)
+    memory = (valid[-1].get("memory") or {}) if valid else {}
+    if memory.get("percent_used") is None or memory["percent_used"] < MEMORY_HIGH_PERCENT:
+        return None
+    top = (valid[-1].get("top_mem_processes") or [None])[0]
+    biggest = f"; largest is {top['name']} (pid {top['pid']}, {top['rss_mb']:.0f}MB)" if top else ""
+    return _finding("memory_pressure", "memory", "critical" if memory["percent_used"] >= 95 else "warning",
+                    f"Memory is {memory['percent_used']:.0f}% used, {memory.get('available_gb', 0):.1f}GB available"
+                    + biggest, percent_used=memory["percent_used"])
+
+
+def disk_full(snapshots: List[Dict[str, Any]], cores: int) -> Optional[Dict[str, Any]]:
+    valid = [s for s in _valid(snapshots) if (s.get("disk_usage") or {}).get("usage")]
+    if not valid:
+        return None
+    full = [u for u in valid[-1]["disk_usage"]["usage"] if (u.get("percent_used") or 0) >= DISK_FULL_PERCENT]
+    if not full:
+        return None
+    worst = max(full, key=lambda u: u["percent_used"])
+    return _finding("disk_full", "disk", "critical" if worst["percent_used"] >= DISK_CRITICAL_PERCENT else "warning",
+                    "Nearly full: " + ", ".join(f"{u['location']} {u['percent_used']:.0f}% "
+                                                f"({u['free_gb']:.1f}GB free)" for u in full),
+                    mounts=[u["location"] for u in full])
+
+
+def load_over_cores(snapshots: List[Dict[str, Any]], cores: int) -> Optional[Dict[str, Any]]:
+    valid = [s for s in _valid(snapshots) if s.get("load_avg")]
+    if not valid:
+        return None
+    load1, load5, _ = valid[-1]["load_avg"]
+    if load1 <= cores:
+        return None
+    sustained = load5 > cores
+    return _finding("load_over_cores", "load", "warning" if sustained else "info",
+                    f"Load average {load1:.2f} (5m {load5:.2f}) is above the {cores} available cores"
+                    + ("; work is queueing" if sustained else "; the 5-minute average is still below"),
+                    load_1m=load1, load_5m=load5, cores=cores)
+
+
+def runaway_children(snapshots: List[Dict[str, Any]], cores: int) -> Optional[Dict[str, Any]]:
+    """Process count climbing fast; run_rules attributes it to the parent with the most children."""
+    valid = [s for s in tier_samples(snapshots, "processes") if s.get("num_processes")]
+    if len(valid) < 2:
+        return None
+    before, now = valid[0]["num_processes"], valid[-1]["num_processes"]
+    growth = now - before
+    if growth < RUNAWAY_GROWTH or growth < before * RUNAWAY_GROWTH_RATIO:
+        return None
+    return _finding("runaway_children", "processes", "warning",
+                    f"Process count rose from {before} to {now} in "
+                    f"{(valid[-1]['timestamp'] - valid[0]['timestamp']) / 60:.0f} min",
+                    num_processes=now, growth=growth, parents=[])
+
+
+def _attribute_spawner(finding: Dict[str, Any], parents: List[Dict[str, Any]]) -> None:
+    """Name the parent with the most children in a runaway_children finding."""
+    parents = [p for p in parents if p["children"] >= RUNAWAY_CHILDREN]
+    finding["evidence"]["parents"] = parents
+    if parents:
+        finding["summary"] += f"; {parents[0]['name']} (pid {parents[0]['pid']}) has {parents[0]['children']} children"
+
+
+RULES: List[Callable[[List[Dict[str, Any]], int], Optional[Dict[str, Any]]]] = [
+    cpu_hog, memory_leak, memory_pressure, disk_full, load_over_cores, runaway_children,
+]
+
+
+def run_rules(snapshots: List[Dict[str, Any]], cores: Optional[int] = None,
+              parents: Optional[Callable[[], List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+    """Every rule's finding for these snapshots, most severe first.
+
+    `parents` returns the processes with the most children (e.g. from the
+    daemon's process tree); it is only called when process spawning looks
+    out of control, to name the likely spawner.
+    """
+    cores = cores or os.cpu_count() or 1
+    findings = [f for f in (rule(snapshots, cores) for rule in RULES) if f is not None]
+    for finding in findings:
+        if finding["rule"] == "runaway_children" and parents is not None:
+            _attribute_spawner(finding, parents())
+    order = {"critical": 0, "warning": 1, "info": 2}
+    return sorted(findings, key=lambda f: order[f["severity"]])
+
+
+def format_findings(findings: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"- [{f['severity']}] {f['summary']}" for f in findings)
+
+
+def _status(intent: str, latest: Dict[str, Any], cores: int) -> str:
+    """Plain current-state answer for an intent with no finding."""
+    if intent == "cpu":
+        procs = ", ".join(f"{p['name']} (pid {p['pid']}) {p['cpu_percent']:.0f}%"
+                          for p in (latest.get("top_cpu_processes") or [])[:3])
+        return f"No CPU hog: overall CPU is {latest.get('cpu_percent', 0):.0f}%. Top right now: {procs or 'none'}."
+    if intent == "memory":
+        memory = latest.get("memory") or {}
+        procs = ", ".join(f"{p['name']} (pid {p['pid']}) {p['rss_mb']:.0f}MB"
+                          for p in (latest.get("top_mem_processes") or [])[:3])
+        return (f"Memory is {memory.get('percent_used', 0):.0f}% used ({memory.get('available_gb', 0):.1f}GB "
+                f"available) and nothing is growing like a leak. Largest: {procs or 'none'}.")
+    if intent == "disk":
+        mounts = ", ".join(f"{u['location']} {u['percent_used']:.0f}%"
+                           for u in ((latest.get("disk_usage") or {}).get("usage") or [])[:3])
+        return f"No disk is nearly full. Fullest: {mounts or 'none'}."
+    if intent == "load":
+        load = latest.get("load_avg") or [0, 0, 0]
+        return f"Load is {load[0]:.2f} / {load[1]:.2f} / {load[2]:.2f} on {cores} cores, within capacity."
+    return f"{latest.get('num_processes', 'An unknown number of')} processes; nothing is spawning out of control."
+
+
+def _is_subject(question: str, match: re.Match) -> bool:
+    return not VERB_CONTEXT.search(question[:match.start()])
+
+
+def match_intent(question: str) -> Optional[str]:
+    """The one intent a short, self-contained question is about; None if unclear."""
+    if (len(question.split()) > MAX_LOCAL_QUESTION_WORDS or NEEDS_MODEL.search(question)
+            or OTHER_SUBJECTS.search(question)):
+        return None
+    matched = []
+    for intent, pattern in INTENTS.items():
+        match = pattern.search(question)
+        if match is not None:
+            if not _is_subject(question, match):
+                return None
+            matched.append(intent)
+    return matched[0] if len(matched) == 1 else None
+
+
+def answer_locally(question: str, snapshots: List[Dict[str, Any]], findings: List[Dict[str, Any]],
+                   cores: Optional[int] = None) -> Optional[str]:
+    """An answer from the rules alone, or None if the question needs the model."""
+    intent = match_intent(question)
+    valid = _valid(snapshots)
+    if intent is None or not valid or time.time() - valid[-1]["timestamp"] > MAX_SAMPLE_AGE_S:
+        return None
+    cores = cores or os.cpu_count() or 1
+    relevant = [f for f in findings if f["intent"] == intent]
+    if relevant:
+        return format_findings(relevant)
+    return _status(intent, valid[-1], cores)
+
+
+def offline_answer(snapshots: List[Dict[str, Any]], findings: List[Dict[str, Any]],
+                   cores: Optional[int] = None) -> str:
+    """Everything the rules can say, for when the model is unreachable."""
+    valid = _valid(snapshots)
+    if not valid:
+        return "No recent snapshots to diagnose."
+    cores = cores or os.cpu_count() or 1
+    lines = [format_findings(findings)] if findings else []
+    covered = {f["intent"] for f in findings}
+    lines += [f"- {_status(intent, valid[-1], cores)}" for intent in INTENTS if intent not in covered]
+    return "\n".join(lines)
@@ -0,0 +1,224 @@
+"""
+Running diagnostic digest maintained by the daemon.
+
+Updated once per sample, so readers get the extracted signal in O(1)
+instead of re-deriving it from raw snapshots on every chat turn:
+- current state: headline metrics and the top process by CPU and by RSS
+- notable deltas over the last 1, 5 and 15 minutes
+- top movers by CPU and RSS growth over the last 5 minutes
+- heavy processes that started or exited in the last 15 minutes
+- threshold breaches, ongoing (with start time) and recently cleared
+"""
+
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Key = Tuple[int, float]
+
+# Delta windows, in seconds, by label
+WINDOWS_S = {"1m": 60, "5m": 300, "15m": 900}
+LONGEST_WINDOW_S = max(WINDOWS_S.values())
+
+# Headline metric -> (snapshot reader, smallest change reported as notable)
+DIGEST_METRICS: Dict[str, Tuple[Callable[[Dict[str, Any]], Optional[float]], float]] = {
+    "cpu_percent": (lambda s: s.get("cpu_percent"), 5.0),
+    "memory_percent": (lambda s: (s.get("memory") or {}).get("percent_used"), 2.0),
+    "available_gb": (lambda s: (s.get("memory") or {}).get("available_gb"), 0.5),
+    "load_1m": (lambda s: (s.get("load_avg") or [None])[0], 0.5),
+    "iowait_percent": (lambda s: s.get("cpu_iowait_percent"), 5.0),
+    "disk_percent_max": (lambda s: max((u.get("percent_used") or 0 for u in
+                                        (s.get("disk_usage") or {}).get("usage") or []), default=None), 1.0),
+}
+
+# Breach name -> (metric, limit); load is compared per core
+BREACH_LIMITS = {
+    "cpu_high": ("cpu_percent", 90.0),
+    "memory_high": ("memory_percent", 90.0),
+    "load_high": ("load_per_core", 1.5),
+    "iowait_high": ("iowait_percent", 20.0),
+    "disk_nearly_full": ("disk_percent_max", 90.0),
+}
+
+# A process counts as heavy at or above either of these
+HEAVY_CPU_PERCENT = 25.0
+HEAVY_RSS_MB = 500.0
+
+# Process baselines for movers are kept at most once per this many seconds
+BASELINE_EVERY_S = 60
+MOVERS_WINDOW_S = 300
+TOP_MOVERS = 5
+MAX_EVENTS = 20
+
+
+class DiagnosticDigest:
+    """Incrementally maintained summary of recent samples and process scans."""
+
+    def __init__(self, cores: Optional[int] = None):
+        self._cores = cores or os.cpu_count() or 1
+        # One deque per window; the head of each is that window's baseline sample
+        self._windows = {label: deque() for label in WINDOWS_S}
+        self._baselines: deque = deque()  # (timestamp, {key: (name, cpu, rss)})
+        self._heavy: Dict[Key, Dict[str, Any]] = {}
+        self._events: deque = deque(maxlen=MAX_EVENTS)  # heavy started/exited
+        self._breaches: Dict[str, Dict[str, Any]] = {}
+        self._cleared: deque = deque(maxlen=MAX_EVENTS)
+        self._movers: Dict[str, List[Dict[str, Any]]] = {"cpu": [], "rss": []}
+        self._current: Dict[str, Any] = {}
+        self._document: Dict[str, Any] = {"updated_at": None}
+
+    def _metrics(self, snapshot: Dict[str, Any]) -> Dict[str, float]:
+        values = {}
+        for name, (read, _) in DIGEST_METRICS.items():
+            value = read(snapshot)
+            if value is not None:
+                values[name] = value
+        if "load_1m" in values:
+            values["load_per_core"] = values["load_1m"] / self._cores
+        return values
+
+    def update(self, snapshot: Dict[str, Any], process_records: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Fold in one sample, plus the full process scan if one ran this tick."""
+        timestamp = snapshot["timestamp"]
+        if "error" in snapshot:
+            self._document = dict(self._document, last_error=snapshot["error"], last_error_at=timestamp)
+            return
+        values = self._metrics(snapshot)
+        for label, window_s in WINDOWS_S.items():
+            window = self._windows[label]
+            window.append((timestamp, values))
+            while window and window[0][0] < timestamp - window_s:
+                window.popleft()
+
+        self._update_breaches(timestamp, values)
+        if process_records is not None:
+            self._update_processes(timestamp, process_records)
+
+        self._current = dict(values)
+        for key, label in (("top_cpu_processes", "top_cpu_process"), ("top_mem_processes", "top_mem_process")):
+            top = (snapshot.get(key) or [None])[0]
+            if top is not None:
+                self._current[label] = top
+        self._document = self._build(timestamp)
+
+    def _update_breaches(self, timestamp: float, values: Dict[str, float]) -> None:
+        for name, (metric, limit) in BREACH_LIMITS.items():
+            value = values.get(metric)
+            if value is None:
+                continue
+            breach = self._breaches.get(name)
+            if value >= limit:
+                if breach is None:
+                    self._breaches[name] = {"breach": name, "limit": limit, "since": timestamp, "peak": value}
+                else:
+                    breach["peak"] = max(breach["peak"], value)
+                self._breaches[name]["value"] = value
+            elif breach is not None:
+                del self._breaches[name]
+                self._cleared.append(dict(breach, cleared_at=timestamp))
+        while self._cleared and self._cleared[0]["cleared_at"] < timestamp - LONGEST_WINDOW_S:
+            self._cleared.popleft()
+
+    def _update_processes(self, timestamp: float, records: List[Dict[str, Any]]) -> None:
+        current = {(r["pid"], r["create_time"]): (r["name"], r["cpu_percent"], r["rss_mb"]) for r in records}
+
+        # Heavy processes that appeared or exited
+        heavy = {}
+        for key, (name, cpu, rss) in current.items():
+            if cpu >= HEAVY_CPU_PERCENT or rss >= HEAVY_RSS_MB:
+                heavy[key] = {"pid": key[0], "name": name, "cpu_percent": cpu, "rss_mb": round(rss, 1)}
+                if key not in self._heavy and key[1] >= timestamp - LONGEST_WINDOW_S:
+                    self._events.append(dict(heavy[key], event="started", at=timestamp))
+        for key, last in self._heavy.items():
+            if key not in current:
+                self._events.append(dict(last, event="exited", at=timestamp))
+            elif key not in heavy:
+                heavy[key] = last  # still running, below the bar now; keep watching for exit
+        self._heavy = {k: v for k, v in heavy.items() if k in current}
+        while self._events and self._events[0]["at"] < timestamp - LONGEST_WINDOW_S:
+            self._events.popleft()
+
+        # Movers against the oldest baseline inside the movers window
+        if not self._baselines or timestamp - self._baselines[-1][0] >= BASELINE_EVERY_S:
+            self._baselines.append((timestamp, current))
+        while self._baselines and self._baselines[0][0] < timestamp - MOVERS_WINDOW_S:
+            self._baselines.popleft()
+        since, baseline = self._baselines[0]
+        growth = {"cpu": [], "rss": []}
+        for key, (name, cpu, rss) in current.items():
+            before = baseline.get(key)
+            if before is None or since == timestamp:
+                continue
+            growth["cpu"].append((cpu - before[1], key, name, cpu))
+            growth["rss"].append((rss - before[2], key, name, rss))
+        for kind, unit in (("cpu", "cpu_percent"), ("rss", "rss_mb")):
+            ranked = sorted((g for g in growth[kind] if g[0] > 0), reverse=True)[:TOP_MOVERS]
+            self._movers[kind] = [{"pid": key[0], "name": name, unit: round(now, 1), "growth": round(delta, 1),
+                                   "over_s": round(timestamp - since)} for delta, key, name, now in ranked]
+
+    def _build(self, timestamp: float) -> Dict[str, Any]:
+        deltas = {}
+        for label, window in self._windows.items():
+            then_ts, then = window[0]
+            if then_ts == timestamp:
+                continue
+            notable = {}
+            for name, (_, threshold) in DIGEST_METRICS.items():
+                if name in then and name in self._current:
+                    change = self._current[name] - then[name]
+                    if abs(change) >= threshold:
+                        notable[name] = {"from": then[name], "to": self._current[name], "change": round(change, 2)}
+            deltas[label] = notable
+        return {
+            "updated_at": timestamp,
+            "current": self._current,
+            "deltas": deltas,
+            "top_movers": {"cpu": self._movers["cpu"], "rss": self._movers["rss"]},
+            "heavy_process_events": list(self._events),
+            "breaches": list(self._breaches.values()),
+            "cleared_breaches": list(self._cleared),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The digest as of the last update; built on update, so this is O(1)."""
+        return self._document
+
+
+def format_digest(digest: Dict[str, Any]) -> str:
+    """Render a digest as prompt context."""
+    current = digest.get("current") or {}
+    if not current:
+        return "No digest available yet."
+    age = time.time() - digest["updated_at"]
+    lines = [f"Current state ({age:.0f}s ago):"]
+    labels = {"cpu_percent": "CPU %", "memory_percent": "Memory used %", "available_gb": "Memory available GB",
+              "load_1m": "Load (1m)", "iowait_percent": "IO wait %", "disk_percent_max": "Fullest disk %"}
+    lines += [f"- {label}: {current[name]:.1f}" for name, label in labels.items() if name in current]
+    for key, label, field, unit in (("top_cpu_process", "Top CPU", "cpu_percent", "%"),
+                                    ("top_mem_process", "Top memory", "rss_mb", "MB")):
+        proc = current.get(key)
+        if proc:
+            lines.append(f"- {label}: {proc['name']} (pid {proc['pid']}, {proc[field]:.1f}{unit})")
+    if digest.get("last_error"):
+        lines.append(f"- Last sample failed: {digest['last_error']}")
+
+    for label, notable in (digest.get("deltas") or {}).items():
+        if notable:
+            changes = ", ".join(f"{name} {d['from']:.1f} -> {d['to']:.1f}" for name, d in notable.items())
+            lines.append(f"Changes over {label}: {changes}")
+    for kind, unit in (("cpu", "%"), ("rss", "MB")):
+        movers = (digest.get("top_movers") or {}).get(kind) or []
+        if movers:
+            lines.append(f"Top {kind.upper()} growth over {movers[0]['over_s']}s: " + ", ".join(
+                f"{m['name']} (pid {m['pid']}) +{m['growth']}{unit}" for m in movers))
+    for event in digest.get("heavy_process_events") or []:
+        lines.append(f"Heavy process {event['event']}: {event['name']} (pid {event['pid']}, "
+                     f"{event['cpu_percent']:.1f}% CPU, {event['rss_mb']:.0f}MB) {time.time() - event['at']:.0f}s ago")
+    for breach in digest.get("breaches") or []:
+        lines.append(f"BREACH {breach['breach']}: {breach['value']:.2f} >= {breach['limit']} "
+                     f"for {time.time() - breach['since']:.0f}s (peak {breach['peak']:.2f})")
+    for breach in digest.get("cleared_breaches") or []:
+        lines.append(f"Cleared {breach['breach']} {time.time() - breach['cleared_at']:.0f}s ago "
+                     f"(peak {breach['peak']:.2f})")
+    return "\n".join(lines)
@@ -1,12 +1,23 @@
 import json
 import logging
+import math
+import threading
 import time
-from openai import OpenAI
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from openai import OpenAI, Timeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from collections import deque
 
 # Import available sys_tools functions
-from sys_tools import get_snapshot, top_cpu, top_mem, disk_usage
+from sys_tools import (get_snapshot, top_cpu, top_mem, disk_usage, disk_io_brief, net_io_brief, connections_summary,
+                       process_info, proc_tree, list_open_files)
+from daemon import get_query_client
+from diagnosis import RULE_WINDOW, answer_locally, format_findings, offline_answer, run_rules
+from digest import format_digest
+from tool_cache import ToolCache
+from compaction import compact_tool_result, estimate_tokens
+from analytics import (SNAPSHOT_SERIES, analyze, analyze_points, coverage, disk_percent_reader,
+                       process_rss_reader, tier_samples)
 
 SYSTEM_PROMPT = (
     """
@@ -32,6 +43,38 @@ SYSTEM_PROMPT = (
     """   
 )
 
+MODEL = "gpt-4o-mini"
+
+# Shared API client: created once so every turn reuses its keep-alive
+# connection pool instead of paying for a new client and TLS handshake
+_client = None
+
+# first_token_s / total_s / rounds / tokens of the most recent turn, for the chat
+# loop; failed is set when the turn ended in an error and the answer is a fallback
+last_turn_timing: Dict[str, Any] = {}
+
+def configure_client(base_url: Optional[str] = None, api_key: Optional[str] = None,
+                     timeout_s: float = 60.0, connect_timeout_s: float = 5.0,
+                     max_retries: int = 3) -> OpenAI:
+    """(Re)create the shared client. base_url/api_key default to OPENAI_BASE_URL/OPENAI_API_KEY.
+
+    Retries use the SDK's exponential backoff on connection errors, 429s and 5xx.
+    """
+    global _client
+    if _client is not None:
+        _client.close()
+    _client = OpenAI(
+        base_url=base_url,
+        api_key=api_key,
+        timeout=Timeout(timeout_s, connect=connect_timeout_s),
+        max_retries=max_retries
+    )
+    return _client
+
+def get_client() -> OpenAI:
+    """The shared client, created with default settings on first use."""
+    return _client if _client is not None else configure_client()
+
 # Global reference to snapshot buffer (will be set by main application)
 _snapshot_buffer = None
 
@@ -40,6 +83,44 @@ def set_snapshot_buffer(buffer: deque):
     global _snapshot_buffer
     _snapshot_buffer = buffer
 
+# One connection to the daemon's query socket per thread, so concurrent tool
+# calls do not queue behind each other on a shared socket
+_daemon_clients = threading.local()
+# Bound on one daemon query, under every tool timeout (DEFAULT_TOOL_TIMEOUT_S),
+# so a hung daemon frees the tool worker instead of holding it
+DAEMON_QUERY_TIMEOUT_S = 5.0
+
+def query_daemon(op: str, **args) -> Optional[Dict[str, Any]]:
+    """Ask the daemon to answer from its warm caches; None if it cannot."""
+    client = getattr(_daemon_clients, "client", None)
+    if client is None:
+        client = _daemon_clients.client = get_query_client(timeout_s=DAEMON_QUERY_TIMEOUT_S)
+    try:
+        return client.query(op, **args)
+    except (OSError, RuntimeError, ValueError) as e:
+        logging.debug(f"Daemon query {op} unavailable, running locally: {e}")
+        return None
+
+def _top_parents() -> List[Dict[str, Any]]:
+    """Processes with the most children, from the daemon's process tree; empty without a daemon."""
+    result = query_daemon("top_parents")
+    return (result or {}).get("parents") or []
+
+# Tools the daemon can answer: tool name -> query socket op
+DAEMON_TOOL_OPS = {
+    "get_current_snapshot": "latest",
+    "get_top_cpu_processes": "top_cpu",
+    "get_top_memory_processes": "top_mem",
+    "check_disk_usage": "disk_usage",
+    "find_process_history": "process_history",
+    "get_disk_io": "disk_io",
+    "get_network_io": "network_io",
+    "get_network_connections": "connections",
+    "get_process_info": "process_info",
+    "get_process_tree": "proc_tree",
+    "get_open_files": "open_files",
+}
+
 # Define available tools for the LLM
 AVAILABLE_TOOLS = [
     {
@@ -97,6 +178,94 @@ AVAILABLE_TOOLS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_disk_io",
+            "description": "Current per-disk I/O: read/write bytes per second, IOPS, average wait (ms) and utilization",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "top_n": {"type": "integer", "description": "Number of busiest disks to return", "default": 5}
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_network_io",
+            "description": "Current per-interface network I/O: bytes and packets per second, errors and drops",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "top_n": {"type": "integer", "description": "Number of busiest interfaces to return", "default": 5}
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_network_connections",
+            "description": "Socket counts by protocol and state, listening ports, and the busiest local ports and remote peers with their owning processes",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "states": {"type": "array", "items": {"type": "string"}, "description": "Only count sockets in these states, e.g. ESTABLISHED, TIME_WAIT, CLOSE_WAIT, LISTEN"},
+                    "limit": {"type": "integer", "description": "Individual sockets to list as samples; leave at 0 unless you need specific connections", "default": 0},
+                    "top_n": {"type": "integer", "description": "Number of busiest ports and peers to return", "default": 5}
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_process_info",
+            "description": "Details for one process: command line, parent chain, threads, open fds, cumulative CPU seconds, and totals for everything it spawned",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pid": {"type": "integer", "description": "Process ID"}
+                },
+                "required": ["pid"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_process_tree",
+            "description": "A process's descendants down to a depth, each with CPU%, RSS and subtree totals (process count, summed CPU%, RSS, threads); pid 1 covers all user-space processes",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pid": {"type": "integer", "description": "Root process ID"},
+                    "depth": {"type": "integer", "description": "Levels of children to list", "default": 2}
+                },
+                "required": ["pid"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_open_files",
+            "description": "A process's open file descriptors: total count, counts by type (file, socket, pipe, anon, device), top directories, deleted files still held open, a sample of the fds, and fd growth per hour when the daemon has been tracking it",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pid": {"type": "integer", "description": "Process ID"},
+                    "limit": {"type": "integer", "description": "Maximum individual fds to list", "default": 100}
+                },
+                "required": ["pid"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -116,12 +285,14 @@ AVAILABLE_TOOLS = [
         "type": "function", 
         "function": {
             "name": "analyze_trends",
-            "description": "Analyze CPU/memory trends over time from snapshot history",
+            "description": "Analyze metric trends over time: min/max/avg, percentiles, rolling average, slope per hour, EWMA and change points",
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "metric": {"type": "string", "enum": ["cpu", "memory", "both"], "description": "Which metric to analyze", "default": "both"},
-                    "window_minutes": {"type": "integer", "description": "Time window to analyze in minutes", "default": 10}
+                    "metric": {"type": "string", "enum": ["cpu", "memory", "load", "iowait", "disk", "process_rss", "both", "all"], "description": "Which metric to analyze (both = cpu and memory)", "default": "both"},
+                    "window_minutes": {"type": "integer", "description": "Time window to analyze in minutes (hours or days work too)", "default": 10},
+                    "process_name": {"type": "string", "description": "Process to track RSS for (metric process_rss)"},
+                    "mount": {"type": "string", "description": "Mount point to track (metric disk); defaults to the fullest mount"}
                 },
                 "required": []
             }
@@ -131,7 +302,7 @@ AVAILABLE_TOOLS = [
         "type": "function",
         "function": {
             "name": "find_process_history",
-            "description": "Track a specific process across snapshots",
+            "description": "Track a specific process over time (CPU%, RSS, threads, fds per sample), including after it has exited",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -144,9 +315,28 @@ AVAILABLE_TOOLS = [
     }
 ]
 
+# Recent tool results, so repeat and narrower calls skip the scan
+TOOL_CACHE = ToolCache()
+
 def execute_tool_call(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-    """Execute a tool call and return the result."""
+    """Execute a tool call and return the result, from TOOL_CACHE when fresh."""
+    result = TOOL_CACHE.get(tool_name, arguments)
+    if result is not None:
+        logging.debug(f"Tool {tool_name} answered from cache")
+        return result
+    result = _run_tool_call(tool_name, arguments)
+    TOOL_CACHE.put(tool_name, arguments, result)
+    return result
+
+def _run_tool_call(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
     try:
+        op = DAEMON_TOOL_OPS.get(tool_name)
+        if op:
+            result = query_daemon(op, **arguments)
+            if result is not None:
+                return result
+
+        # No daemon to ask: scan from this process instead
         if tool_name == "get_current_snapshot":
             return get_snapshot()
         elif tool_name == "get_top_cpu_processes":
@@ -159,6 +349,19 @@ def execute_tool_call(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, An
             paths = arguments.get("paths")
             top_n = arguments.get("top_n", 5)
             return disk_usage(paths=paths, top_n=top_n)
+        elif tool_name == "get_disk_io":
+            return disk_io_brief(top_n=arguments.get("top_n", 5))
+        elif tool_name == "get_network_io":
+            return net_io_brief(top_n=arguments.get("top_n", 5))
+        elif tool_name == "get_network_connections":
+            return connections_summary(limit=arguments.get("limit", 0), states=arguments.get("states"),
+                                       top_n=arguments.get("top_n", 5))
+        elif tool_name == "get_process_info":
+            return process_info(arguments["pid"])
+        elif tool_name == "get_process_tree":
+            return proc_tree(arguments["pid"], depth=arguments.get("depth", 2))
+        elif tool_name == "get_open_files":
+            return list_open_files(arguments["pid"], limit=arguments.get("limit", 100))
         elif tool_name == "get_snapshot_history":
             return get_snapshot_history(arguments)
         elif tool_name == "analyze_trends":
@@ -171,6 +374,60 @@ def execute_tool_call(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, An
         logging.error(f"Tool execution error for {tool_name}: {e}")
         return {"error": str(e)}
 
+# Tool calls from one model response run concurrently on this pool
+TOOL_WORKERS = 4
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+# Seconds each tool may take before the round moves on without it
+DEFAULT_TOOL_TIMEOUT_S = 10.0
+TOOL_TIMEOUTS_S = {
+    "analyze_trends": 20.0,
+    "find_process_history": 20.0,
+}
+
+def execute_tool_calls(tool_calls: List[Dict[str, Any]],
+                       deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Run one round of tool calls concurrently; results come back in call order.
+
+    Calls with the same name and arguments run once and share the result, and
+    overlapping process scans share one read of the process table (see
+    ProcessRegistry.scan). A tool that overruns its timeout, or the
+    perf_counter() deadline, is reported as an error and cancelled if it has
+    not started; one already running finishes in the background, and its
+    daemon query gives up within DAEMON_QUERY_TIMEOUT_S.
+    """
+    started = time.perf_counter()
+    futures = {}
+    pending = []
+    for tool_call in tool_calls:
+        name = tool_call["function"]["name"]
+        try:
+            arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+        except json.JSONDecodeError as e:
+            pending.append((name, None, {"error": f"Invalid arguments: {e}"}))
+            continue
+        key = (name, json.dumps(arguments, sort_keys=True))
+        if key not in futures:
+            futures[key] = _tool_pool.submit(execute_tool_call, name, arguments)
+        pending.append((name, futures[key], None))
+
+    results = []
+    for name, future, result in pending:
+        if future is not None:
+            timeout_s = TOOL_TIMEOUTS_S.get(name, DEFAULT_TOOL_TIMEOUT_S)
+            cutoff = started + timeout_s if deadline is None else min(started + timeout_s, deadline)
+            try:
+                result = future.result(timeout=max(cutoff - time.perf_counter(), 0))
+            except FutureTimeout:
+                future.cancel()
+                reason = f"timed out after {timeout_s:g}s" if cutoff < (deadline or math.inf) else "cut off by the turn budget"
+                logging.warning(f"Tool {name} {reason}")
+                result = {"error": f"{name} {reason}"}
+        results.append(result)
+    logging.info(f"Tool round: {len(tool_calls)} calls ({len(futures)} distinct) "
+                 f"in {time.perf_counter() - started:.3f}s")
+    return results
+
 def get_snapshot_history(args: Dict[str, Any]) -> Dict[str, Any]:
     """Get historical snapshots from the ring buffer."""
     if not _snapshot_buffer:
@@ -184,6 +441,8 @@ def get_snapshot_history(args: Dict[str, Any]) -> Dict[str, Any]:
         target_time = time.time() - (minutes_ago * 60)
         relevant_snapshots = []
         for snapshot in _snapshot_buffer:
+            if "error" in snapshot:
+                continue
             if abs(snapshot["timestamp"] - target_time) < 300:  # Within 5 minutes
                 relevant_snapshots.append({
                     "timestamp": snapshot["timestamp"],
@@ -193,62 +452,111 @@ def get_snapshot_history(args: Dict[str, Any]) -> Dict[str, Any]:
                 })
         return {"snapshots": relevant_snapshots[:last_n]}
     else:
-        # Get the last N snapshots
-        recent_snapshots = list(_snapshot_buffer)[-last_n:]
+        # Get the last N snapshots (the ring reads only those; a deque is sliced)
+        if hasattr(_snapshot_buffer, "last"):
+            recent_snapshots = _snapshot_buffer.last(last_n)
+        else:
+            recent_snapshots = list(_snapshot_buffer)[-last_n:]
         simplified = []
         for snapshot in recent_snapshots:
+            if "error" in snapshot:
+                continue
+            top_cpu = snapshot.get("top_cpu_processes")
+            top_mem = snapshot.get("top_mem_processes")
             simplified.append({
                 "timestamp": snapshot["timestamp"],
                 "cpu_percent": snapshot["cpu_percent"], 
                 "memory_percent": snapshot["memory"]["percent_used"],
                 "load_avg": snapshot["load_avg"],
-                "top_cpu_process": snapshot["top_cpu_processes"][0]["name"] if snapshot["top_cpu_processes"] else "unknown",
-                "top_memory_process": snapshot["top_mem_processes"][0]["name"] if snapshot["top_mem_processes"] else "unknown"
+                "top_cpu_process": top_cpu[0]["name"] if top_cpu else "unknown",
+                "top_memory_process": top_mem[0]["name"] if top_mem else "unknown"
             })
         return {"snapshots": simplified}
 
-def analyze_trends(args: Dict[str, Any]) -> Dict[str, Any]:
-    """Analyze CPU/memory trends over time."""
-    if not _snapshot_buffer or len(_snapshot_buffer) < 2:
-        return {"error": "Insufficient snapshot history for trend analysis"}
-    
+# analyze_trends series -> daemon rollup series
+TREND_ROLLUP_METRICS = {"cpu": "cpu_percent", "memory": "memory_percent", "load": "load_1m", "iowait": "iowait_percent"}
+
+def _trend_readers(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Series analyze_trends was asked for: name -> snapshot reader."""
     metric = args.get("metric", "both")
-    window_minutes = args.get("window_minutes", 10)
+    if metric == "both":
+        names = ["cpu", "memory"]
+    elif metric == "all":
+        names = list(SNAPSHOT_SERIES) + ["disk"] + (["process_rss"] if args.get("process_name") else [])
+    else:
+        names = [metric]
     
-    # Get snapshots within the time window
-    cutoff_time = time.time() - (window_minutes * 60)
-    relevant_snapshots = [s for s in _snapshot_buffer if s["timestamp"] >= cutoff_time]
+    readers = {}
+    for name in names:
+        if name in SNAPSHOT_SERIES:
+            readers[name] = SNAPSHOT_SERIES[name]
+        elif name == "disk":
+            readers[name] = disk_percent_reader(args.get("mount"))
+        elif name == "process_rss" and args.get("process_name"):
+            readers[name] = process_rss_reader(args["process_name"])
+    return readers
+
+def _trends_from_rollups(names: List[str], window_minutes: int) -> Dict[str, Any]:
+    """Trend stats from the daemon's rollups, for windows longer than the snapshot buffer."""
+    names = [n for n in names if n in TREND_ROLLUP_METRICS]
+    if not names:
+        return {}
+    result = query_daemon("rollups", window_minutes=window_minutes,
+                          metrics=[TREND_ROLLUP_METRICS[n] for n in names])
+    if result is None:
+        return {}
     
-    if len(relevant_snapshots) < 2:
-        return {"error": f"Not enough snapshots in the last {window_minutes} minutes"}
+    trends = {}
+    for name, series in zip(names, result["series"]):
+        stats = analyze_points(series["points"])
+        if stats is not None:
+            stats["resolution"] = series["resolution"]
+            trends[name] = stats
+    return trends
+
+def _process_rss_trend(process_name: str, window_minutes: int) -> Optional[Dict[str, Any]]:
+    """RSS trend from the daemon's per-process history, which has a sample at every scan once a process is tracked."""
+    result = query_daemon("process_rss", process_name=process_name, since=time.time() - window_minutes * 60)
+    if not result or not result["points"]:
+        return None
+    stats = analyze_points(result["points"])
+    if stats is not None:
+        stats.update(source="process_history", processes=result["processes"],
+                     tracked_since=result["tracked_since"])
+    return stats
+
+def analyze_trends(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze metric trends (cpu/memory/load/iowait/disk/process RSS) over time."""
+    window_minutes = args.get("window_minutes", 10)
+    cutoff_time = time.time() - (window_minutes * 60)
+    readers = _trend_readers(args)
+    if not readers:
+        return {"error": "process_rss needs a process_name"}
     
+    # The snapshot buffer only holds the most recent samples; longer windows
+    # come from the daemon's rollups where a rolled-up series exists
     trends = {}
+    if not _snapshot_buffer or _snapshot_buffer[0]["timestamp"] > cutoff_time:
+        trends = _trends_from_rollups(list(readers), window_minutes)
+    if "process_rss" in readers:
+        stats = _process_rss_trend(args["process_name"], window_minutes)
+        if stats is not None:
+            trends["process_rss"] = stats
     
-    if metric in ["cpu", "both"]:
-        cpu_values = [s["cpu_percent"] for s in relevant_snapshots]
-        trends["cpu"] = {
-            "min": min(cpu_values),
-            "max": max(cpu_values),
-            "avg": sum(cpu_values) / len(cpu_values),
-            "current": cpu_values[-1],
-            "change": cpu_values[-1] - cpu_values[0],
-            "trend": "increasing" if cpu_values[-1] > cpu_values[0] else "decreasing"
-        }
+    remaining = {name: read for name, read in readers.items() if name not in trends}
+    if remaining and _snapshot_buffer:
+        relevant_snapshots = [s for s in _snapshot_buffer if s["timestamp"] >= cutoff_time]
+        trends.update(analyze(relevant_snapshots, remaining))
+        if "process_rss" in remaining and "process_rss" in trends:
+            # Top-10 lists only: say how much of the series is really there
+            trends["process_rss"].update(source="top_memory_lists",
+                                         **(coverage(relevant_snapshots, remaining["process_rss"]) or {}))
     
-    if metric in ["memory", "both"]:
-        mem_values = [s["memory"]["percent_used"] for s in relevant_snapshots]
-        trends["memory"] = {
-            "min": min(mem_values),
-            "max": max(mem_values), 
-            "avg": sum(mem_values) / len(mem_values),
-            "current": mem_values[-1],
-            "change": mem_values[-1] - mem_values[0],
-            "trend": "increasing" if mem_values[-1] > mem_values[0] else "decreasing"
-        }
+    if not trends:
+        return {"error": f"Not enough snapshots in the last {window_minutes} minutes"}
     
     return {
         "time_window_minutes": window_minutes,
-        "snapshots_analyzed": len(relevant_snapshots),
         "trends": trends
     }
 
@@ -262,38 +570,37 @@ def find_process_history(args: Dict[str, Any]) -> Dict[str, Any]:
     
     process_history = []
     
-    for snapshot in _snapshot_buffer:
-        # Check both CPU and memory process lists
-        found_processes = []
+    # Each process scan once, however many samples repeat it
+    for snapshot in tier_samples(_snapshot_buffer, "processes"):
+        # Check both CPU and memory process lists, merging a pid found in both
+        found_processes = {}
         
         for proc in snapshot.get("top_cpu_processes", []):
             if (proc["name"] == process_name and 
                 (not target_pid or proc["pid"] == target_pid)):
-                found_processes.append({
+                found_processes[proc["pid"]] = {
                     "timestamp": snapshot["timestamp"],
                     "pid": proc["pid"],
                     "cpu_percent": proc["cpu_percent"],
                     "type": "cpu_list"
-                })
+                }
         
         for proc in snapshot.get("top_mem_processes", []):
             if (proc["name"] == process_name and 
                 (not target_pid or proc["pid"] == target_pid)):
-                # Avoid duplicates if process is in both lists
-                existing = next((p for p in found_processes 
-                               if p["timestamp"] == snapshot["timestamp"] and p["pid"] == proc["pid"]), None)
+                existing = found_processes.get(proc["pid"])
                 if existing:
                     existing["rss_mb"] = proc["rss_mb"]
                     existing["type"] = "both_lists"
                 else:
-                    found_processes.append({
+                    found_processes[proc["pid"]] = {
                         "timestamp": snapshot["timestamp"],
                         "pid": proc["pid"],
                         "rss_mb": proc["rss_mb"],
                         "type": "memory_list"
-                    })
+                    }
         
-        process_history.extend(found_processes)
+        process_history.extend(found_processes.values())
     
     return {
         "process_name": process_name,
@@ -306,23 +613,35 @@ def format_snapshot_context(snapshot_buffer: deque) -> str:
     if not snapshot_buffer:
         return "No recent snapshots available."
     
-    # Get the most recent snapshot
-    latest = snapshot_buffer[-1]
+    # Failed samples carry only timestamp, hostname and error
+    recent = list(snapshot_buffer)[-5:]
+    valid = [s for s in recent if "error" not in s]
+    context = ""
+    if "error" in recent[-1]:
+        context += f"Latest sample failed: {recent[-1]['error']}\n"
+    if not valid:
+        return context + "No recent successful snapshots available."
+    latest = valid[-1]
+    memory = latest.get("memory") or {}
+    top_cpu_procs = latest.get("top_cpu_processes") or []
+    top_mem_procs = latest.get("top_mem_processes") or []
     
-    context = f"""Recent System State:
+    context += f"""Recent System State:
 - Timestamp: {latest['timestamp']}
-- CPU Usage: {latest['cpu_percent']}%
-- Memory: {latest['memory']['percent_used']}% used ({latest['memory']['available_gb']:.1f}GB free)
-- Load Average: {latest['load_avg']}
-- Top CPU Process: {latest['top_cpu_processes'][0]['name']} ({latest['top_cpu_processes'][0]['cpu_percent']}%)
-- Top Memory Process: {latest['top_mem_processes'][0]['name']} ({latest['top_mem_processes'][0]['rss_mb']:.1f}MB)
+- CPU Usage: {latest.get('cpu_percent')}%
+- Memory: {memory.get('percent_used')}% used ({memory.get('available_gb', 0):.1f}GB free)
+- Load Average: {latest.get('load_avg')}
 """
+    if top_cpu_procs:
+        context += f"- Top CPU Process: {top_cpu_procs[0]['name']} ({top_cpu_procs[0]['cpu_percent']}%)\n"
+    if top_mem_procs:
+        context += f"- Top Memory Process: {top_mem_procs[0]['name']} ({top_mem_procs[0]['rss_mb']:.1f}MB)\n"
     
     # If we have multiple snapshots, show trend
-    if len(snapshot_buffer) > 1:
-        older = snapshot_buffer[-5] if len(snapshot_buffer) >= 5 else snapshot_buffer[0]
+    if len(valid) > 1:
+        older = valid[0]
         cpu_trend = latest['cpu_percent'] - older['cpu_percent']
-        mem_trend = latest['memory']['percent_used'] - older['memory']['percent_used']
+        mem_trend = memory['percent_used'] - older['memory']['percent_used']
         
         context += f"""
 Recent Trends:
@@ -332,74 +651,290 @@ Recent Trends:
     
     return context
 
-def create_prompt_and_get_response(question: str, snapshot_buffer: Optional[deque] = None) -> str:
-    """
-    Creates a prompt with system context, sends it to the OpenAI API, and returns the response.
+def get_digest_context() -> Optional[str]:
+    """The daemon's precomputed digest as prompt context; None without a daemon."""
+    digest = query_daemon("digest")
+    if not digest or not digest.get("current"):
+        return None
+    return format_digest(digest)
+
+# Per-turn limits for the tool loop. When the budget runs low the model is
+# asked to answer from what it has gathered, without further tools.
+MAX_TOOL_ROUNDS = 5
+TURN_BUDGET_S = 60.0
+TURN_TOKEN_BUDGET = 30000
+# Time held back from tool rounds for the final answer
+FINAL_ANSWER_RESERVE_S = 15.0
+BUDGET_NOTE = ("Tool budget for this question is used up. Answer now from the tool results "
+               "above, and say what you would check next.")
+
+def _stream_completion(client: OpenAI, messages: List[Any], on_token: Callable[[str], None],
+                       timing: Dict[str, Any], deadline: float,
+                       **kwargs) -> Tuple[str, List[Dict[str, Any]], int]:
+    """One streamed completion: forwards content tokens as they arrive and
+    reassembles any tool calls from their fragments. Stops reading at deadline."""
+    content = []
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    tokens = 0
+    stream = client.chat.completions.create(model=MODEL, messages=messages, stream=True,
+                                            stream_options={"include_usage": True}, **kwargs)
+    with stream:
+        for chunk in stream:
+            if chunk.usage:
+                tokens = chunk.usage.total_tokens
+            if time.perf_counter() > deadline:
+                logging.warning("Turn budget ran out mid-stream; answer truncated")
+                on_token(" [truncated: time budget reached]")
+                break
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                if "first_token_s" not in timing:
+                    timing["first_token_s"] = time.perf_counter() - timing["started"]
+                content.append(delta.content)
+                on_token(delta.content)
+            for fragment in delta.tool_calls or []:
+                call = tool_calls.setdefault(fragment.index, {"id": None, "type": "function",
+                                                              "function": {"name": "", "arguments": ""}})
+                if fragment.id:
+                    call["id"] = fragment.id
+                if fragment.function:
+                    call["function"]["name"] += fragment.function.name or ""
+                    call["function"]["arguments"] += fragment.function.arguments or ""
+    return "".join(content), [tool_calls[i] for i in sorted(tool_calls)], tokens
+
+def _complete(client: OpenAI, messages: List[Any], on_token: Optional[Callable[[str], None]],
+              timing: Dict[str, Any], deadline: float,
+              **kwargs) -> Tuple[Optional[str], List[Dict[str, Any]], int]:
+    """One completion, streamed or not: (content, tool_calls, total tokens)."""
+    client = client.with_options(timeout=max(deadline - time.perf_counter(), 1.0))
+    if on_token is not None:
+        return _stream_completion(client, messages, on_token, timing, deadline, **kwargs)
+    response = client.chat.completions.create(model=MODEL, messages=messages, **kwargs)
+    message = response.choices[0].message
+    tool_calls = [{"id": tc.id, "type": "function",
+                   "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
+                  for tc in message.tool_calls or []]
+    return message.content, tool_calls, response.usage.total_tokens if response.usage else 0
+
+# Smallest change worth reporting in a snapshot delta: label -> (reader, threshold, unit)
+DELTA_METRICS = {
+    "CPU": (lambda s: s.get("cpu_percent"), 5.0, "%"),
+    "Memory used": (lambda s: (s.get("memory") or {}).get("percent_used"), 2.0, "%"),
+    "Memory available": (lambda s: (s.get("memory") or {}).get("available_gb"), 0.5, "GB"),
+    "Load (1m)": (lambda s: (s.get("load_avg") or [None])[0], 0.5, ""),
+    "IO wait": (lambda s: s.get("cpu_iowait_percent"), 5.0, "%"),
+}
+# Leading entries of each process ranking compared between turns
+DELTA_TOP_N = 3
+
+def format_snapshot_delta(previous: Dict[str, Any], latest: Dict[str, Any]) -> str:
+    """What changed between the snapshot sent on an earlier turn and the latest one."""
+    if latest.get("timestamp") == previous.get("timestamp"):
+        return "No new sample since the previous question."
+    elapsed = latest["timestamp"] - previous["timestamp"]
+    if "error" in latest:
+        return f"Latest sample ({elapsed:.0f}s later) failed: {latest['error']}"
+    
+    lines = []
+    for label, (read, threshold, unit) in DELTA_METRICS.items():
+        before, after = read(previous), read(latest)
+        if before is not None and after is not None and abs(after - before) >= threshold:
+            lines.append(f"- {label}: {before:.1f}{unit} -> {after:.1f}{unit} ({after - before:+.1f})")
+    
+    for label, key, field, unit in (("CPU", "top_cpu_processes", "cpu_percent", "%"),
+                                    ("memory", "top_mem_processes", "rss_mb", "MB")):
+        before = {(p["pid"], p["name"]) for p in (previous.get(key) or [])[:DELTA_TOP_N]}
+        after = (latest.get(key) or [])[:DELTA_TOP_N]
+        for proc in after:
+            if (proc["pid"], proc["name"]) not in before:
+                lines.append(f"- New in top {label}: {proc['name']} (pid {proc['pid']}, {proc[field]:.1f}{unit})")
+        gone = before - {(p["pid"], p["name"]) for p in after}
+        for pid, name in sorted(gone):
+            lines.append(f"- Left top {label}: {name} (pid {pid})")
+    
+    if not lines:
+        return f"No significant change in the {elapsed:.0f}s since the previous question."
+    return f"Changes in the {elapsed:.0f}s since the previous question:\n" + "\n".join(lines)
+
+# Conversation history beyond this many tokens has its older turns summarized
+HISTORY_TOKEN_LIMIT = 6000
+# Most recent turns always kept verbatim, tool results included
+KEEP_RECENT_TURNS = 2
+# Characters of each summarized answer that are kept
+SUMMARY_ANSWER_CHARS = 300
+# Summarized turns kept; older ones are dropped entirely
+SUMMARY_MAX_TURNS = 20
+
+class ChatSession:
+    """One chat conversation: message history, tool loop and what context was already sent.
+
+    Recent turns are resent verbatim, tool calls and results included, so a
+    follow-up can build on earlier findings instead of calling the same tools
+    again. Older turns are folded into a short summary of questions and
+    answers once the history outgrows HISTORY_TOKEN_LIMIT.
     """
-    try:
-        client = OpenAI()
-        
-        # Build context from snapshot buffer
-        context = ""
-        if snapshot_buffer:
-            context = format_snapshot_context(snapshot_buffer)
-        
-        # Enhanced prompt with context
-        enhanced_question = f"""System Context:
-{context}
 
-User Question: {question}
+    def __init__(self, snapshot_buffer: Optional[deque] = None, fast_path: bool = True):
+        self.snapshot_buffer = snapshot_buffer
+        # Answer clear-cut questions from the local rules without calling the model
+        self.fast_path = fast_path
+        self.turns: List[List[Any]] = []
+        self.summary: deque = deque(maxlen=SUMMARY_MAX_TURNS)
+        self._sent_snapshot: Optional[Dict[str, Any]] = None
 
-Please analyze the system state and provide diagnostic insights."""
+    def _context_for_turn(self) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Full context on the first turn, only the delta after that."""
+        latest = self.snapshot_buffer[-1] if self.snapshot_buffer else None
+        if latest is None:
+            context = get_digest_context() or "No recent snapshots available."
+            return f"System Context:\n{context}", None
+        if self._sent_snapshot is None:
+            # The daemon's digest already has deltas, movers and breaches extracted
+            context = get_digest_context() or format_snapshot_context(self.snapshot_buffer)
+            return f"System Context:\n{context}", latest
+        return f"System Update:\n{format_snapshot_delta(self._sent_snapshot, latest)}", latest
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": enhanced_question}
-            ],
-            tools=AVAILABLE_TOOLS,
-            tool_choice="auto"
-        )
-        
-        # Handle tool calls if the model wants to use them
-        message = response.choices[0].message
-        
-        if message.tool_calls:
-            # Execute tool calls and get results
-            tool_results = []
-            for tool_call in message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                result = execute_tool_call(function_name, function_args)
-                tool_results.append({
-                    "tool_call_id": tool_call.id,
-                    "result": json.dumps(result)
-                })
+    def _recent_snapshots(self) -> List[Dict[str, Any]]:
+        if not self.snapshot_buffer:
+            return []
+        if hasattr(self.snapshot_buffer, "last"):
+            return self.snapshot_buffer.last(RULE_WINDOW)
+        return list(self.snapshot_buffer)[-RULE_WINDOW:]
+
+    def _history(self) -> List[Any]:
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if self.summary:
+            messages.append({"role": "system", "content": "Summary of earlier conversation:\n" + "\n".join(self.summary)})
+        for turn in self.turns:
+            messages.extend({k: v for k, v in m.items() if k != "question"} for m in turn)
+        return messages
+
+    def history_tokens(self) -> int:
+        return estimate_tokens(json.dumps(self._history(), default=str))
+
+    def _compact_history(self) -> None:
+        """Fold the oldest turns into the summary until the history fits."""
+        while len(self.turns) > KEEP_RECENT_TURNS and self.history_tokens() > HISTORY_TOKEN_LIMIT:
+            turn = self.turns.pop(0)
+            question, answer = turn[0]["question"], turn[-1]["content"] or ""
+            if len(answer) > SUMMARY_ANSWER_CHARS:
+                answer = answer[:SUMMARY_ANSWER_CHARS].rsplit(" ", 1)[0] + " ..."
+            self.summary.append(f"- Q: {question}\n  A: {answer}")
+            logging.info(f"ChatSession: summarized a turn, history now {self.history_tokens()} tokens")
+
+    def ask(self, question: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Sends the question with the conversation so far and returns the answer.
+
+        Questions the local rules can settle (see diagnosis.answer_locally) are
+        answered without the model; otherwise rule findings go along as hints,
+        and they are the answer if the model cannot be reached. The model may
+        call tools for up to MAX_TOOL_ROUNDS rounds, within TURN_BUDGET_S and
+        TURN_TOKEN_BUDGET; then it must answer. With on_token, every API call
+        is streamed and each content token is passed to on_token as it
+        arrives; the full response is still returned. If the turn fails, even
+        after tokens were streamed, the fallback text is returned and
+        last_turn_timing["failed"] is set.
+        """
+        global last_turn_timing
+        started = time.perf_counter()
+        deadline = started + TURN_BUDGET_S
+        timing = {"started": started, "rounds": 0, "tokens": 0}
+        snapshots: List[Dict[str, Any]] = []
+        findings: List[Dict[str, Any]] = []
+        try:
+            snapshots = self._recent_snapshots()
+            findings = run_rules(snapshots, parents=_top_parents)
+            local = answer_locally(question, snapshots, findings) if self.fast_path else None
+            if local is not None:
+                timing["local"] = True
+                timing["first_token_s"] = time.perf_counter() - started
+                if on_token is not None:
+                    on_token(local)
+                self.turns.append([{"role": "user", "content": question, "question": question},
+                                   {"role": "assistant", "content": local}])
+                logging.info(f"Answered locally: {question!r}")
+                return local
+
+            client = get_client()
             
-            # Send tool results back to the model
-            messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": enhanced_question},
-                message,
-            ]
+            context, snapshot = self._context_for_turn()
+            hints = f"\n\nLocal rule-based findings (verify before relying on them):\n{format_findings(findings)}" if findings else ""
             
-            # Add tool results
-            for tr in tool_results:
-                messages.append({
-                    "role": "tool", 
-                    "tool_call_id": tr["tool_call_id"], 
-                    "content": tr["result"]
-                })
+            # Enhanced prompt with context
+            enhanced_question = f"""{context}{hints}
+
+User Question: {question}
+
+Please analyze the system state and provide diagnostic insights."""
+
+            # "question" is kept for summaries and stripped before sending
+            turn = [{"role": "user", "content": enhanced_question, "question": question}]
+            history = self._history()
+
+            def request_messages():
+                return history + [{k: v for k, v in m.items() if k != "question"} for m in turn]
+
+            while True:
+                round_started = time.perf_counter()
+                in_budget = (timing["rounds"] < MAX_TOOL_ROUNDS
+                             and timing["tokens"] < TURN_TOKEN_BUDGET
+                             and deadline - round_started > FINAL_ANSWER_RESERVE_S)
+                messages = request_messages()
+                if not in_budget:
+                    messages.append({"role": "system", "content": BUDGET_NOTE})
+                tool_kwargs = {"tools": AVAILABLE_TOOLS, "tool_choice": "auto"} if in_budget else {}
+                content, tool_calls, tokens = _complete(client, messages, on_token, timing, deadline, **tool_kwargs)
+                timing["tokens"] += tokens
+                model_s = time.perf_counter() - round_started
+                if not tool_calls:
+                    logging.info(f"Round {timing['rounds'] + 1}: answer in {model_s:.3f}s, {tokens} tokens")
+                    break
+
+                # Execute tool calls concurrently; none may outlive the tool-round budget
+                timing["rounds"] += 1
+                results = execute_tool_calls(tool_calls, deadline=deadline - FINAL_ANSWER_RESERVE_S)
+                logging.info(f"Round {timing['rounds']}: model {model_s:.3f}s, {len(tool_calls)} tool calls "
+                             f"({', '.join(tc['function']['name'] for tc in tool_calls)}) in "
+                             f"{time.perf_counter() - round_started - model_s:.3f}s, {tokens} tokens")
+                
+                # Send tool results back to the model
+                turn.append({"role": "assistant", "content": content or None, "tool_calls": tool_calls})
+                for tool_call, result in zip(tool_calls, results):
+                    turn.append({
+                        "role": "tool", 
+                        "tool_call_id": tool_call["id"], 
+                        "content": compact_tool_result(tool_call["function"]["name"], result)
+                    })
             
-            final_response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages
-            )
-            return final_response.choices[0].message.content
-        
-        return message.content
-        
-    except Exception as e:
-        logging.error(f"Error communicating with OpenAI API: {e}")
-        return "Error: Unable to get response from the language model."
+            # Only completed turns join the history
+            turn.append({"role": "assistant", "content": content})
+            self.turns.append(turn)
+            if snapshot is not None:
+                self._sent_snapshot = snapshot
+            self._compact_history()
+            return content
+
+        except Exception as e:
+            logging.error(f"Error communicating with OpenAI API: {e}")
+            # Tokens may already have been streamed; the caller still shows this answer
+            timing["failed"] = True
+            if snapshots:
+                return f"Could not reach the language model; local diagnosis:\n{offline_answer(snapshots, findings)}"
+            return "Error: Unable to get response from the language model."
+        finally:
+            timing["total_s"] = time.perf_counter() - timing.pop("started")
+            last_turn_timing = timing
+            logging.info(f"Turn timing: first token {timing.get('first_token_s', 0):.3f}s, "
+                         f"total {timing['total_s']:.3f}s, {timing['rounds']} tool rounds, {timing['tokens']} tokens")
+
+def create_prompt_and_get_response(question: str, snapshot_buffer: Optional[deque] = None,
+                                   on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Creates a prompt with system context, sends it to the OpenAI API, and returns the response.
+
+    A one-question ChatSession; use a ChatSession directly to keep context across questions.
+    """
+    return ChatSession(snapshot_buffer).ask(question, on_token)
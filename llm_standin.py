@@ -0,0 +1,171 @@
+"""
+Local OpenAI-compatible stand-in server for exercising the chat client offline.
+
+Serves POST /v1/chat/completions over HTTP/1.1 keep-alive. When the request
+offers tools and fewer than tool_rounds rounds of tool calls have been made,
+it answers with the next tool call from TOOL_SEQUENCE; otherwise it answers
+with a short canned reply. Both plain and streamed ("stream": true) responses are supported.
+With drop_after, a streamed answer is cut off after that many content chunks
+by closing the connection mid-body, as a dropped network link would.
+
+Run with --bench to compare per-turn latency of a fresh client per turn
+against the shared pooled client:
+
+    python llm_standin.py --bench --turns 50
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+REPLY = "CPU is mostly idle; the top process is the stand-in server itself."
+# Tool called in each successive round
+TOOL_SEQUENCE = [("get_current_snapshot", {}), ("get_top_cpu_processes", {"n": 5}),
+                 ("find_process_history", {"process_name": "python"})]
+USAGE = {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs stall every reused connection by ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+
+        rounds = sum(1 for m in request.get("messages", []) if m.get("tool_calls"))
+        if request.get("tools") and rounds < self.server.tool_rounds:
+            name, arguments = TOOL_SEQUENCE[rounds % len(TOOL_SEQUENCE)]
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)}}]}
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": REPLY}
+            finish_reason = "stop"
+
+        if request.get("stream"):
+            self._stream(request, message, finish_reason)
+        else:
+            self._send_json({
+                "id": f"chatcmpl-{uuid.uuid4().hex[:8]}", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "stand-in"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": USAGE
+            })
+
+    def _send_json(self, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, request: Dict[str, Any], message: Dict[str, Any], finish_reason: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:8]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": request.get("model", "stand-in")}
+
+        if message.get("tool_calls"):
+            call = message["tool_calls"][0]
+            deltas = [{"role": "assistant", "tool_calls": [{"index": 0, **call}]}]
+        else:
+            words = message["content"].split(" ")
+            deltas = [{"role": "assistant", "content": ""}] + [
+                {"content": w if i == 0 else " " + w} for i, w in enumerate(words)]
+        for i, delta in enumerate(deltas):
+            if self.server.drop_after is not None and i > self.server.drop_after:
+                self.close_connection = True  # no terminating chunk: the client sees a truncated body
+                return
+            self._chunk({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            if self.server.token_delay_s:
+                time.sleep(self.server.token_delay_s)
+        self._chunk({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._chunk({**base, "choices": [], "usage": USAGE})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, body: Dict[str, Any]) -> None:
+        self._write_chunk(f"data: {json.dumps(body)}\n\n".encode())
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_standin(port: int = 0, latency_s: float = 0.0, token_delay_s: float = 0.0,
+                  tool_rounds: int = 1, drop_after: Optional[int] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stand-in in a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.latency_s = latency_s
+    server.token_delay_s = token_delay_s
+    server.tool_rounds = tool_rounds
+    server.drop_after = drop_after
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def _bench(turns: int, latency_s: float) -> None:
+    from openai import OpenAI
+    import llm_api_client
+
+    server, base_url = start_standin(latency_s=latency_s)
+    question = [{"role": "user", "content": "what's eating my CPU?"}]
+
+    def turn(client) -> float:
+        start = time.perf_counter()
+        client.chat.completions.create(model="gpt-4o-mini", messages=question)
+        return time.perf_counter() - start
+
+    fresh = [turn(OpenAI(base_url=base_url, api_key="stand-in")) for _ in range(turns)]
+    llm_api_client.configure_client(base_url=base_url, api_key="stand-in")
+    turn(llm_api_client.get_client())  # first turn opens the pooled connection
+    pooled = [turn(llm_api_client.get_client()) for _ in range(turns)]
+    server.shutdown()
+
+    for label, samples in (("fresh client per turn", fresh), ("shared pooled client", pooled)):
+        ordered = sorted(samples)
+        print(f"{label:>22}: mean {sum(ordered) / len(ordered) * 1000:.2f} ms, "
+              f"p50 {ordered[len(ordered) // 2] * 1000:.2f} ms, p99 {ordered[int(len(ordered) * 0.99)] * 1000:.2f} ms")
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--tool-rounds", type=int, default=1, help="Rounds of tool calls before answering")
+    parser.add_argument("--bench", action="store_true", help="Benchmark fresh vs pooled clients and exit")
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        _bench(args.turns, args.latency)
+        return
+    server, base_url = start_standin(args.port, args.latency, tool_rounds=args.tool_rounds)
+    print(f"Stand-in listening at {base_url} (set OPENAI_BASE_URL to use it). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Per-process history index maintained by the daemon.
+
+Any process that ranks in the top TRACK_TOP by CPU, RSS or open fds on some
+scan becomes tracked, and from then on every scan appends to its own
+compact series (CPU%, RSS, threads, fds) until it exits; it does not drop
+out when it leaves the top-10 lists. The fd series comes with its slope per
+hour, so a descriptor leak shows up as steady growth. Series are indexed by
+(pid, create_time) and by name, so a lookup touches only that process's
+samples. Series of processes that exited more than EVICT_AFTER_S ago are
+evicted.
+"""
+
+import bisect
+import heapq
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from analytics import np, summarize
+
+Key = Tuple[int, float]
+
+TRACK_TOP = 20
+MAX_SAMPLES = 2880
+EVICT_AFTER_S = 6 * 3600
+_MISSING = -1
+
+
+class _Series:
+    """Compact column storage for one tracked process."""
+
+    __slots__ = ('pid', 'create_time', 'name', 'exited_at', 'timestamps', 'cpu', 'rss', 'threads', 'fds')
+
+    def __init__(self, pid: int, create_time: float, name: str):
+        self.pid = pid
+        self.create_time = create_time
+        self.name = name
+        self.exited_at: Optional[float] = None
+        self.timestamps = array('d')
+        self.cpu = array('f')
+        self.rss = array('f')
+        self.threads = array('i')
+        self.fds = array('i')
+
+    def append(self, timestamp: float, record: Dict[str, Any]) -> None:
+        self.timestamps.append(timestamp)
+        self.cpu.append(record['cpu_percent'])
+        self.rss.append(record['rss_mb'])
+        threads, fds = record.get('num_threads'), record.get('num_fds')
+        self.threads.append(_MISSING if threads is None else threads)
+        self.fds.append(_MISSING if fds is None else fds)
+        if len(self.timestamps) > MAX_SAMPLES * 5 // 4:
+            # Trim in chunks so appends stay amortized O(1)
+            drop = len(self.timestamps) - MAX_SAMPLES
+            for column in (self.timestamps, self.cpu, self.rss, self.threads, self.fds):
+                del column[:drop]
+
+    def to_dict(self, limit: int) -> Dict[str, Any]:
+        n = len(self.timestamps)
+        start = max(n - limit, 0)
+        history = []
+        for i in range(start, n):
+            history.append({
+                "timestamp": self.timestamps[i],
+                "cpu_percent": round(self.cpu[i], 1),
+                "rss_mb": round(self.rss[i], 1),
+                "num_threads": None if self.threads[i] == _MISSING else self.threads[i],
+                "num_fds": None if self.fds[i] == _MISSING else self.fds[i],
+            })
+        return {
+            "pid": self.pid,
+            "create_time": self.create_time,
+            "name": self.name,
+            "first_seen": self.timestamps[0] if n else None,
+            "last_seen": self.timestamps[-1] if n else None,
+            "exited_at": self.exited_at,
+            "samples": n,
+            "max_rss_mb": round(max(self.rss), 1) if n else None,
+            "avg_cpu_percent": round(sum(self.cpu) / n, 1) if n else None,
+            "fd_slope_per_hour": self.fd_slope_per_hour(),
+            "history": history,
+        }
+
+    def fd_slope_per_hour(self) -> Optional[float]:
+        """Least-squares fd growth over the series; None below two fd samples."""
+        ts = array('d', (t for t, f in zip(self.timestamps, self.fds) if f != _MISSING))
+        vs = array('d', (f for f in self.fds if f != _MISSING))
+        stats = summarize(np.frombuffer(ts), np.frombuffer(vs)) if np is not None else summarize(ts, vs)
+        return stats["slope_per_hour"] if stats else None
+
+
+class ProcessHistoryIndex:
+    """Inverted index from name and (pid, create_time) to per-process series."""
+
+    def __init__(self, track_top: int = TRACK_TOP, evict_after_s: float = EVICT_AFTER_S):
+        self.track_top = track_top
+        self.evict_after_s = evict_after_s
+        self._series: Dict[Key, _Series] = {}
+        self._by_name: Dict[str, Set[Key]] = {}
+        self._live: Set[Key] = set()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def tracked_pids(self) -> Set[int]:
+        """Live tracked pids; the registry reads fd counts for these even where counting is not cheap."""
+        return {key[0] for key in self._live}
+
+    def update(self, records: Iterable[Dict[str, Any]], timestamp: Optional[float] = None) -> None:
+        """Fold one full process scan into the index."""
+        timestamp = time.time() if timestamp is None else timestamp
+        records = list(records)
+        newly_ranked = {id(r) for r in heapq.nlargest(self.track_top, records, key=lambda r: r['cpu_percent'])}
+        newly_ranked |= {id(r) for r in heapq.nlargest(self.track_top, records, key=lambda r: r['rss_mb'])}
+        with_fds = [r for r in records if r.get('num_fds') is not None]
+        newly_ranked |= {id(r) for r in heapq.nlargest(self.track_top, with_fds, key=lambda r: r['num_fds'])}
+
+        seen = set()
+        for record in records:
+            key = (record['pid'], record['create_time'])
+            series = self._series.get(key)
+            if series is None:
+                if id(record) not in newly_ranked:
+                    continue
+                series = self._series[key] = _Series(record['pid'], record['create_time'], record['name'])
+                self._by_name.setdefault(record['name'], set()).add(key)
+            series.append(timestamp, record)
+            seen.add(key)
+
+        for key in self._live - seen:
+            self._series[key].exited_at = timestamp
+        self._live = seen
+        self._evict(timestamp)
+
+    def _evict(self, now: float) -> None:
+        for key, series in list(self._series.items()):
+            if series.exited_at is not None and now - series.exited_at > self.evict_after_s:
+                del self._series[key]
+                names = self._by_name.get(series.name)
+                if names is not None:
+                    names.discard(key)
+                    if not names:
+                        del self._by_name[series.name]
+
+    def lookup(self, process_name: Optional[str] = None, pid: Optional[int] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """Series for every tracked process matching name and/or pid, newest first."""
+        if process_name is not None:
+            keys = self._by_name.get(process_name, set())
+            if pid:
+                keys = {k for k in keys if k[0] == pid}
+        elif pid:
+            keys = {k for k in self._series if k[0] == pid}
+        else:
+            return []
+        matches = [self._series[k] for k in keys if k in self._series]
+        matches.sort(key=lambda s: s.timestamps[-1] if len(s.timestamps) else 0, reverse=True)
+        return [s.to_dict(limit) for s in matches]
+
+    def rss_series(self, process_name: str, since: float = 0) -> Dict[str, Any]:
+        """Summed RSS of the tracked processes named process_name at each scan since `since`.
+
+        Unlike the top-10 lists in snapshots, every scan after a process is
+        first tracked has its sample, so the series has no gaps where the
+        process ranked lower; `tracked_since` says where it begins.
+        """
+        totals: Dict[float, float] = {}
+        processes = 0
+        tracked_since = None
+        for key in self._by_name.get(process_name, ()):
+            series = self._series[key]
+            start = bisect.bisect_left(series.timestamps, since)
+            if start < len(series.timestamps):
+                processes += 1
+                first = series.timestamps[0]
+                tracked_since = first if tracked_since is None else min(tracked_since, first)
+            for i in range(start, len(series.timestamps)):
+                t = series.timestamps[i]
+                totals[t] = totals.get(t, 0.0) + series.rss[i]
+        times = sorted(totals)
+        return {
+            "process_name": process_name,
+            "processes": processes,
+            "tracked_since": tracked_since,
+            "points": [{"t": t, "value": round(totals[t], 1)} for t in times],
+        }
@@ -0,0 +1,158 @@
+"""
+Long-lived process handles for the sampling loop.
+
+Keeps one psutil.Process per live process, keyed by (pid, create_time),
+along with the cpu_times seen on the previous scan, so per-process CPU%
+comes from deltas between scans instead of a blocking interval. Every scan
+also updates a parent -> children index of the live processes.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import psutil
+
+from open_files import FAST_FD_COUNT, fd_count
+from process_tree import ProcessTree
+
+BYTES_PER_MB = 1024 * 1024
+# Command lines are read once per process and kept to this length
+CMDLINE_MAX_CHARS = 300
+
+
+class _Entry:
+    """Registry slot for one live process."""
+
+    __slots__ = ('key', 'proc', 'name', 'cmdline', 'cpu_total', 'sampled_at')
+
+    def __init__(self, proc: psutil.Process, create_time: float):
+        self.key: Tuple[int, float] = (proc.pid, create_time)
+        self.proc = proc
+        self.name: Optional[str] = None
+        self.cmdline: Optional[str] = None
+        self.cpu_total: Optional[float] = None
+        self.sampled_at: Optional[float] = None
+
+
+class ProcessRegistry:
+    """Process handles and previous cpu_times kept between scans."""
+
+    def __init__(self):
+        self._entries: Dict[int, _Entry] = {}
+        # Pids that also get an fd count; every pid does where counting is one stat()
+        self.detail_pids: Set[int] = set()
+        # Records from the most recent scan, for consumers beyond the rankings
+        self.last_scan: List[Dict[str, Any]] = []
+        self.last_scan_at: Optional[float] = None
+        # Parent -> children index, updated from the differences between scans
+        self.tree = ProcessTree()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _new_entry(self, pid: int) -> Optional[_Entry]:
+        try:
+            proc = psutil.Process(pid)
+            return _Entry(proc, proc.create_time())
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def _read(self, entry: _Entry) -> Optional[Tuple[str, float, Any, int, int]]:
+        """One oneshot() read of name, cpu_times, memory_info, ppid and thread count."""
+        proc = entry.proc
+        with proc.oneshot():
+            if proc.status() == psutil.STATUS_ZOMBIE:
+                # Exited but not yet reaped; holds no CPU or memory
+                raise psutil.ZombieProcess(proc.pid)
+            cpu_times = proc.cpu_times()
+            return (proc.name(), cpu_times.user + cpu_times.system, proc.memory_info(),
+                    proc.ppid(), proc.num_threads())
+
+    def _read_cmdline(self, entry: _Entry) -> Optional[str]:
+        try:
+            return " ".join(entry.proc.cmdline())[:CMDLINE_MAX_CHARS] or None
+        except psutil.Error:
+            return None
+
+    def scan(self) -> List[Dict[str, Any]]:
+        """Sample every live process; drops entries for pids that have exited.
+
+        Concurrent callers are coalesced: a caller that arrives while a scan
+        is running waits for it and shares its records instead of rescanning.
+        """
+        requested = time.monotonic()
+        with self._lock:
+            if self.last_scan_at is not None and self.last_scan_at >= requested:
+                return self.last_scan
+            return self._scan()
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        records = []
+        seen = {}
+        access_denied_count = 0
+
+        for pid in psutil.pids():
+            entry = self._entries.get(pid)
+            if entry is None:
+                entry = self._new_entry(pid)
+                if entry is None:
+                    continue
+            try:
+                name, cpu_total, mem_info, ppid, num_threads = self._read(entry)
+                # A reused pid shows up as a name change or cpu time going
+                # backwards; start over with a fresh handle for the new process.
+                if entry.cpu_total is not None and (name != entry.name or cpu_total < entry.cpu_total):
+                    entry = self._new_entry(pid)
+                    if entry is None:
+                        continue
+                    name, cpu_total, mem_info, ppid, num_threads = self._read(entry)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            except psutil.AccessDenied:
+                access_denied_count += 1
+                continue
+
+            if entry.cpu_total is None:
+                # First sighting: average over the process lifetime so a
+                # freshly spawned hog does not rank as idle.
+                lifetime = time.time() - entry.key[1]
+                cpu_percent = cpu_total / lifetime * 100 if lifetime > 0 else 0.0
+                entry.cmdline = self._read_cmdline(entry)
+            else:
+                elapsed = now - entry.sampled_at
+                cpu_percent = (cpu_total - entry.cpu_total) / elapsed * 100 if elapsed > 0 else 0.0
+
+            entry.name = name
+            entry.cpu_total = cpu_total
+            entry.sampled_at = now
+            seen[pid] = entry
+
+            record = {
+                'pid': pid,
+                'create_time': entry.key[1],
+                'name': name,
+                'cpu_percent': round(cpu_percent, 1),
+                'rss_mb': mem_info.rss / BYTES_PER_MB,
+                'vms_mb': mem_info.vms / BYTES_PER_MB,
+                'ppid': ppid,
+                'num_threads': num_threads,
+                'cpu_time_s': round(cpu_total, 2),
+                'cmdline': entry.cmdline,
+            }
+            if FAST_FD_COUNT or pid in self.detail_pids:
+                record['num_fds'] = fd_count(pid)
+            records.append(record)
+
+        self._entries = seen
+        changes = self.tree.update(records)
+        self.last_scan = records
+        self.last_scan_at = time.monotonic()
+        if access_denied_count > 0:
+            logging.debug(f"ProcessRegistry.scan: {access_denied_count} processes inaccessible")
+        logging.debug(f"ProcessRegistry.scan: {len(records)} processes sampled, {changes['started']} started, "
+                      f"{changes['exited']} exited, {changes['reparented']} reparented")
+        return records
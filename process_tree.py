@@ -0,0 +1,161 @@
+"""
+Parent -> children index over the process registry's scans.
+
+psutil.Process.children() rescans the whole process table on every call, so
+walking a tree with it is quadratic. ProcessTree instead keeps the latest
+scan record of every process (ppid, threads, cmdline, cumulative CPU, RSS)
+and a children set per pid. Each scan only changes the index where it
+differs from the previous one: new and exited pids are linked and unlinked,
+and a process whose ppid changed (reparented after its parent exited) is
+moved. Subtree views and resource rollups then cost O(subtree size).
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Children listed per node in a subtree view; the rest are only counted
+MAX_CHILDREN_LISTED = 20
+# Fields summed over a subtree. RSS double counts shared pages, so the RSS
+# total is an upper bound on the memory the subtree really holds.
+ROLLUP_FIELDS = ('cpu_percent', 'rss_mb', 'num_threads', 'cpu_time_s')
+
+
+class ProcessTree:
+    """Latest record per pid plus a children index, updated from scan diffs."""
+
+    def __init__(self):
+        self._nodes: Dict[int, Dict[str, Any]] = {}
+        self._children: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._nodes
+
+    def _link(self, pid: int, ppid: Optional[int]) -> None:
+        # pid 0 (kernel_task on macOS) reports itself as its own parent
+        if ppid is not None and ppid != pid:
+            self._children.setdefault(ppid, set()).add(pid)
+
+    def _unlink(self, pid: int, ppid: Optional[int]) -> None:
+        siblings = self._children.get(ppid)
+        if siblings is not None:
+            siblings.discard(pid)
+            if not siblings:
+                del self._children[ppid]
+
+    def update(self, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Fold in one full scan; returns how many pids started, exited and were reparented."""
+        started = reparented = 0
+        with self._lock:
+            seen = set()
+            for record in records:
+                pid = record['pid']
+                seen.add(pid)
+                node = self._nodes.get(pid)
+                if node is None or node['create_time'] != record['create_time']:
+                    if node is not None:  # pid reused
+                        self._unlink(pid, node.get('ppid'))
+                    self._link(pid, record.get('ppid'))
+                    started += 1
+                elif node.get('ppid') != record.get('ppid'):
+                    self._unlink(pid, node.get('ppid'))
+                    self._link(pid, record.get('ppid'))
+                    reparented += 1
+                self._nodes[pid] = record
+
+            exited = [pid for pid in self._nodes if pid not in seen]
+            for pid in exited:
+                self._unlink(pid, self._nodes.pop(pid).get('ppid'))
+        return {'started': started, 'exited': len(exited), 'reparented': reparented}
+
+    def get(self, pid: int) -> Optional[Dict[str, Any]]:
+        return self._nodes.get(pid)
+
+    def children(self, pid: int) -> List[int]:
+        with self._lock:
+            return sorted(self._children.get(pid, ()))
+
+    def top_parents(self, limit: int = 3, exclude=(0, 1)) -> List[Dict[str, Any]]:
+        """Processes with the most direct children; init and the idle task adopt everything, so they are skipped."""
+        with self._lock:
+            counts = sorted(((len(kids), ppid) for ppid, kids in self._children.items()
+                             if ppid not in exclude), reverse=True)[:limit]
+            return [{'pid': ppid, 'name': (self._nodes.get(ppid) or {}).get('name', '?'), 'children': count}
+                    for count, ppid in counts]
+
+    def ancestors(self, pid: int) -> List[Dict[str, Any]]:
+        """Parent, grandparent, ... up to the root, nearest first."""
+        with self._lock:
+            chain = []
+            node = self._nodes.get(pid)
+            while node is not None and node.get('ppid') in self._nodes and len(chain) < len(self._nodes):
+                node = self._nodes[node['ppid']]
+                chain.append({'pid': node['pid'], 'name': node['name']})
+            return chain
+
+    def _rollups(self, pid: int) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, List[int]]]:
+        """Totals for every node under pid (itself included), in one post-order walk,
+        and the children each node was reached through.
+
+        Each pid is visited once, so a ppid cycle (a pid reused mid-scan) cannot
+        loop forever while the lock is held.
+        """
+        order = []
+        kids: Dict[int, List[int]] = {}
+        seen = {pid}
+        stack = [pid]
+        while stack:
+            current = stack.pop()
+            order.append(current)
+            kids[current] = [c for c in self._children.get(current, ()) if c in self._nodes and c not in seen]
+            seen.update(kids[current])
+            stack.extend(kids[current])
+        totals: Dict[int, Dict[str, Any]] = {}
+        for current in reversed(order):  # children before parents
+            node = self._nodes[current]
+            total = {f: node.get(f) or 0 for f in ROLLUP_FIELDS}
+            total['processes'] = 1
+            for child in kids[current]:
+                for f, value in totals[child].items():
+                    total[f] += value
+            totals[current] = total
+        for total in totals.values():
+            for f in ('cpu_percent', 'rss_mb', 'cpu_time_s'):
+                total[f] = round(total[f], 1)
+        return totals, kids
+
+    def rollup(self, pid: int) -> Optional[Dict[str, Any]]:
+        """Process count and summed CPU%, RSS, threads and CPU seconds of pid's subtree."""
+        with self._lock:
+            if pid not in self._nodes:
+                return None
+            return self._rollups(pid)[0][pid]
+
+    def subtree(self, pid: int, depth: int = 2) -> Optional[Dict[str, Any]]:
+        """Nested view of pid's descendants down to depth, each with its subtree rollup.
+
+        Children are ordered by subtree RSS; past MAX_CHILDREN_LISTED per node
+        they are only counted.
+        """
+        with self._lock:
+            if pid not in self._nodes:
+                return None
+            totals, reached = self._rollups(pid)
+
+            def view(current: int, remaining: int) -> Dict[str, Any]:
+                node = self._nodes[current]
+                entry = {'pid': current, 'name': node['name'], 'cpu_percent': node['cpu_percent'],
+                         'rss_mb': round(node['rss_mb'], 1), 'subtree': totals[current]}
+                kids = sorted(reached[current], key=lambda c: totals[c]['rss_mb'], reverse=True)
+                if kids and remaining > 0:
+                    entry['children'] = [view(c, remaining - 1) for c in kids[:MAX_CHILDREN_LISTED]]
+                    if len(kids) > MAX_CHILDREN_LISTED:
+                        entry['omitted_children'] = len(kids) - MAX_CHILDREN_LISTED
+                elif kids:
+                    entry['omitted_children'] = len(kids)
+                return entry
+
+            return view(pid, depth)
@@ -0,0 +1,122 @@
+"""
+Local query socket served by the daemon.
+
+Protocol: newline-delimited JSON over a Unix-domain stream socket. Each
+request is {"op": <name>, "args": {...}}; each response is
+{"ok": true, "result": {...}} or {"ok": false, "error": "..."}. A connection
+may carry any number of requests, so a chat session keeps one open per
+thread that queries.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                handler = self.server.handlers.get(request.get("op"))
+                if handler is None:
+                    response = {"ok": False, "error": f"Unknown op: {request.get('op')}"}
+                else:
+                    response = {"ok": True, "result": handler(request.get("args") or {})}
+            except Exception as e:
+                logging.error(f"QueryServer: request failed: {e}")
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class QueryServer:
+    """Serves registered ops on a Unix socket from a background thread."""
+
+    def __init__(self, socket_path: Path, handlers: Dict[str, Handler]):
+        self.socket_path = Path(socket_path)
+        self.handlers = handlers
+        self._server: Optional[_ThreadingUnixServer] = None
+
+    def start(self) -> None:
+        # A stale socket from a daemon that did not shut down cleanly
+        self.socket_path.unlink(missing_ok=True)
+        self._server = _ThreadingUnixServer(str(self.socket_path), _RequestHandler)
+        self._server.handlers = self.handlers
+        os.chmod(self.socket_path, 0o600)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"QueryServer: listening on {self.socket_path}")
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.socket_path.unlink(missing_ok=True)
+
+
+class QueryClient:
+    """Keeps one connection to the daemon's query socket open across calls."""
+
+    def __init__(self, socket_path: Path, timeout_s: float = 5.0):
+        self.socket_path = Path(socket_path)
+        self.timeout_s = timeout_s
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout_s)
+        sock.connect(str(self.socket_path))
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = None
+            self._file = None
+
+    def query(self, op: str, **args) -> Dict[str, Any]:
+        """Send one request; raises OSError if the daemon is unreachable or takes over timeout_s in all."""
+        payload = (json.dumps({"op": op, "args": args}) + "\n").encode()
+        with self._lock:
+            deadline = time.monotonic() + self.timeout_s
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.settimeout(max(deadline - time.monotonic(), 0.001))
+                    self._file.write(payload)
+                    self._file.flush()
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("daemon closed the connection")
+                    break
+                except socket.timeout:
+                    # A reply may still be on its way; this connection is out of step now
+                    self.close()
+                    raise
+                except OSError:
+                    # The daemon may have restarted since the last call; reconnect once
+                    self.close()
+                    if attempt or time.monotonic() >= deadline:
+                        raise
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "query failed"))
+        return response["result"]
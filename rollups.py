@@ -0,0 +1,185 @@
+"""
+Multi-resolution rollups of daemon samples for long-range trend queries.
+
+Three resolutions are kept, each updated incrementally as samples arrive:
+- raw samples for the last hour
+- 1-minute buckets (min/avg/max/p95) for the last day
+- 15-minute buckets for the last month
+
+A query picks the finest resolution that still covers its window, so an
+hours- or days-long trend reads a few hundred buckets instead of every sample.
+"""
+
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Rolled-up metric -> how to read it from a snapshot
+ROLLUP_METRICS: Dict[str, Callable[[Dict[str, Any]], Optional[float]]] = {
+    "cpu_percent": lambda s: s.get("cpu_percent"),
+    "iowait_percent": lambda s: s.get("cpu_iowait_percent"),
+    "memory_percent": lambda s: (s.get("memory") or {}).get("percent_used"),
+    "available_gb": lambda s: (s.get("memory") or {}).get("available_gb"),
+    "load_1m": lambda s: (s.get("load_avg") or [None])[0],
+}
+
+RAW = "raw"
+MINUTE = "1m"
+QUARTER_HOUR = "15m"
+
+RAW_RETENTION_S = 3600
+
+
+def _p95(values: List[float]) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class _BucketTier:
+    """Fixed-width time buckets; the open bucket keeps its values until it closes."""
+
+    def __init__(self, bucket_s: int, retention_s: int):
+        self.bucket_s = bucket_s
+        self.retention_s = retention_s
+        self.buckets: deque = deque()  # {"start", "n", "metrics": {name: [min, avg, max, p95]}}
+        self._open_start: Optional[float] = None
+        self._open_values: Dict[str, List[float]] = {}
+
+    def add(self, timestamp: float, values: Dict[str, float]) -> bool:
+        """Add one sample; True if it closed a bucket."""
+        if self.buckets and timestamp < self.buckets[-1]["start"] + self.bucket_s:
+            return False  # already rolled up (replay after restart, or clock stepped back)
+        start = timestamp - timestamp % self.bucket_s
+        closed = False
+        if self._open_start is not None and start != self._open_start:
+            self._close()
+            closed = True
+        self._open_start = start
+        for name, value in values.items():
+            self._open_values.setdefault(name, []).append(value)
+        while self.buckets and self.buckets[0]["start"] < timestamp - self.retention_s:
+            self.buckets.popleft()
+        return closed
+
+    def _close(self) -> None:
+        metrics = {name: [min(v), sum(v) / len(v), max(v), _p95(v)]
+                   for name, v in self._open_values.items() if v}
+        if metrics:
+            n = max(len(v) for v in self._open_values.values())
+            self.buckets.append({"start": self._open_start, "n": n, "metrics": metrics})
+        self._open_values = {}
+
+    def open_bucket(self) -> Optional[Dict[str, Any]]:
+        """The bucket still filling, summarized as if it closed now."""
+        if self._open_start is None or not self._open_values:
+            return None
+        metrics = {name: [min(v), sum(v) / len(v), max(v), _p95(v)]
+                   for name, v in self._open_values.items() if v}
+        return {"start": self._open_start, "n": max(len(v) for v in self._open_values.values()), "metrics": metrics}
+
+
+class RollupStore:
+    """Raw, 1-minute and 15-minute series, maintained one sample at a time."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.raw: deque = deque()  # (timestamp, {metric: value})
+        self.tiers = {
+            MINUTE: _BucketTier(60, 24 * 3600),
+            QUARTER_HOUR: _BucketTier(15 * 60, 31 * 24 * 3600),
+        }
+
+    def add(self, snapshot: Dict[str, Any]) -> None:
+        if "error" in snapshot:
+            return
+        timestamp = snapshot["timestamp"]
+        values = {}
+        for name, read in ROLLUP_METRICS.items():
+            value = read(snapshot)
+            if value is not None:
+                values[name] = float(value)
+        if not values:
+            return
+
+        self.raw.append((timestamp, values))
+        while self.raw and self.raw[0][0] < timestamp - RAW_RETENTION_S:
+            self.raw.popleft()
+        self.tiers[MINUTE].add(timestamp, values)
+        if self.tiers[QUARTER_HOUR].add(timestamp, values) and self.path:
+            # Closed buckets only change every 15 minutes; persist then
+            self.save()
+
+    def resolution_for(self, start_ts: float, now: Optional[float] = None) -> str:
+        """Finest resolution whose retention covers start_ts."""
+        now = time.time() if now is None else now
+        if start_ts >= now - RAW_RETENTION_S:
+            return RAW
+        if start_ts >= now - self.tiers[MINUTE].retention_s:
+            return MINUTE
+        return QUARTER_HOUR
+
+    def query(self, metric: str, start_ts: float, end_ts: Optional[float] = None,
+              resolution: Optional[str] = None) -> Dict[str, Any]:
+        """Points for one metric in [start_ts, end_ts] at the chosen resolution."""
+        end_ts = math.inf if end_ts is None else end_ts
+        resolution = resolution or self.resolution_for(start_ts)
+        if resolution == RAW:
+            # Copy first: the collector thread appends while queries run
+            points = [{"t": ts, "value": values[metric]} for ts, values in list(self.raw)
+                      if start_ts <= ts <= end_ts and metric in values]
+        else:
+            tier = self.tiers[resolution]
+            buckets = list(tier.buckets)
+            open_bucket = tier.open_bucket()
+            if open_bucket:
+                buckets.append(open_bucket)
+            points = []
+            for bucket in buckets:
+                # Include a bucket if any part of it falls in the window
+                if bucket["start"] + tier.bucket_s <= start_ts or bucket["start"] > end_ts:
+                    continue
+                stats = bucket["metrics"].get(metric)
+                if stats:
+                    points.append({"t": bucket["start"], "n": bucket["n"], "min": stats[0],
+                                   "avg": stats[1], "max": stats[2], "p95": stats[3]})
+        return {"metric": metric, "resolution": resolution, "points": points}
+
+    def replay_from(self) -> float:
+        """Timestamp to replay stored samples from after load() to fill the gap.
+
+        Covers the raw hour and everything after the last saved bucket; samples
+        already inside saved buckets are skipped by the tiers.
+        """
+        now = time.time()
+        quarter = self.tiers[QUARTER_HOUR]
+        day_ago = now - self.tiers[MINUTE].retention_s
+        if quarter.buckets:
+            day_ago = max(quarter.buckets[-1]["start"] + quarter.bucket_s, day_ago)
+        return min(day_ago, now - RAW_RETENTION_S)
+
+    def save(self) -> None:
+        data = {name: list(tier.buckets) for name, tier in self.tiers.items()}
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def load(self) -> None:
+        """Restore closed buckets saved by a previous daemon run."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            logging.warning(f"RollupStore: ignoring corrupt {self.path}")
+            return
+        for name, tier in self.tiers.items():
+            tier.buckets = deque(data.get(name, []))
@@ -0,0 +1,177 @@
+"""
+Delta-based samplers for system-wide kernel counters.
+
+Each sampler keeps the counters read on the previous tick and reports rates
+from the difference, so no sample ever sleeps to measure an interval. The
+system sampler covers CPU and memory; the disk and network samplers cover
+per-device I/O.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+BYTES_PER_GB = 1024 * 1024 * 1024
+
+# Guest time is already counted in user/nice on Linux
+_GUEST_FIELDS = ('guest', 'guest_nice')
+
+
+def _cpu_totals(times) -> Dict[str, float]:
+    """Collapse one cpu_times tuple into total/busy/iowait/steal seconds."""
+    fields = times._asdict()
+    total = sum(v for k, v in fields.items() if k not in _GUEST_FIELDS)
+    idle = fields.get('idle', 0.0) + fields.get('iowait', 0.0)
+    return {
+        'total': total,
+        'busy': total - idle,
+        'iowait': fields.get('iowait', 0.0),
+        'steal': fields.get('steal', 0.0)
+    }
+
+
+def _sum_times(per_core: List[Dict[str, float]]) -> Dict[str, float]:
+    return {k: sum(core[k] for core in per_core) for k in per_core[0]} if per_core else {}
+
+
+def _percent(part: float, total: float) -> float:
+    return round(min(max(part / total * 100, 0.0), 100.0), 1) if total > 0 else 0.0
+
+
+class SystemSampler:
+    """System CPU% (overall and per core), iowait/steal and memory per tick."""
+
+    def __init__(self):
+        self._prev_cores: Optional[List[Dict[str, float]]] = None
+
+    def sample(self) -> Dict[str, Any]:
+        """Read each counter once and return rates since the previous call.
+
+        The first call has no previous tick and reports averages since boot.
+        """
+        # Per-core times are one read of /proc/stat; the overall figure is
+        # their sum rather than a second read.
+        cores = [_cpu_totals(t) for t in psutil.cpu_times(percpu=True)]
+        prev_cores = self._prev_cores
+        if prev_cores is None or len(prev_cores) != len(cores):
+            # No previous tick, or CPUs went on/offline: measure since boot
+            prev_cores = [dict.fromkeys(core, 0.0) for core in cores]
+        self._prev_cores = cores
+
+        deltas = [{k: core[k] - prev[k] for k in core} for core, prev in zip(cores, prev_cores)]
+        overall = _sum_times(deltas)
+        vm = psutil.virtual_memory()
+
+        logging.debug(f"SystemSampler.sample: {len(cores)} cores, {overall.get('total', 0.0):.2f}s cpu time elapsed")
+        return {
+            "cpu_percent": _percent(overall.get('busy', 0.0), overall.get('total', 0.0)),
+            "cpu_per_core": [_percent(d['busy'], d['total']) for d in deltas],
+            "cpu_iowait_percent": _percent(overall.get('iowait', 0.0), overall.get('total', 0.0)),
+            "cpu_steal_percent": _percent(overall.get('steal', 0.0), overall.get('total', 0.0)),
+            "memory": {
+                "total_gb": vm.total / BYTES_PER_GB,
+                "available_gb": vm.available / BYTES_PER_GB,
+                "percent_used": vm.percent
+            }
+        }
+
+
+def _rate(delta: float, elapsed: float) -> float:
+    return round(delta / elapsed, 1) if elapsed > 0 else 0.0
+
+
+class _CounterSampler:
+    """Keeps the previous per-device counter reading and hands out deltas."""
+
+    def __init__(self):
+        self._prev: Optional[Dict[str, Dict[str, float]]] = None
+        self._prev_at = 0.0
+
+    def _deltas(self, counters: Dict[str, Any]) -> Tuple[float, Dict[str, Dict[str, float]]]:
+        """(elapsed seconds, {device: {field: delta}}) since the previous call.
+
+        The first call measures since boot. A device that appeared since the
+        previous call, or whose counters went backwards (driver reset, wrap),
+        reports zeros this tick and is measured from here on.
+        """
+        now = time.time()
+        current = {name: c._asdict() for name, c in counters.items()}
+        first = self._prev is None
+        elapsed = now - (psutil.boot_time() if first else self._prev_at)
+        prev = self._prev or {}
+        self._prev, self._prev_at = current, now
+
+        deltas = {}
+        for name, fields in current.items():
+            before = dict.fromkeys(fields, 0) if first else prev.get(name, fields)
+            delta = {k: v - before.get(k, 0) for k, v in fields.items()}
+            deltas[name] = delta if all(v >= 0 for v in delta.values()) else dict.fromkeys(fields, 0)
+        return elapsed, deltas
+
+
+def _whole_disk(name: str) -> bool:
+    """True unless sysfs says the device is a partition, loop or ram disk."""
+    if name.startswith(("loop", "ram")):
+        return False
+    return not os.path.isdir("/sys/block") or os.path.exists(f"/sys/block/{name}")
+
+
+class DiskIOSampler(_CounterSampler):
+    """Per-disk throughput, IOPS, average wait and utilization per tick."""
+
+    def sample(self, top_n: int = 5) -> Dict[str, Any]:
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        elapsed, deltas = self._deltas(counters)
+        disks = []
+        for name, d in deltas.items():
+            if not _whole_disk(name):
+                continue  # partitions would count their disk's traffic twice
+            ops = d.get('read_count', 0) + d.get('write_count', 0)
+            io_ms = d.get('read_time', 0) + d.get('write_time', 0)
+            disk = {
+                "disk": name,
+                "read_bytes_per_s": _rate(d.get('read_bytes', 0), elapsed),
+                "write_bytes_per_s": _rate(d.get('write_bytes', 0), elapsed),
+                "read_iops": _rate(d.get('read_count', 0), elapsed),
+                "write_iops": _rate(d.get('write_count', 0), elapsed),
+                # Latency proxy: average milliseconds per completed request
+                "await_ms": round(io_ms / ops, 2) if ops else 0.0,
+            }
+            if 'busy_time' in d:  # Linux and FreeBSD only
+                disk["util_percent"] = _percent(d['busy_time'], elapsed * 1000)
+            disks.append(disk)
+        disks.sort(key=lambda x: x["read_bytes_per_s"] + x["write_bytes_per_s"], reverse=True)
+        total = {k: round(sum(x[k] for x in disks), 1)
+                 for k in ("read_bytes_per_s", "write_bytes_per_s", "read_iops", "write_iops")}
+        logging.debug(f"DiskIOSampler.sample: {len(disks)} disks over {elapsed:.2f}s")
+        return {"interval_s": round(elapsed, 2), "total": total, "disks": disks[:top_n]}
+
+
+class NetIOSampler(_CounterSampler):
+    """Per-NIC throughput, packet rates, errors and drops per tick."""
+
+    def sample(self, top_n: int = 5) -> Dict[str, Any]:
+        counters = psutil.net_io_counters(pernic=True) or {}
+        elapsed, deltas = self._deltas(counters)
+        nics = []
+        for name, d in deltas.items():
+            if name == "lo":
+                continue
+            nics.append({
+                "nic": name,
+                "recv_bytes_per_s": _rate(d['bytes_recv'], elapsed),
+                "sent_bytes_per_s": _rate(d['bytes_sent'], elapsed),
+                "recv_packets_per_s": _rate(d['packets_recv'], elapsed),
+                "sent_packets_per_s": _rate(d['packets_sent'], elapsed),
+                # Counts over the interval; any non-zero value is worth a look
+                "errors": int(d['errin'] + d['errout']),
+                "drops": int(d['dropin'] + d['dropout']),
+            })
+        nics.sort(key=lambda x: x["recv_bytes_per_s"] + x["sent_bytes_per_s"], reverse=True)
+        total = {k: round(sum(x[k] for x in nics), 1) for k in ("recv_bytes_per_s", "sent_bytes_per_s")}
+        total.update({k: sum(x[k] for x in nics) for k in ("errors", "drops")})
+        logging.debug(f"NetIOSampler.sample: {len(nics)} interfaces over {elapsed:.2f}s")
+        return {"interval_s": round(elapsed, 2), "total": total, "nics": nics[:top_n]}
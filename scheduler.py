@@ -0,0 +1,97 @@
+"""
+Adaptive sampling schedule for the daemon's collector loop.
+
+Ticks land on a fixed-rate monotonic grid, so time spent taking a sample does
+not push the next one back. A quiet host is sampled at the low rate; crossing
+a threshold or a sudden jump switches to the high rate until the host has been
+quiet for a cool-down period. Collectors read the mode to pick their cadence.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+LOW = "low"
+HIGH = "high"
+
+DEFAULT_THRESHOLDS = {
+    "cpu_percent": 70.0,         # system CPU%
+    "memory_percent": 85.0,      # memory used %
+    "load_per_core": 1.0,        # 1-minute load divided by core count
+    "cpu_jump": 25.0,            # CPU% change between consecutive samples
+    "memory_jump": 5.0,          # memory % change between consecutive samples
+}
+
+
+class AdaptiveScheduler:
+    """Chooses the sampling rate from what the last sample looked like."""
+
+    def __init__(self, low_interval_s: float = 10, high_interval_s: float = 1,
+                 cooldown_s: float = 60,
+                 thresholds: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.low_interval_s = low_interval_s
+        self.high_interval_s = min(high_interval_s, low_interval_s)
+        self.cooldown_s = cooldown_s
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self._clock = clock
+        self._cores = os.cpu_count() or 1
+
+        self.mode = LOW
+        self._next_tick = clock()
+        self._last_trigger: Optional[float] = None
+        self._previous: Optional[Dict[str, Any]] = None
+
+    @property
+    def interval_s(self) -> float:
+        return self.high_interval_s if self.mode == HIGH else self.low_interval_s
+
+    def _triggers(self, snapshot: Dict[str, Any]) -> list:
+        t = self.thresholds
+        cpu = snapshot.get("cpu_percent")
+        mem = (snapshot.get("memory") or {}).get("percent_used")
+        load_avg = snapshot.get("load_avg") or ()
+        reasons = []
+        if cpu is not None and cpu >= t["cpu_percent"]:
+            reasons.append(f"cpu {cpu:.0f}%")
+        if mem is not None and mem >= t["memory_percent"]:
+            reasons.append(f"memory {mem:.0f}%")
+        if load_avg and load_avg[0] / self._cores >= t["load_per_core"]:
+            reasons.append(f"load {load_avg[0]:.2f}")
+        previous = self._previous
+        if previous is not None:
+            prev_cpu = previous.get("cpu_percent")
+            prev_mem = (previous.get("memory") or {}).get("percent_used")
+            if cpu is not None and prev_cpu is not None and abs(cpu - prev_cpu) >= t["cpu_jump"]:
+                reasons.append(f"cpu jump {cpu - prev_cpu:+.0f}%")
+            if mem is not None and prev_mem is not None and abs(mem - prev_mem) >= t["memory_jump"]:
+                reasons.append(f"memory jump {mem - prev_mem:+.0f}%")
+        return reasons
+
+    def observe(self, snapshot: Dict[str, Any]) -> None:
+        """Update the mode from the sample just taken."""
+        if "error" in snapshot:
+            return
+        now = self._clock()
+        reasons = self._triggers(snapshot)
+        self._previous = snapshot
+
+        if reasons:
+            self._last_trigger = now
+            if self.mode != HIGH:
+                logging.info(f"AdaptiveScheduler: high rate ({', '.join(reasons)})")
+                self.mode = HIGH
+        elif self.mode == HIGH and now - self._last_trigger >= self.cooldown_s:
+            logging.info(f"AdaptiveScheduler: low rate after {self.cooldown_s}s quiet")
+            self.mode = LOW
+
+    def wait(self) -> None:
+        """Sleep until the next tick on the fixed-rate grid."""
+        self._next_tick += self.interval_s
+        now = self._clock()
+        if self._next_tick < now:
+            # Fell behind by more than a period; skip missed ticks instead of bursting
+            missed = int((now - self._next_tick) // self.interval_s) + 1
+            self._next_tick += missed * self.interval_s
+        time.sleep(max(self._next_tick - now, 0))
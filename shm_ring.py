@@ -0,0 +1,244 @@
+"""
+Memory-mapped ring buffer of recent snapshots shared by the daemon and CLIs.
+
+The daemon maps the file read-write and is the only writer; any number of
+readers map it read-only. Every slot has a fixed layout, so a reader unpacks
+fields straight out of the mapping with no file reads or JSON parsing.
+
+Each slot starts with a sequence word used as a seqlock: the writer stores
+2*n+1 before touching record n's payload and 2*n+2 after it. A reader
+accepts a record only if the word is even, matches the record it wanted,
+and is unchanged after the payload was read; otherwise it retries.
+"""
+
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MAGIC = b'SDRB'
+VERSION = 1
+DEFAULT_SLOTS = 512
+TOP_N = 10
+DISK_N = 5
+_READ_RETRIES = 8
+
+# magic, version, slot count, slot size, records written so far
+_HEADER = struct.Struct('<4sHxxIIQ')
+_SEQ = struct.Struct('<Q')
+# timestamp, cpu, iowait, steal, mem total/avail/percent, load 1/5/15,
+# process count, entries used in each list, hostname, error, and when the
+# process and disk data in this record were collected (NaN if unknown)
+_HEAD = struct.Struct('<dfffffffffIBBBx64s128sdd')
+# collected_at keys whose time is kept per record
+TIMED_TIERS = ("processes", "disks")
+_PROC = struct.Struct('<I32sfff')      # pid, name, cpu_percent, rss_mb, vms_mb
+_DISK = struct.Struct('<64s32s16sfff')  # location, device, fstype, total_gb, free_gb, percent_used
+
+PAYLOAD_SIZE = _HEAD.size + 2 * TOP_N * _PROC.size + DISK_N * _DISK.size
+SLOT_SIZE = _SEQ.size + PAYLOAD_SIZE
+_NAN = float('nan')
+
+
+def _num(value: Any) -> float:
+    return _NAN if value is None else float(value)
+
+
+def _val(value: float, digits: int = 3) -> Optional[float]:
+    return None if math.isnan(value) else round(value, digits)
+
+
+def _enc(value: Optional[str], size: int) -> bytes:
+    return (value or "").encode("utf-8", "replace")[:size]
+
+
+def _dec(raw: bytes) -> Optional[str]:
+    return raw.rstrip(b"\0").decode("utf-8", "replace") or None
+
+
+def _pack_payload(snapshot: Dict[str, Any]) -> bytes:
+    memory = snapshot.get("memory") or {}
+    load_avg = list(snapshot.get("load_avg") or ())[:3]
+    load_avg += [None] * (3 - len(load_avg))
+    cpu_procs = (snapshot.get("top_cpu_processes") or [])[:TOP_N]
+    mem_procs = (snapshot.get("top_mem_processes") or [])[:TOP_N]
+    disks = ((snapshot.get("disk_usage") or {}).get("usage") or [])[:DISK_N]
+    collected_at = snapshot.get("collected_at") or {}
+
+    parts = [_HEAD.pack(
+        snapshot.get("timestamp") or 0.0,
+        _num(snapshot.get("cpu_percent")),
+        _num(snapshot.get("cpu_iowait_percent")),
+        _num(snapshot.get("cpu_steal_percent")),
+        _num(memory.get("total_gb")),
+        _num(memory.get("available_gb")),
+        _num(memory.get("percent_used")),
+        *(_num(v) for v in load_avg),
+        snapshot.get("num_processes") or 0,
+        len(cpu_procs), len(mem_procs), len(disks),
+        _enc(snapshot.get("hostname"), 64),
+        _enc(snapshot.get("error"), 128),
+        *(_num(collected_at.get(tier)) for tier in TIMED_TIERS)
+    )]
+    for procs in (cpu_procs, mem_procs):
+        for i in range(TOP_N):
+            p = procs[i] if i < len(procs) else {}
+            parts.append(_PROC.pack(p.get("pid", 0), _enc(p.get("name"), 32), _num(p.get("cpu_percent")),
+                                    _num(p.get("rss_mb")), _num(p.get("vms_mb"))))
+    for i in range(DISK_N):
+        d = disks[i] if i < len(disks) else {}
+        parts.append(_DISK.pack(_enc(d.get("location"), 64), _enc(d.get("device"), 32), _enc(d.get("fstype"), 16),
+                                _num(d.get("total_gb")), _num(d.get("free_gb")), _num(d.get("percent_used"))))
+    return b"".join(parts)
+
+
+def _unpack_payload(buf, offset: int) -> Dict[str, Any]:
+    (timestamp, cpu, iowait, steal, mem_total, mem_avail, mem_pct, load1, load5, load15,
+     num_processes, n_cpu, n_mem, n_disk, hostname, error, *tier_times) = _HEAD.unpack_from(buf, offset)
+    snapshot = {"timestamp": timestamp, "hostname": _dec(hostname)}
+    if _dec(error):
+        snapshot["error"] = _dec(error)
+        return snapshot
+
+    offset += _HEAD.size
+    cpu_procs = []
+    for i in range(n_cpu):
+        pid, name, cpu_percent, _, _ = _PROC.unpack_from(buf, offset + i * _PROC.size)
+        cpu_procs.append({"pid": pid, "name": _dec(name), "cpu_percent": _val(cpu_percent, 1)})
+    offset += TOP_N * _PROC.size
+    mem_procs = []
+    for i in range(n_mem):
+        pid, name, _, rss, vms = _PROC.unpack_from(buf, offset + i * _PROC.size)
+        mem_procs.append({"pid": pid, "name": _dec(name), "rss_mb": _val(rss), "vms_mb": _val(vms)})
+    offset += TOP_N * _PROC.size
+    disks = []
+    for i in range(n_disk):
+        location, device, fstype, total, free, pct = _DISK.unpack_from(buf, offset + i * _DISK.size)
+        disks.append({"location": _dec(location), "type": "mount" if _dec(device) else "path",
+                      "device": _dec(device), "fstype": _dec(fstype), "total_gb": _val(total),
+                      "free_gb": _val(free), "percent_used": _val(pct, 1)})
+
+    snapshot.update({
+        "cpu_percent": _val(cpu, 1),
+        "cpu_iowait_percent": _val(iowait, 1),
+        "cpu_steal_percent": _val(steal, 1),
+        "memory": {"total_gb": _val(mem_total), "available_gb": _val(mem_avail), "percent_used": _val(mem_pct, 1)},
+        "load_avg": [_val(load1, 2), _val(load5, 2), _val(load15, 2)],
+        "num_processes": num_processes,
+        "top_cpu_processes": cpu_procs,
+        "top_mem_processes": mem_procs,
+        "disk_usage": {"usage": disks},
+        "collected_at": {tier: t for tier, t in zip(TIMED_TIERS, tier_times) if not math.isnan(t)},
+    })
+    return snapshot
+
+
+class RingWriter:
+    """Single writer side of the shared ring (used by the daemon)."""
+
+    def __init__(self, path: Path, slots: int = DEFAULT_SLOTS):
+        self.path = Path(path)
+        size = _HEADER.size + slots * SLOT_SIZE
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            existing = os.fstat(fd).st_size
+            if existing != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        magic, version, slot_count, slot_size, written = _HEADER.unpack_from(self._map, 0)
+        if (magic, version, slot_count, slot_size) != (MAGIC, VERSION, slots, SLOT_SIZE):
+            # New file or incompatible layout: start empty
+            self._map[:] = bytes(size)
+            written = 0
+            _HEADER.pack_into(self._map, 0, MAGIC, VERSION, slots, SLOT_SIZE, 0)
+        self.slots = slots
+        self._written = written
+
+    def append(self, snapshot: Dict[str, Any]) -> None:
+        n = self._written
+        offset = _HEADER.size + (n % self.slots) * SLOT_SIZE
+        _SEQ.pack_into(self._map, offset, 2 * n + 1)
+        self._map[offset + _SEQ.size:offset + SLOT_SIZE] = _pack_payload(snapshot)
+        _SEQ.pack_into(self._map, offset, 2 * n + 2)
+        self._written = n + 1
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.slots, SLOT_SIZE, self._written)
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class RingReader(Sequence):
+    """Read-only view of the shared ring; indexes like a list, oldest first.
+
+    Behaves like the daemon's snapshot deque, so it can be handed to code that
+    expects one. Its length grows as the daemon writes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, slots, slot_size, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a compatible snapshot ring")
+        self.slots = slots
+
+    def written(self) -> int:
+        """Total records the writer has completed."""
+        return _HEADER.unpack_from(self._map, 0)[4]
+
+    def _read(self, n: int) -> Optional[Dict[str, Any]]:
+        """Record number n, or None if it was overwritten while reading."""
+        offset = _HEADER.size + (n % self.slots) * SLOT_SIZE
+        for _ in range(_READ_RETRIES):
+            (before,) = _SEQ.unpack_from(self._map, offset)
+            if before != 2 * n + 2:
+                if before > 2 * n + 2:
+                    return None  # lapped by the writer
+                time.sleep(0)  # being written right now; yield to the writer
+                continue
+            snapshot = _unpack_payload(self._map, offset + _SEQ.size)
+            (after,) = _SEQ.unpack_from(self._map, offset)
+            if after == before:
+                return snapshot
+        logging.debug(f"RingReader: gave up on record {n} after {_READ_RETRIES} retries")
+        return None
+
+    def __len__(self) -> int:
+        return min(self.written(), self.slots)
+
+    def __getitem__(self, index):
+        written = self.written()
+        length = min(written, self.slots)
+        if isinstance(index, slice):
+            return [s for s in (self._read(written - length + i) for i in range(*index.indices(length))) if s]
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("ring index out of range")
+        snapshot = self._read(written - length + index)
+        if snapshot is None:
+            raise IndexError("ring record was overwritten while reading")
+        return snapshot
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        written = self.written()
+        return self._read(written - 1) if written else None
+
+    def last(self, n: int) -> List[Dict[str, Any]]:
+        return self[-n:] if n > 0 else []
+
+    def close(self) -> None:
+        self._map.close()
@@ -3,51 +3,88 @@ Read-only psutil/OS command stubs for an advisor-only CLI.
 Each returns a result dict.
 """
 
+import heapq
 import logging
 import psutil
 import socket
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from connections import summarize_connections
+import open_files
+from process_registry import ProcessRegistry
+from process_tree import ProcessTree
+from samplers import DiskIOSampler, NetIOSampler, SystemSampler
 
 # Memory conversion constants
 BYTES_PER_KB = 1024
 BYTES_PER_MB = 1024 * 1024
 BYTES_PER_GB = 1024 * 1024 * 1024
 
+# Rankings kept by scan_processes: list key -> (sort field, fields reported)
+PROCESS_RANKINGS = {
+    'top_cpu_processes': ('cpu_percent', ('pid', 'name', 'cpu_percent')),
+    'top_mem_processes': ('rss_mb', ('pid', 'name', 'rss_mb', 'vms_mb')),
+}
+
+# Process handles live for the life of the process calling get_snapshot (the
+# daemon), so CPU% is a real delta between consecutive scans.
+PROCESS_REGISTRY = ProcessRegistry()
+
+# Process tree views are answered from a scan at most this old; a pid the
+# tree has not seen yet triggers a fresh scan regardless
+PROCESS_TREE_MAX_AGE_S = 60
+
+# System counters from the previous snapshot, so CPU% needs no blocking interval
+SYSTEM_SAMPLER = SystemSampler()
+
+# Per-disk and per-NIC counters from the previous call, for I/O rates
+DISK_IO_SAMPLER = DiskIOSampler()
+NET_IO_SAMPLER = NetIOSampler()
+
+def collect_system() -> Dict[str, Any]:
+    """Cheap system-wide counters: cpu (overall/per-core/iowait/steal), memory, load."""
+    return {
+        "hostname": socket.gethostname(),
+        
+        # System-wide metrics (cpu_percent, per-core, iowait/steal, memory)
+        **SYSTEM_SAMPLER.sample(),
+        "load_avg": psutil.getloadavg(),  # 1min, 5min, 15min averages
+    }
+
+def collect_processes() -> Dict[str, Any]:
+    """Top processes and process count (one process-table walk feeds every ranking)."""
+    return scan_processes(n=10)
+
+def collect_io() -> Dict[str, Any]:
+    """Disk and network I/O rates since the previous call."""
+    return {"disk_io": disk_io_brief(), "network_io": net_io_brief()}
+
+def collect_connections() -> Dict[str, Any]:
+    """Socket counts by state, port and peer, with the top groups attributed."""
+    return {"network_connections": connections_summary(limit=0)}
+
+def collect_disks() -> Dict[str, Any]:
+    """Disk headroom for the fullest mounts."""
+    return {"disk_usage": disk_usage(top_n=5)}
+
 def get_snapshot() -> Dict[str, Any]:
-    """Point-in-time host state (load, cpu, mem, disks, top procs)."""
+    """Point-in-time host state (load, cpu, mem, disks, I/O rates, connections, top procs)."""
     logging.debug("get_snapshot: capturing system state")
     snapshot_time = time.time()
     
     try:
         snapshot = {
             "timestamp": snapshot_time,
-            "hostname": socket.gethostname(),
-            
-            # System-wide metrics
-            "cpu_percent": psutil.cpu_percent(interval=0.1),
-            "memory": {
-                "total_gb": psutil.virtual_memory().total / BYTES_PER_GB,
-                "available_gb": psutil.virtual_memory().available / BYTES_PER_GB,
-                "percent_used": psutil.virtual_memory().percent
-            },
-            "load_avg": psutil.getloadavg(),  # 1min, 5min, 15min averages
+            **collect_system(),
+            **collect_processes(),
+            **collect_disks(),
             
-            # Top processes (implemented)
-            "top_cpu_processes": top_cpu(n=10)["top_cpu_processes"],
-            "top_mem_processes": top_mem(n=10)["top_mem_processes"],
+            # Disk and network I/O rates since the previous call
+            **collect_io(),
             
-            # Disk info
-            "disk_usage": disk_usage(top_n=5),
-            
-            # Network connections (TODO: implement connections_summary)
-            # "network_connections": connections_summary(limit=50),
-            
-            # Disk I/O (TODO: implement disk_io_brief) 
-            # "disk_io": disk_io_brief(sample_interval_s=1),
-            
-            # Network I/O (TODO: implement net_io_brief)
-            # "network_io": net_io_brief(sample_interval_s=1),
+            # Network connections: counts and top groups only, no per-socket samples
+            **collect_connections(),
         }
         
         logging.debug(f"get_snapshot: captured snapshot with {len(snapshot['top_cpu_processes'])} CPU processes, {len(snapshot['top_mem_processes'])} memory processes")
@@ -65,88 +102,110 @@ def get_recent_metrics(window: str = "5m", interval_s: int = 3) -> Dict[str, Any
     """Aggregates over a short window (cpu/load/mem/disk/net, top pids)."""
     raise NotImplementedError
 
+def _push_bounded(heap: list, n: int, item: tuple) -> None:
+    """Keep the n largest items in a min-heap."""
+    if len(heap) < n:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+def scan_processes(n: int = 10, registry: Optional[ProcessRegistry] = None) -> Dict[str, Any]:
+    """Top-N processes for every ranking in one pass over the process table."""
+    logging.debug(f"scan_processes: scanning process table for top {n}")
+    registry = registry or PROCESS_REGISTRY
+    heaps = {key: [] for key in PROCESS_RANKINGS}
+    records = registry.scan()
+
+    for record in records:
+        for key, (sort_field, _) in PROCESS_RANKINGS.items():
+            # pid breaks ties so records themselves are never compared
+            _push_bounded(heaps[key], n, (record[sort_field], record['pid'], record))
+
+    result = {'num_processes': len(records)}
+    for key, (_, fields) in PROCESS_RANKINGS.items():
+        ranked = sorted(heaps[key], reverse=True)
+        result[key] = [{f: record[f] for f in fields} for _, _, record in ranked]
+    logging.debug(f"scan_processes: found {len(records)} processes")
+    return result
+
 def top_cpu(n: int = 10) -> Dict[str, Any]:
     """Top-N processes by CPU%."""
     logging.debug(f"top_cpu: collecting processes for top {n}")
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            processes.append(proc)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-    
-    psutil.cpu_percent(interval=None)  # Start measurement (non-blocking)
-    
-    results = []
-    access_denied_count = 0
-    for proc in processes:
-        try:
-            cpu = proc.cpu_percent(interval=None)  # Non-blocking
-            results.append({
-                'pid': proc.pid,
-                'name': proc.name(),
-                'cpu_percent': cpu
-            })
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            access_denied_count += 1
-            continue
-    
-    if access_denied_count > 0:
-        logging.debug(f"top_cpu: {access_denied_count} processes inaccessible")
-    
-    top_procs = sorted(results, key=lambda x: x['cpu_percent'], reverse=True)[:n]
-    logging.debug(f"top_cpu: found {len(results)} processes, returning top {len(top_procs)}")
+    scan = scan_processes(n)
     return {
-        'top_cpu_processes': top_procs,
-        'num_processes': len(results)
+        'top_cpu_processes': scan['top_cpu_processes'],
+        'num_processes': scan['num_processes']
     }
 
 def top_mem(n: int = 10) -> Dict[str, Any]:
     """Top-N processes by RSS/VMS."""
     logging.debug(f"top_mem: collecting memory info for top {n}")
-    processes = []
-    access_denied_count = 0
-    
-    for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-        try:
-            info = proc.info
-            mem_info = info['memory_info']
-            if mem_info:
-                processes.append({
-                    'pid': info['pid'],
-                    'name': info['name'],
-                    'rss_mb': mem_info.rss / BYTES_PER_MB,
-                    'vms_mb': mem_info.vms / BYTES_PER_MB
-                })
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            access_denied_count += 1
-            continue
-    
-    if access_denied_count > 0:
-        logging.debug(f"top_mem: {access_denied_count} processes inaccessible")
-    
-    # Sort by RSS (resident set size)
-    top_procs = sorted(processes, key=lambda x: x['rss_mb'], reverse=True)[:n]
-    logging.debug(f"top_mem: found {len(processes)} processes, returning top {len(top_procs)}")
-    
+    scan = scan_processes(n)
     return {
-        'top_mem_processes': top_procs,
-        'total_processes': len(processes)
+        'top_mem_processes': scan['top_mem_processes'],
+        'total_processes': scan['num_processes']
     }
 
+def _process_tree(pid: int, registry: Optional[ProcessRegistry] = None) -> Tuple[ProcessTree, float]:
+    """The registry's process tree and its age in seconds, rescanning first if it is stale or lacks pid."""
+    registry = registry or PROCESS_REGISTRY
+    last_scan_at = registry.last_scan_at
+    if last_scan_at is None or time.monotonic() - last_scan_at > PROCESS_TREE_MAX_AGE_S or pid not in registry.tree:
+        registry.scan()
+    return registry.tree, round(time.monotonic() - registry.last_scan_at, 1)
+
 def process_info(pid: int) -> Dict[str, Any]:
     """Details for one PID (cpu/mem/threads/fds/cmdline)."""
-    raise NotImplementedError
+    logging.debug(f"process_info: looking up pid {pid}")
+    tree, scan_age_s = _process_tree(pid)
+    record = tree.get(pid)
+    if record is None:
+        return {'pid': pid, 'error': 'no such process (or not visible to this user)'}
+    info = {k: v for k, v in record.items() if k != 'create_time'}
+    info['rss_mb'] = round(info['rss_mb'], 1)
+    info['vms_mb'] = round(info['vms_mb'], 1)
+    info['started'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['create_time']))
+    info['scan_age_s'] = scan_age_s
+    # Cheap live reads for this one process
+    try:
+        proc = psutil.Process(pid)
+        with proc.oneshot():
+            info['status'] = proc.status()
+            info['username'] = proc.username()
+        info['num_fds'] = proc.num_fds()
+    except (psutil.Error, AttributeError):  # num_fds is POSIX-only
+        pass
+    info['parents'] = tree.ancestors(pid)
+    info['children'] = len(tree.children(pid))
+    info['subtree'] = tree.rollup(pid)
+    return info
 
 def proc_tree(pid: int, depth: int = 2) -> Dict[str, Any]:
     """Parent/child view around PID up to depth."""
-    raise NotImplementedError
+    logging.debug(f"proc_tree: building tree for pid {pid} to depth {depth}")
+    tree, scan_age_s = _process_tree(pid)
+    subtree = tree.subtree(pid, depth)
+    if subtree is None:
+        return {'pid': pid, 'error': 'no such process (or not visible to this user)'}
+    return {'parents': tree.ancestors(pid), 'tree': subtree, 'scan_age_s': scan_age_s}
+
+def top_parents(limit: int = 3) -> Dict[str, Any]:
+    """Processes with the most direct children, from the registry's process tree."""
+    registry = PROCESS_REGISTRY
+    if registry.last_scan_at is None or time.monotonic() - registry.last_scan_at > PROCESS_TREE_MAX_AGE_S:
+        registry.scan()
+    return {'parents': registry.tree.top_parents(limit),
+            'scan_age_s': round(time.monotonic() - registry.last_scan_at, 1)}
 
 def connections_summary(
-    limit: int = 200, states: Optional[List[str]] = None
+    limit: int = 0, states: Optional[List[str]] = None, top_n: int = 5
 ) -> Dict[str, Any]:
-    """Network conn counts + small samples; cap by limit/states."""
-    raise NotImplementedError
+    """Network conn counts + `limit` sample sockets; filter by states."""
+    try:
+        return summarize_connections(limit=limit, states=states, top_n=top_n)
+    except psutil.AccessDenied:
+        # Only the psutil fallback (no /proc/net) needs privileges
+        return {"error": "listing connections requires elevated privileges on this platform"}
 
 def disk_usage(paths: Optional[List[str]] = None, top_n: int = 5) -> Dict[str, Any]:
     """Disk headroom per mount; optional focus on paths."""
@@ -193,17 +252,18 @@ def disk_usage(paths: Optional[List[str]] = None, top_n: int = 5) -> Dict[str, A
     
     return {'usage': usage_info}
 
-def disk_io_brief(sample_interval_s: int = 1, samples: int = 2) -> Dict[str, Any]:
-    """Quick disk throughput estimate using a short two-sample delta."""
-    raise NotImplementedError
+def disk_io_brief(top_n: int = 5) -> Dict[str, Any]:
+    """Per-disk bytes/s, IOPS, await and utilization since the previous call (first call: since boot)."""
+    return DISK_IO_SAMPLER.sample(top_n=top_n)
 
-def net_io_brief(sample_interval_s: int = 1, samples: int = 2) -> Dict[str, Any]:
-    """Quick network throughput estimate using a short two-sample delta."""
-    raise NotImplementedError
+def net_io_brief(top_n: int = 5) -> Dict[str, Any]:
+    """Per-NIC bytes/s, packets/s, errors and drops since the previous call (first call: since boot)."""
+    return NET_IO_SAMPLER.sample(top_n=top_n)
 
 def list_open_files(pid: int, limit: int = 100) -> Dict[str, Any]:
     """Sample of open files for PID; capped by limit."""
-    raise NotImplementedError
+    logging.debug(f"list_open_files: reading up to {limit} fds of pid {pid}")
+    return open_files.list_open_files(pid, limit=limit)
 
 def cpu_affinity_info(pid: int) -> Dict[str, Any]:
     """CPU affinity for PID if supported; else note unsupported."""
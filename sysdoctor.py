@@ -9,8 +9,9 @@ import time
 from colorama import Fore, Style
 import colorama
 from dotenv import load_dotenv
-from llm_api_client import create_prompt_and_get_response
-from daemon import start_daemon, launch_daemon, stop_daemon, is_daemon_running, get_recent_snapshots
+import llm_api_client
+from llm_api_client import ChatSession, set_snapshot_buffer
+from daemon import start_daemon, launch_daemon, stop_daemon, is_daemon_running, get_recent_snapshots, get_snapshot_ring
 
 def main():
     colorama.init()
@@ -19,6 +20,8 @@ def main():
     parser.add_argument("--daemon", action="store_true", help="Start daemon")
     parser.add_argument("--stop-daemon", action="store_true", help="Stop daemon")
     parser.add_argument("--daemon-status", action="store_true", help="Check daemon status")
+    parser.add_argument("--no-fast-path", action="store_true", help="Send every question to the model, even ones the local rules can answer")
+    parser.add_argument("--no-stream", action="store_true", help="Print each answer only once it is complete")
     args = parser.parse_args()
     
     logging.basicConfig(
@@ -64,6 +67,12 @@ def main():
     
     print("sysdoctor daemon is running. Starting chat interface...")
 
+    # Recent history comes straight from the daemon's shared-memory ring
+    snapshot_buffer = get_snapshot_ring()
+    set_snapshot_buffer(snapshot_buffer)
+    # One session for the whole chat, so follow-ups keep earlier findings
+    session = ChatSession(snapshot_buffer, fast_path=not args.no_fast_path)
+
     while True:
         try:
             print()
@@ -83,8 +92,33 @@ def main():
                 continue
             else:
                 logging.info(f"Executing command: {prompt}")
-                response = create_prompt_and_get_response(prompt)
-                print(f"\n{Fore.GREEN}sysdoctor>{Style.RESET_ALL} {response}\n")
+                if snapshot_buffer is None:
+                    # Daemon had not written its first sample yet at startup
+                    snapshot_buffer = get_snapshot_ring()
+                    set_snapshot_buffer(snapshot_buffer)
+                    session.snapshot_buffer = snapshot_buffer
+                if args.no_stream:
+                    response = session.ask(prompt)
+                    print(f"\n{Fore.GREEN}sysdoctor>{Style.RESET_ALL} {response}\n")
+                    continue
+                print(f"\n{Fore.GREEN}sysdoctor>{Style.RESET_ALL} ", end="", flush=True)
+                streamed = []
+                def print_token(token):
+                    streamed.append(token)
+                    print(token, end="", flush=True)
+                response = session.ask(prompt, on_token=print_token)
+                timing = llm_api_client.last_turn_timing
+                if timing.get("failed") and streamed:
+                    # What streamed before the failure is incomplete; show the fallback after it
+                    print(f"\n{Fore.RED}(answer interrupted){Style.RESET_ALL}\n{response}", end="")
+                elif not streamed:
+                    print(response, end="")
+                first_token = f"first token {timing['first_token_s']:.2f}s, " if "first_token_s" in timing else ""
+                if timing.get("local"):
+                    print(f"\n{Style.DIM}(answered locally in {timing['total_s'] * 1000:.0f}ms){Style.RESET_ALL}\n")
+                    continue
+                rounds = f", {timing['rounds']} tool rounds" if timing.get("rounds") else ""
+                print(f"\n{Style.DIM}({first_token}total {timing['total_s']:.2f}s{rounds}){Style.RESET_ALL}\n")
         except (KeyboardInterrupt, EOFError):
             print("\nExiting sysdoctor.")
             break
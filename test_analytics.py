@@ -0,0 +1,108 @@
+import math
+import random
+
+import pytest
+
+import analytics
+from analytics import analyze, analyze_points, columns, coverage, process_rss_reader, summarize, tier_samples
+
+
+@pytest.fixture(params=["stdlib", "numpy"])
+def backend(request, monkeypatch):
+    """Run a test against each summarize() implementation."""
+    if request.param == "numpy":
+        monkeypatch.setattr(analytics, "np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(analytics, "np", None)
+    return request.param
+
+
+def _column(ts, vs):
+    cols = columns([{"timestamp": t, "cpu_percent": v} for t, v in zip(ts, vs)],
+                   {"cpu": lambda s: s.get("cpu_percent")})
+    return cols["cpu"]
+
+
+def test_linear_series(backend):
+    stats = summarize(*_column([0, 3600, 7200], [1.0, 2.0, 3.0]))
+    assert stats["min"] == 1.0 and stats["max"] == 3.0 and stats["avg"] == 2.0
+    assert stats["std"] == round(math.sqrt(2 / 3), 3)
+    assert stats["p50"] == 2.0
+    assert stats["rolling_avg"] == 2.0
+    assert stats["ewma"] == 1.81
+    assert stats["slope_per_hour"] == 1.0
+    assert (stats["current"], stats["change"], stats["trend"], stats["samples"]) == (3.0, 2.0, "increasing", 3)
+    assert "change_point" not in stats  # a ramp is a slope, not a step
+
+
+def test_percentiles_interpolate(backend):
+    stats = summarize(*_column(range(5), [5.0, 1.0, 4.0, 2.0, 3.0]))
+    assert (stats["p50"], stats["p95"], stats["p99"]) == (3.0, 4.8, 4.96)
+
+
+def test_step_is_a_change_point(backend):
+    ts = [60.0 * i for i in range(20)]
+    stats = summarize(*_column(ts, [0.0] * 10 + [10.0] * 10))
+    assert stats["change_point"] == {"timestamp": 600.0, "mean_before": 0.0, "mean_after": 10.0}
+    assert stats["rolling_avg"] == 10.0
+
+
+def test_flat_and_short_series(backend):
+    stats = summarize(*_column([0, 60, 120], [5.0, 5.0, 5.0]))
+    assert (stats["std"], stats["slope_per_hour"], stats["trend"]) == (0.0, 0.0, "flat")
+    assert "change_point" not in stats
+    assert summarize(*_column([0], [5.0])) is None
+
+
+def test_bucket_extremes_come_from_the_buckets(backend):
+    points = [{"t": 0, "min": 1.0, "avg": 2.0, "max": 9.0}, {"t": 60, "min": 0.5, "avg": 3.0, "max": 4.0}]
+    stats = analyze_points(points)
+    assert (stats["min"], stats["max"], stats["avg"]) == (0.5, 9.0, 2.5)
+
+
+def test_numpy_matches_stdlib(monkeypatch):
+    numpy = pytest.importorskip("numpy")
+    rng = random.Random(7)
+    series = [
+        ([float(i) for i in range(200)], [rng.gauss(50, 10) for _ in range(200)]),
+        ([30.0 * i for i in range(50)], [float(i) + rng.random() for i in range(50)]),
+        ([10.0 * i for i in range(40)], [20.0] * 25 + [80.0] * 15),
+    ]
+    for ts, vs in series:
+        monkeypatch.setattr(analytics, "np", numpy)
+        fast = summarize(*_column(ts, vs))
+        monkeypatch.setattr(analytics, "np", None)
+        slow = summarize(*_column(ts, vs))
+        assert fast.keys() == slow.keys()
+        for key, value in slow.items():
+            if isinstance(value, float):
+                assert fast[key] == pytest.approx(value, abs=2e-3), key
+            else:
+                assert fast[key] == value, key
+
+
+def _live(ts, processes_at, rss):
+    top = [{"pid": 1, "name": "worker", "rss_mb": rss}] if rss is not None else []
+    return {"timestamp": ts, "cpu_percent": 1.0, "top_mem_processes": top,
+            "collected_at": {"processes": processes_at}}
+
+
+def test_tier_samples_yield_each_collection_once():
+    snapshots = [_live(100, 95, 10.0), _live(101, 95, 10.0), _live(102, 101.5, 12.0),
+                 {"timestamp": 103, "error": "boom"},
+                 {"timestamp": 104, "top_mem_processes": []}]  # stored record, no collected_at
+    assert [s["timestamp"] for s in tier_samples(snapshots, "processes")] == [95, 101.5, 104]
+
+
+def test_columns_dedupe_tiered_readers(backend):
+    snapshots = [_live(100, 95, 10.0), _live(101, 95, 10.0), _live(102, 101.5, 12.0)]
+    result = analyze(snapshots, {"cpu": lambda s: s.get("cpu_percent"), "rss": process_rss_reader("worker")})
+    assert result["cpu"]["samples"] == 3
+    assert result["rss"]["samples"] == 2
+    assert result["rss"]["change"] == 2.0
+
+
+def test_coverage_counts_collections_without_the_process():
+    snapshots = [_live(0, 0, 10.0), _live(10, 10, None), _live(20, 20, None), _live(30, 30, 11.0)]
+    assert coverage(snapshots, process_rss_reader("worker")) == {"coverage": 0.5, "max_gap_s": 30}
+    assert coverage([], process_rss_reader("worker")) is None
@@ -0,0 +1,126 @@
+import time
+from collections import deque
+
+import pytest
+
+import daemon
+from collectors import MAX_BACKOFF, Collector, CollectorSet
+from scheduler import HIGH, LOW
+
+
+def test_backs_off_to_max_and_recovers():
+    slow = True
+
+    def collect():
+        if slow:
+            time.sleep(0.02)
+        return {"value": 1}
+
+    collector = Collector("slow", collect, interval_s=10, budget_s=0.01)
+    backoffs = []
+    for _ in range(4):
+        collector.run(0)
+        backoffs.append(collector.backoff)
+    assert backoffs == [2, 4, MAX_BACKOFF, MAX_BACKOFF]
+    # Backed off: due only after interval x backoff
+    assert not collector.due(79, LOW)
+    assert collector.due(80, LOW)
+
+    slow = False  # well under half the budget again
+    backoffs = []
+    for _ in range(4):
+        collector.run(0)
+        backoffs.append(collector.backoff)
+    assert backoffs == [4, 2, 1, 1]
+
+
+def test_due_uses_the_high_rate_interval():
+    collector = Collector("processes", dict, interval_s=30, high_interval_s=2)
+    assert collector.due(0, LOW)  # never ran
+    collector.run(100)
+    assert not collector.due(102, LOW)
+    assert collector.due(102, HIGH)
+    assert collector.due(130, LOW)
+
+
+@pytest.fixture
+def tiers():
+    collectors = CollectorSet()
+    collectors.register("system", lambda: {"cpu_percent": 5.0}, interval_s=0)
+    collectors.register("processes", lambda: {"num_processes": 42}, interval_s=30)
+    collectors.register("disks", lambda: {"disk_usage": {"usage": []}}, interval_s=60)
+    return collectors
+
+
+def test_run_due_runs_only_due_tiers(tiers):
+    assert tiers.run_due(LOW, now=0) == ["system", "processes", "disks"]
+    assert tiers.run_due(LOW, now=10) == ["system"]
+    assert tiers.run_due(LOW, now=30) == ["system", "processes"]
+
+
+def test_merged_keeps_latest_of_every_tier_or_only_named_ones(tiers):
+    tiers.run_due(LOW, now=0)
+    ran = tiers.run_due(LOW, now=10)
+    merged = tiers.merged()
+    assert merged["cpu_percent"] == 5.0 and merged["num_processes"] == 42 and "disk_usage" in merged
+    assert set(merged["collected_at"]) == {"system", "processes", "disks"}
+
+    fresh = tiers.merged(tiers=ran)
+    assert fresh == {"cpu_percent": 5.0, "collected_at": {"system": tiers.get("system").collected_at}}
+
+
+def test_failing_collector_keeps_its_previous_value(tiers):
+    tiers.run_due(LOW, now=0)
+    collected_at = tiers.get("processes").collected_at
+    tiers.get("processes").collect = lambda: 1 / 0
+    assert tiers.run_due(LOW, now=30) == ["system"]
+    merged = tiers.merged()
+    assert merged["num_processes"] == 42
+    assert merged["collected_at"]["processes"] == collected_at
+
+
+class _StopLoop(Exception):
+    pass
+
+
+class _OneTickScheduler:
+    def __init__(self, low_interval_s):
+        self.mode = LOW
+        self.observed = []
+
+    def observe(self, snapshot):
+        self.observed.append(snapshot)
+
+    def wait(self):
+        raise _StopLoop
+
+
+def test_failing_sink_does_not_drop_the_sample_from_the_others(tiers, monkeypatch):
+    store, series, rollups, digest = deque(), [], [], []
+    schedulers = []
+
+    def scheduler(low_interval_s):
+        schedulers.append(_OneTickScheduler(low_interval_s))
+        return schedulers[-1]
+
+    def broken_ring():
+        raise OSError("ring unavailable")
+
+    monkeypatch.setattr(daemon, "SNAPSHOT_STORE", store)
+    monkeypatch.setattr(daemon, "COLLECTORS", None)
+    monkeypatch.setattr(daemon, "AdaptiveScheduler", scheduler)
+    monkeypatch.setattr(daemon, "build_collectors", lambda: tiers)
+    monkeypatch.setattr(daemon, "load_rollups", lambda: type("Rollups", (), {"add": staticmethod(rollups.append)})())
+    monkeypatch.setattr(daemon, "get_ring_writer", broken_ring)
+    monkeypatch.setattr(daemon, "get_series_store", lambda: type("Series", (), {"append": staticmethod(series.append)})())
+    monkeypatch.setattr(daemon, "DIGEST", type("Digest", (), {"update": lambda self, s, scan: digest.append(s)})())
+
+    with pytest.raises(_StopLoop):
+        daemon.snapshot_collector()
+
+    (snapshot,) = store
+    assert snapshot["cpu_percent"] == 5.0 and snapshot["sampling_mode"] == LOW
+    assert rollups == [snapshot] and digest == [snapshot]
+    assert schedulers[0].observed == [snapshot]
+    # The series store gets only the tiers collected this tick (all of them, on the first)
+    assert series[0]["num_processes"] == 42
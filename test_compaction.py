@@ -0,0 +1,55 @@
+import json
+import time
+
+import pytest
+
+from compaction import CHARS_PER_TOKEN, SERIES_MAX_ROWS, compact_tool_result, estimate_tokens
+
+
+def history(n):
+    now = time.time()
+    return {"snapshots": [{"timestamp": now - 10 * (n - i), "cpu_percent": 10.0 + (i % 7) * 1.123456,
+                           "memory_percent": 40.0 + i * 0.01} for i in range(n)]}
+
+
+def test_small_result_is_rounded_and_tabled():
+    result = {"top_cpu_processes": [{"pid": 1, "name": "a", "cpu_percent": 12.345678},
+                                    {"pid": 2, "name": "b", "cpu_percent": 1.23456}]}
+    compacted = json.loads(compact_tool_result("get_top_cpu_processes", result))
+    assert compacted == {"top_cpu_processes": {"columns": ["pid", "name", "cpu_percent"],
+                                               "rows": [[1, "a", 12.3], [2, "b", 1.23]]}}
+
+
+def test_long_series_is_summarized():
+    compacted = json.loads(compact_tool_result("get_snapshot_history", history(SERIES_MAX_ROWS + 10)))
+    series = compacted["snapshots"]
+    assert series["samples"] == SERIES_MAX_ROWS + 10
+    assert set(series["stats"]) == {"cpu_percent", "memory_percent"}
+    assert len(series["last"]["rows"]) == 3
+
+
+@pytest.mark.parametrize("budget", [40, 100, 300])
+def test_over_budget_result_is_complete_json_within_budget(budget):
+    result = {"processes": [{"pid": i, "name": f"proc-{i}", "cmdline": "x" * 200} for i in range(100)],
+              "note": "n"}
+    text = compact_tool_result("get_process_tree", result, budget_tokens=budget)
+    assert estimate_tokens(text) <= budget
+    compacted = json.loads(text)
+    table = compacted.get("processes")
+    if table is not None:
+        # Trailing rows go first, and the table says how many
+        assert len(table["rows"]) + table["omitted_rows"] == 100
+        assert [row[0] for row in table["rows"]] == list(range(len(table["rows"])))
+
+
+def test_fields_are_dropped_when_no_rows_are_left():
+    result = {"a": "q" * 5000, "b": "w" * 3000, "c": 1}
+    compacted = json.loads(compact_tool_result("x", result, budget_tokens=50))
+    assert compacted == {"c": 1, "truncated": True, "omitted_fields": ["a", "b"]}
+
+
+def test_plain_list_reports_omitted_items():
+    text = compact_tool_result("x", ["s" * 100] * 100, budget_tokens=100)
+    compacted = json.loads(text)
+    assert len(text) <= 100 * CHARS_PER_TOKEN
+    assert len(compacted["items"]) + compacted["omitted_items"] == 100
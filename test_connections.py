@@ -0,0 +1,102 @@
+import os
+import socket
+
+import psutil
+import pytest
+
+import connections
+from connections import _decode_ip, _GroupCounter, socket_owners, summarize_connections
+
+HEADER = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+
+
+def _line(local, remote, state, inode):
+    return f"   0: {local} {remote} {state} 00000000:00000000 00:00000000 00000000  1000        0 {inode} 1\n"
+
+
+@pytest.fixture
+def proc_net(tmp_path, monkeypatch):
+    tables = {
+        "tcp": [
+            _line("0100007F:1F90", "00000000:0000", "0A", 100),  # 127.0.0.1:8080 listening
+            _line("0100007F:1F90", "0500000A:C350", "01", 101),  # three clients of 10.0.0.5
+            _line("0100007F:1F90", "0500000A:C351", "01", 102),
+            _line("0100007F:1F90", "0500000A:C352", "01", 103),
+            _line("0100007F:1F90", "0600000A:C353", "06", 0),    # TIME_WAIT has no inode
+            "   1: truncated line\n",
+        ],
+        "tcp6": [_line("00000000000000000000000001000000:1F91", "00000000000000000000000000000000:0000", "0A", 300)],
+        "udp": [_line("00000000:0035", "00000000:0000", "07", 200)],
+    }
+    files = []
+    for proto, path in connections.PROC_NET_FILES:
+        fake = tmp_path / proto
+        if proto in tables:  # udp6 is missing, as with IPv6 disabled
+            fake.write_text(HEADER + "".join(tables[proto]))
+        files.append((proto, str(fake)))
+    monkeypatch.setattr(connections, "PROC_NET_FILES", tuple(files))
+    monkeypatch.setattr(connections, "socket_owners",
+                        lambda inodes: ({i: os.getpid() for i in inodes if i in ("100", "101")}, True))
+    return tmp_path
+
+
+@pytest.mark.parametrize("hex_ip, text", [
+    ("0100007F", "127.0.0.1"),
+    ("0500000A", "10.0.0.5"),
+    ("00000000000000000000000001000000", "::1"),
+    ("0000000000000000FFFF00000100007F", "127.0.0.1"),
+    ("B80D0120000000000000000001000000", "2001:db8::1"),
+])
+def test_decode_ip(hex_ip, text):
+    assert _decode_ip(hex_ip) == text
+
+
+def test_summary_from_proc_net(proc_net):
+    result = summarize_connections(limit=2)
+    me = {"pid": os.getpid(), "name": psutil.Process().name()}
+    assert result["source"] == "proc"
+    assert result["total"] == 7
+    assert result["by_protocol"] == {"tcp": 5, "tcp6": 1, "udp": 1}
+    assert result["by_state"] == {"ESTABLISHED": 3, "LISTEN": 2, "TIME_WAIT": 1, "UNCONN": 1}
+    assert [(l["protocol"], l["address"], l["port"]) for l in result["listeners"]] == \
+        [("udp", "0.0.0.0", 53), ("tcp", "127.0.0.1", 8080), ("tcp6", "::1", 8081)]
+    assert result["listeners"][1]["processes"] == [me]
+    assert result["top_local_ports"] == [{"port": 8080, "count": 4, "processes": [me]}]
+    assert result["top_remote_peers"][0] == {"address": "10.0.0.5", "count": 3, "processes": [me]}
+    assert result["samples"] == [
+        {"protocol": "tcp", "state": "ESTABLISHED", "local": "127.0.0.1:8080", "remote": "10.0.0.5:50000"},
+        {"protocol": "tcp", "state": "ESTABLISHED", "local": "127.0.0.1:8080", "remote": "10.0.0.5:50001"},
+    ]
+    assert "approximate" not in result and "attribution_partial" not in result
+
+
+def test_state_filter(proc_net):
+    result = summarize_connections(states=["time_wait"])
+    assert result["total"] == 1
+    assert result["top_remote_peers"] == [{"address": "10.0.0.6", "count": 1, "processes": []}]
+    assert result["listeners"] == [] and result["samples"] == []
+
+
+def test_group_counter_prunes_the_smaller_half():
+    counter = _GroupCounter(max_groups=4)
+    for key, count in (("a", 5), ("b", 1), ("c", 2), ("d", 3)):
+        for i in range(count):
+            counter.add(key, f"{key}{i}")
+    assert counter.max_pruned == 0
+    counter.add("e", "0")
+    # Keys counted up to the median (3) are pruned to make room
+    assert counter.max_pruned == 3
+    assert set(counter.counts) == {"a", "e"}
+    assert counter.inodes["e"] == []  # inode 0 is never a sample
+    assert counter.top(1) == [("a", 5)]
+    assert len(counter.inodes["a"]) == 5
+
+
+def test_socket_owners_finds_our_socket():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        inode = str(os.fstat(sock.fileno()).st_ino)
+        assert socket_owners({inode, "pid:42"}, budget_s=5.0) == ({inode: os.getpid(), "pid:42": 42}, True)
+        # Out of time before the walk starts: what is known so far, flagged incomplete
+        assert socket_owners({inode}, budget_s=-1.0) == ({}, False)
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from diagnosis import answer_locally, match_intent, run_rules
+
+
+def snapshot(**overrides):
+    base = {
+        "timestamp": time.time(),
+        "cpu_percent": 12.0,
+        "load_avg": [0.5, 0.4, 0.3],
+        "memory": {"percent_used": 40.0, "available_gb": 8.0},
+        "disk_usage": {"usage": [{"location": "/", "percent_used": 50.0, "free_gb": 100.0}]},
+        "num_processes": 300,
+        "top_cpu_processes": [{"pid": 10, "name": "python", "cpu_percent": 5.0}],
+        "top_mem_processes": [{"pid": 10, "name": "python", "rss_mb": 100.0}],
+    }
+    base.update(overrides)
+    return base
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("is my disk full?", "disk"),
+    ("am I running out of disk space?", "disk"),
+    ("how much free space is left?", "disk"),
+    ("what's using my cpu?", "cpu"),
+    ("why are my fans so loud?", "cpu"),
+    ("is my memory ok?", "memory"),
+    ("why is the load average so high?", "load"),
+    ("why is the load so high?", "load"),
+    ("is something spawning runaway processes?", "processes"),
+])
+def test_matches_clear_questions(question, intent):
+    assert match_intent(question) == intent
+
+
+@pytest.mark.parametrize("question", [
+    # Disk I/O, not disk space
+    "why is my disk so slow?",
+    "is my disk busy?",
+    "which process is writing to disk?",
+    "what is reading from my drive?",
+    # "load" as a verb
+    "why won't chrome load?",
+    "why does the page take forever to load?",
+    # Verbs that name no resource
+    "what's eating my battery?",
+    "is something leaking?",
+    # Two resources at once
+    "is my memory full?",
+    "is it the cpu or the memory?",
+])
+def test_leaves_unclear_questions_to_the_model(question):
+    assert match_intent(question) is None
+
+
+def test_disk_io_question_gets_no_space_verdict():
+    snapshots = [snapshot()]
+    assert answer_locally("why is my disk so slow?", snapshots, run_rules(snapshots)) is None
+
+
+def test_answers_disk_space_from_findings():
+    full = {"usage": [{"location": "/", "percent_used": 97.0, "free_gb": 1.0}]}
+    snapshots = [snapshot(disk_usage=full)]
+    answer = answer_locally("is my disk full?", snapshots, run_rules(snapshots))
+    assert "Nearly full" in answer and "/ 97%" in answer
+
+
+def test_stale_snapshots_go_to_the_model():
+    snapshots = [snapshot(timestamp=time.time() - 3600)]
+    assert answer_locally("is my disk full?", snapshots, run_rules(snapshots)) is None
+
+
+def test_runaway_children_names_spawner_from_parent_counts():
+    snapshots = [snapshot(timestamp=time.time() - 300, num_processes=300), snapshot(num_processes=900)]
+    calls = []
+
+    def parents():
+        calls.append(1)
+        return [{"pid": 42, "name": "make", "children": 500}, {"pid": 7, "name": "sshd", "children": 3}]
+
+    finding = next(f for f in run_rules(snapshots, parents=parents) if f["rule"] == "runaway_children")
+    assert "make (pid 42) has 500 children" in finding["summary"]
+    assert [p["pid"] for p in finding["evidence"]["parents"]] == [42]
+    # Only asked when spawning looks out of control
+    run_rules([snapshot()], parents=parents)
+    assert len(calls) == 1
+
+
+def test_stale_process_tier_counts_once():
+    # One scan 200s ago, merged into every sample since: not a sustained hog
+    now = time.time()
+    hog = [{"pid": 10, "name": "python", "cpu_percent": 99.0}]
+    snapshots = [snapshot(timestamp=now - 200 + 10 * i, top_cpu_processes=hog,
+                          collected_at={"system": now - 200 + 10 * i, "processes": now - 200})
+                 for i in range(21)]
+    finding = next(f for f in run_rules(snapshots) if f["rule"] == "cpu_hog")
+    assert finding["evidence"]["duration_s"] == 0
+    assert finding["severity"] == "info"
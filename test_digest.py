@@ -0,0 +1,87 @@
+from digest import LONGEST_WINDOW_S, DiagnosticDigest, format_digest
+
+
+def _snapshot(ts, cpu=10.0, mem=50.0, load=0.5, **extra):
+    snapshot = {"timestamp": ts, "cpu_percent": cpu, "memory": {"percent_used": mem, "available_gb": 4.0},
+                "load_avg": [load, load, load]}
+    snapshot.update(extra)
+    return snapshot
+
+
+def _proc(pid, name, cpu=1.0, rss_mb=50.0, create_time=0.0):
+    return {"pid": pid, "name": name, "cpu_percent": cpu, "rss_mb": rss_mb, "create_time": create_time}
+
+
+def test_deltas_against_each_window_baseline():
+    digest = DiagnosticDigest(cores=4)
+    digest.update(_snapshot(0.0, cpu=0.0))
+    assert digest.to_dict()["deltas"] == {}  # nothing to compare the first sample with
+
+    for ts in range(10, 901, 10):
+        digest.update(_snapshot(float(ts), cpu=ts / 20))  # CPU climbs 3 points a minute
+    deltas = digest.to_dict()["deltas"]
+    assert deltas["1m"] == {}  # 42 -> 45 is under the 5-point bar
+    assert deltas["5m"] == {"cpu_percent": {"from": 30.0, "to": 45.0, "change": 15.0}}
+    assert deltas["15m"] == {"cpu_percent": {"from": 0.0, "to": 45.0, "change": 45.0}}
+
+
+def test_error_sample_keeps_the_last_good_state():
+    digest = DiagnosticDigest(cores=4)
+    digest.update(_snapshot(0.0, cpu=12.0))
+    digest.update({"timestamp": 10.0, "error": "sample not collected"})
+    document = digest.to_dict()
+    assert document["current"]["cpu_percent"] == 12.0
+    assert document["updated_at"] == 0.0
+    assert (document["last_error"], document["last_error_at"]) == ("sample not collected", 10.0)
+
+
+def test_top_movers_against_the_oldest_baseline_in_five_minutes():
+    digest = DiagnosticDigest(cores=4)
+    for ts in range(0, 361, 30):
+        digest.update(_snapshot(float(ts)), [
+            _proc(1, "builder", cpu=10 + ts / 12),
+            _proc(2, "cache", rss_mb=100.0 + ts),
+            _proc(3, "cooling", cpu=20 - ts / 20),
+            _proc(4, "late", cpu=ts / 10, create_time=float(min(ts, 300))),  # not in any baseline
+        ])
+    movers = digest.to_dict()["top_movers"]
+    # Baselines are kept once a minute; the one at t=60 is the oldest still inside the window
+    assert movers["cpu"] == [{"pid": 1, "name": "builder", "cpu_percent": 40.0, "growth": 25.0, "over_s": 300}]
+    assert movers["rss"] == [{"pid": 2, "name": "cache", "rss_mb": 460.0, "growth": 300.0, "over_s": 300}]
+
+
+def test_heavy_processes_starting_and_exiting():
+    digest = DiagnosticDigest(cores=4)
+    veteran = _proc(1, "postgres", cpu=60.0, create_time=0.0)  # heavy, but started long ago
+    digest.update(_snapshot(1000.0), [veteran])
+    assert digest.to_dict()["heavy_process_events"] == []
+
+    digest.update(_snapshot(1010.0), [veteran, _proc(2, "ffmpeg", cpu=50.0, create_time=1005.0)])
+    digest.update(_snapshot(1020.0), [veteran, _proc(2, "ffmpeg", cpu=1.0, create_time=1005.0)])  # quiet now
+    digest.update(_snapshot(1030.0), [veteran])
+    events = [(e["event"], e["name"], e["cpu_percent"], e["at"]) for e in digest.to_dict()["heavy_process_events"]]
+    # The exit reports the process as last seen heavy
+    assert events == [("started", "ffmpeg", 50.0, 1010.0), ("exited", "ffmpeg", 50.0, 1030.0)]
+
+    digest.update(_snapshot(1030.0 + LONGEST_WINDOW_S + 1), [veteran])
+    assert digest.to_dict()["heavy_process_events"] == []
+
+
+def test_breach_goes_from_ongoing_to_recently_cleared():
+    digest = DiagnosticDigest(cores=4)
+    digest.update(_snapshot(0.0, cpu=95.0, load=8.0))  # 2.0 per core
+    digest.update(_snapshot(10.0, cpu=99.0, load=4.0))
+    ongoing = {b["breach"]: b for b in digest.to_dict()["breaches"]}
+    assert ongoing["cpu_high"] == {"breach": "cpu_high", "limit": 90.0, "since": 0.0, "peak": 99.0, "value": 99.0}
+    assert "load_high" not in ongoing
+    assert [b["breach"] for b in digest.to_dict()["cleared_breaches"]] == ["load_high"]
+
+    digest.update(_snapshot(20.0, cpu=50.0))
+    document = digest.to_dict()
+    assert document["breaches"] == []
+    cleared = document["cleared_breaches"][-1]
+    assert (cleared["breach"], cleared["since"], cleared["peak"], cleared["cleared_at"]) == ("cpu_high", 0.0, 99.0, 20.0)
+    assert "BREACH" not in format_digest(document) and "Cleared cpu_high" in format_digest(document)
+
+    digest.update(_snapshot(20.0 + LONGEST_WINDOW_S + 1, cpu=50.0))
+    assert digest.to_dict()["cleared_breaches"] == []
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+
+import pytest
+
+import llm_api_client
+from llm_api_client import (HISTORY_TOKEN_LIMIT, KEEP_RECENT_TURNS, SUMMARY_ANSWER_CHARS, SUMMARY_MAX_TURNS,
+                            ChatSession, execute_tool_calls, format_snapshot_delta)
+
+
+def _call(name, arguments):
+    return {"id": f"call_{name}", "type": "function",
+            "function": {"name": name, "arguments": arguments if isinstance(arguments, str) else json.dumps(arguments)}}
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    """Replace the tool bodies: "slow" sleeps, everything else echoes its arguments. Returns the calls made."""
+    calls = []
+    lock = threading.Lock()
+
+    def execute_tool_call(name, arguments):
+        with lock:
+            calls.append((name, arguments))
+        if name == "slow":
+            time.sleep(0.5)
+        return {"tool": name, **arguments}
+
+    monkeypatch.setattr(llm_api_client, "execute_tool_call", execute_tool_call)
+    return calls
+
+
+def test_results_come_back_in_call_order(tools):
+    results = execute_tool_calls([_call("a", {"n": 1}), _call("b", {}), _call("c", {"n": 3})])
+    assert results == [{"tool": "a", "n": 1}, {"tool": "b"}, {"tool": "c", "n": 3}]
+
+
+def test_identical_calls_run_once(tools):
+    results = execute_tool_calls([_call("top", {"n": 5, "sort": "cpu"}), _call("top", '{"sort": "cpu", "n": 5}'),
+                                  _call("top", {"n": 3})])
+    assert sorted(tools, key=str) == [("top", {"n": 3}), ("top", {"n": 5, "sort": "cpu"})]
+    assert results[0] == results[1] == {"tool": "top", "n": 5, "sort": "cpu"}
+    assert results[2] == {"tool": "top", "n": 3}
+
+
+def test_invalid_arguments_are_reported_without_running(tools):
+    (result,) = execute_tool_calls([_call("a", "{not json")])
+    assert result["error"].startswith("Invalid arguments")
+    assert tools == []
+
+
+def test_slow_tool_times_out_without_holding_back_the_others(tools, monkeypatch):
+    monkeypatch.setattr(llm_api_client, "TOOL_TIMEOUTS_S", {"slow": 0.1})
+    started = time.perf_counter()
+    results = execute_tool_calls([_call("slow", {}), _call("fast", {})])
+    assert time.perf_counter() - started < 0.4
+    assert results == [{"error": "slow timed out after 0.1s"}, {"tool": "fast"}]
+
+
+def test_turn_deadline_cuts_off_tools_before_their_own_timeout(tools):
+    results = execute_tool_calls([_call("slow", {})], deadline=time.perf_counter() + 0.1)
+    assert results == [{"error": "slow cut off by the turn budget"}]
+
+
+def _snapshot(ts, cpu=10.0, mem=50.0, top_cpu=(), **extra):
+    snapshot = {"timestamp": ts, "cpu_percent": cpu, "memory": {"percent_used": mem, "available_gb": 4.0},
+                "load_avg": [0.5, 0.5, 0.5],
+                "top_cpu_processes": [{"pid": pid, "name": name, "cpu_percent": 10.0} for pid, name in top_cpu]}
+    snapshot.update(extra)
+    return snapshot
+
+
+def test_delta_reports_only_threshold_crossings():
+    delta = format_snapshot_delta(_snapshot(1000.0, cpu=10.0, mem=50.0), _snapshot(1030.0, cpu=14.9, mem=52.0))
+    assert delta == "Changes in the 30s since the previous question:\n- Memory used: 50.0% -> 52.0% (+2.0)"
+
+
+def test_delta_compares_only_the_leading_processes():
+    before = _snapshot(1000.0, top_cpu=[(1, "a"), (2, "b"), (3, "c"), (4, "d")])
+    after = _snapshot(1030.0, top_cpu=[(1, "a"), (5, "e"), (2, "b"), (3, "c")])
+    # c falls to fourth and counts as leaving; d was already fourth, so its exit is not reported
+    assert format_snapshot_delta(before, after).splitlines()[1:] == [
+        "- New in top CPU: e (pid 5, 10.0%)", "- Left top CPU: c (pid 3)"]
+
+
+def test_delta_without_changes_or_new_samples():
+    before = _snapshot(1000.0, top_cpu=[(1, "a")])
+    assert format_snapshot_delta(before, _snapshot(1030.0, cpu=12.0, top_cpu=[(1, "a")])) == \
+        "No significant change in the 30s since the previous question."
+    assert format_snapshot_delta(before, before) == "No new sample since the previous question."
+    assert format_snapshot_delta(before, {"timestamp": 1030.0, "error": "sample not collected"}) == \
+        "Latest sample (30s later) failed: sample not collected"
+
+
+def _turn(i, answer_chars=100):
+    return [{"role": "user", "content": f"System Context:\n{'x' * 2000}\n\nUser Question: q{i}", "question": f"q{i}"},
+            {"role": "assistant", "content": None, "tool_calls": [_call("get_current_snapshot", {})]},
+            {"role": "tool", "tool_call_id": "call_get_current_snapshot", "content": "y" * 2000},
+            {"role": "assistant", "content": " ".join(["word"] * (answer_chars // 5))}]
+
+
+def test_history_under_the_limit_is_kept_verbatim():
+    session = ChatSession(fast_path=False)
+    session.turns = [_turn(i) for i in range(3)]
+    assert session.history_tokens() < HISTORY_TOKEN_LIMIT
+    session._compact_history()
+    assert len(session.turns) == 3 and not session.summary
+
+
+def test_history_past_the_limit_folds_the_oldest_turns():
+    session = ChatSession(fast_path=False)
+    session.turns = [_turn(i, answer_chars=1000) for i in range(8)]
+    assert session.history_tokens() > HISTORY_TOKEN_LIMIT
+    session._compact_history()
+    assert session.history_tokens() <= HISTORY_TOKEN_LIMIT
+    kept = [turn[0]["question"] for turn in session.turns]
+    assert kept == [f"q{i}" for i in range(8 - len(kept), 8)]
+    assert len(session.summary) == 8 - len(kept)
+    # Summaries keep the bare question and a cut-down answer, not the context or tool results
+    first = session.summary[0]
+    assert first.startswith("- Q: q0\n  A: word") and first.endswith(" ...")
+    assert len(first) < len("- Q: q0\n  A: ") + SUMMARY_ANSWER_CHARS + 4
+    assert session._history()[1]["content"].startswith("Summary of earlier conversation:\n- Q: q0")
+
+
+def test_recent_turns_stay_verbatim_however_long(monkeypatch):
+    monkeypatch.setattr(llm_api_client, "HISTORY_TOKEN_LIMIT", 0)
+    session = ChatSession(fast_path=False)
+    total = SUMMARY_MAX_TURNS + 5
+    session.turns = [_turn(i) for i in range(total)]
+    session._compact_history()
+    assert [turn[0]["question"] for turn in session.turns] == [f"q{i}" for i in range(total - KEEP_RECENT_TURNS, total)]
+    # Only the newest SUMMARY_MAX_TURNS summaries are kept
+    assert len(session.summary) == SUMMARY_MAX_TURNS
+    assert session.summary[0].startswith(f"- Q: q{total - KEEP_RECENT_TURNS - SUMMARY_MAX_TURNS}\n")
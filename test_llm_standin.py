@@ -0,0 +1,151 @@
+from collections import deque
+
+import pytest
+
+import llm_api_client
+from llm_api_client import BUDGET_NOTE, ChatSession
+from llm_standin import REPLY, TOOL_SEQUENCE, USAGE, start_standin
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """Point the shared client at a stand-in server; returns a function that starts one."""
+    servers = []
+    # Keep tool calls local even if a daemon happens to be running
+    monkeypatch.setattr(llm_api_client, "query_daemon", lambda op, **args: None)
+    monkeypatch.setattr(llm_api_client, "_client", None)
+    monkeypatch.setattr(llm_api_client, "last_turn_timing", {})
+
+    def start(**kwargs):
+        server, base_url = start_standin(**kwargs)
+        servers.append(server)
+        llm_api_client.configure_client(base_url=base_url, api_key="stand-in", max_retries=0, timeout_s=10.0)
+        return base_url
+
+    yield start
+    if llm_api_client._client is not None:
+        llm_api_client._client.close()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_tool_rounds_then_answer(standin):
+    standin(tool_rounds=2)
+    session = ChatSession(deque(), fast_path=False)
+    assert session.ask("what's eating my CPU?") == REPLY
+    assert llm_api_client.last_turn_timing["rounds"] == 2
+
+    (turn,) = session.turns
+    called = [m["tool_calls"][0]["function"]["name"] for m in turn if m.get("tool_calls")]
+    assert called == [name for name, _ in TOOL_SEQUENCE[:2]]
+    assert sum(1 for m in turn if m["role"] == "tool") == 2
+    assert turn[-1] == {"role": "assistant", "content": REPLY}
+
+
+def test_streamed_answer(standin):
+    standin(tool_rounds=1)
+    tokens = []
+    session = ChatSession(deque(), fast_path=False)
+    assert session.ask("what's eating my CPU?", on_token=tokens.append) == REPLY
+    assert "".join(tokens) == REPLY
+    assert llm_api_client.last_turn_timing["rounds"] == 1
+    assert llm_api_client.last_turn_timing["first_token_s"] > 0
+    assert llm_api_client.last_turn_timing["tokens"] > 0
+    assert "failed" not in llm_api_client.last_turn_timing
+
+
+def test_follow_up_reuses_history(standin):
+    standin(tool_rounds=1)
+    session = ChatSession(deque(), fast_path=False)
+    session.ask("what's eating my CPU?")
+    # The earlier tool round is in the resent history, so the stand-in answers directly
+    assert session.ask("and now?") == REPLY
+    assert llm_api_client.last_turn_timing["rounds"] == 0
+    assert len(session.turns) == 2
+
+
+def test_unreachable_model(standin):
+    server, base_url = start_standin()
+    server.shutdown()
+    server.server_close()  # nothing listens on base_url any more
+    llm_api_client.configure_client(base_url=base_url, api_key="stand-in", max_retries=0, timeout_s=2.0)
+    session = ChatSession(deque(), fast_path=False)
+    assert session.ask("what's eating my CPU?").startswith("Error:")
+    assert session.turns == []
+
+
+def test_failed_turn_is_left_out_of_the_history(standin):
+    standin(tool_rounds=1)
+    session = ChatSession(deque(), fast_path=False)
+    session.ask("what's eating my CPU?")
+    history = session._history()
+
+    llm_api_client.configure_client(base_url="http://127.0.0.1:9/v1", api_key="stand-in", max_retries=0, timeout_s=2.0)
+    assert session.ask("and now?").startswith("Error:")
+    assert session._history() == history
+
+
+def test_stream_dropped_partway(standin):
+    standin(tool_rounds=0, drop_after=3)
+    tokens = []
+    session = ChatSession(deque(), fast_path=False)
+    response = session.ask("what's eating my CPU?", on_token=tokens.append)
+    # Part of the answer was shown before the link dropped; the turn still reports failure
+    assert tokens and REPLY.startswith("".join(tokens))
+    assert response.startswith("Error:")
+    assert llm_api_client.last_turn_timing["failed"] is True
+    assert session.turns == []
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    """Record the messages and tool options of every model call in a turn."""
+    calls = []
+    complete = llm_api_client._complete
+
+    def recording(client, messages, on_token, timing, deadline, **kwargs):
+        calls.append((messages, kwargs))
+        return complete(client, messages, on_token, timing, deadline, **kwargs)
+
+    monkeypatch.setattr(llm_api_client, "_complete", recording)
+    return calls
+
+
+def _assert_budget_answer(completions, rounds):
+    assert len(completions) == rounds + 1
+    assert all("tools" in kwargs for _, kwargs in completions[:-1])
+    # Once the budget is spent the model gets one more call, without tools, told to answer
+    messages, kwargs = completions[-1]
+    assert "tools" not in kwargs
+    assert messages[-1] == {"role": "system", "content": BUDGET_NOTE}
+
+
+def test_tool_rounds_stop_at_max_tool_rounds(standin, completions, monkeypatch):
+    monkeypatch.setattr(llm_api_client, "MAX_TOOL_ROUNDS", 2)
+    standin(tool_rounds=10)
+    session = ChatSession(deque(), fast_path=False)
+    assert session.ask("what's eating my CPU?") == REPLY
+    assert llm_api_client.last_turn_timing["rounds"] == 2
+    _assert_budget_answer(completions, rounds=2)
+
+
+def test_tool_rounds_stop_at_token_budget(standin, completions, monkeypatch):
+    monkeypatch.setattr(llm_api_client, "TURN_TOKEN_BUDGET", USAGE["total_tokens"] + 1)
+    standin(tool_rounds=10)
+    session = ChatSession(deque(), fast_path=False)
+    assert session.ask("what's eating my CPU?", on_token=lambda token: None) == REPLY
+    assert llm_api_client.last_turn_timing["rounds"] == 2
+    assert llm_api_client.last_turn_timing["tokens"] == 3 * USAGE["total_tokens"]
+    _assert_budget_answer(completions, rounds=2)
+
+
+def test_tool_rounds_stop_at_time_budget(standin, completions, monkeypatch):
+    # Only the first 0.2 s of the turn may start a tool round; each model call takes 0.3 s
+    monkeypatch.setattr(llm_api_client, "TURN_BUDGET_S", 10.0)
+    monkeypatch.setattr(llm_api_client, "FINAL_ANSWER_RESERVE_S", 9.8)
+    standin(tool_rounds=10, latency_s=0.3)
+    session = ChatSession(deque(), fast_path=False)
+    assert session.ask("what's eating my CPU?") == REPLY
+    assert llm_api_client.last_turn_timing["rounds"] == 1
+    _assert_budget_answer(completions, rounds=1)
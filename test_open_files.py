@@ -0,0 +1,83 @@
+import os
+import socket
+
+import psutil
+import pytest
+
+import open_files
+from open_files import fd_count, fd_type, iter_fds, list_open_files
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc/<pid>/fd")
+
+PID = os.getpid()
+
+
+@pytest.fixture
+def opened(tmp_path):
+    """A pipe, a socket and a deleted file held open by this process; returns their fds."""
+    read_end, write_end = os.pipe()
+    sock = socket.socket()
+    path = tmp_path / "scratch.log"
+    deleted = os.open(path, os.O_CREAT | os.O_WRONLY)
+    os.unlink(path)
+    yield {"pipe": [read_end, write_end], "socket": [sock.fileno()], "deleted": deleted, "path": str(path)}
+    os.close(read_end)
+    os.close(write_end)
+    os.close(deleted)
+    sock.close()
+
+
+def test_fd_type():
+    assert [fd_type(t) for t in ("/dev/null", "/var/log/syslog", "socket:[123]", "pipe:[456]",
+                                 "anon_inode:[eventfd]", "net:[789]")] == \
+        ["device", "file", "socket", "pipe", "anon", "other"]
+
+
+def test_iter_fds_reads_link_targets(opened):
+    targets = dict(iter_fds(PID))
+    assert all(targets[fd].startswith("pipe:") for fd in opened["pipe"])
+    assert targets[opened["socket"][0]].startswith("socket:")
+    assert targets[opened["deleted"]] == f"{opened['path']} (deleted)"
+
+
+def test_counts_by_type_and_deleted_files(request, tmp_path):
+    before = list_open_files(PID, limit=0)
+    opened = request.getfixturevalue("opened")
+    after = list_open_files(PID)
+
+    grew = {kind: after["by_type"].get(kind, 0) - before["by_type"].get(kind, 0)
+            for kind in ("pipe", "socket", "file")}
+    assert grew == {"pipe": 2, "socket": 1, "file": 1}
+    assert after["deleted_files"] == before["deleted_files"] + 1
+    assert {"fd": opened["deleted"], "type": "file", "target": f"{opened['path']} (deleted)"} in after["files"]
+    assert {"dir": str(tmp_path), "count": 1} in after["top_dirs"]
+    assert after["num_fds"] == before["num_fds"] + 4
+
+
+def test_limit_and_summary_limit(opened):
+    total = fd_count(PID)
+    assert total >= 6  # stdio plus the fixture's four
+
+    listed = list_open_files(PID, limit=2, summary_limit=3)
+    assert [f["fd"] for f in listed["files"]] == sorted(f["fd"] for f in listed["files"])
+    assert len(listed["files"]) == 2
+    assert listed["summarized"] == 3 and sum(listed["by_type"].values()) == 3
+    assert listed["num_fds"] == total  # the total still counts every fd
+
+    # The summary always covers at least the listed fds
+    listed = list_open_files(PID, limit=4, summary_limit=1)
+    assert len(listed["files"]) == listed["summarized"] == 4
+
+
+@pytest.mark.skipif(not open_files.FAST_FD_COUNT, reason="needs Linux 6.2+ for the fd count in st_size")
+def test_fd_count_is_the_size_of_the_fd_directory(opened, monkeypatch):
+    # Walking the directory holds one more fd open while it runs
+    assert fd_count(PID) + 1 == len(list(iter_fds(PID)))
+    monkeypatch.setattr(open_files, "FAST_FD_COUNT", False)
+    assert fd_count(PID) == psutil.Process(PID).num_fds()
+
+
+def test_missing_process():
+    pid = max(psutil.pids()) + 100_000
+    assert fd_count(pid) is None
+    assert list_open_files(pid) == {"pid": pid, "error": "no such process"}
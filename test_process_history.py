@@ -0,0 +1,37 @@
+from process_history import ProcessHistoryIndex
+
+
+def scan(i, leaky_cpu=0.0):
+    return [{"pid": 1, "create_time": 1.0, "name": "leaky", "cpu_percent": leaky_cpu, "rss_mb": 100.0 + 10 * i},
+            {"pid": 2, "create_time": 1.0, "name": "big", "cpu_percent": 50.0, "rss_mb": 5000.0},
+            {"pid": 3, "create_time": 1.0, "name": "leaky", "cpu_percent": 0.0, "rss_mb": 1.0}]
+
+
+def test_tracked_process_keeps_its_series_after_leaving_the_top():
+    index = ProcessHistoryIndex(track_top=1)
+    for i in range(10):
+        # Ranks first by CPU only on the first scan
+        index.update(scan(i, leaky_cpu=99.0 if i == 0 else 0.0), timestamp=1000.0 + 10 * i)
+    [series] = index.lookup("leaky", limit=0)
+    assert series["pid"] == 1 and series["samples"] == 10
+
+
+def test_rss_series_sums_tracked_processes_per_scan_without_gaps():
+    index = ProcessHistoryIndex(track_top=1)
+    for i in range(10):
+        index.update(scan(i, leaky_cpu=99.0 if i == 0 else 0.0), timestamp=1000.0 + 10 * i)
+    result = index.rss_series("leaky", since=1030.0)
+    assert result["processes"] == 1  # pid 3 never ranked, so it is not tracked
+    assert result["tracked_since"] == 1000.0
+    assert [p["t"] for p in result["points"]] == [1030.0 + 10 * i for i in range(7)]
+    assert [p["value"] for p in result["points"]][:2] == [130.0, 140.0]
+    assert index.rss_series("nothing")["points"] == []
+
+
+def test_exited_series_are_evicted():
+    index = ProcessHistoryIndex(track_top=3, evict_after_s=60)
+    index.update(scan(0), timestamp=1000.0)
+    index.update([], timestamp=1010.0)
+    assert index.lookup("big")[0]["exited_at"] == 1010.0
+    index.update([], timestamp=1100.0)
+    assert index.lookup("big") == [] and len(index) == 0
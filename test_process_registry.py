@@ -0,0 +1,169 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import psutil
+import pytest
+
+import process_registry
+from process_registry import BYTES_PER_MB, CMDLINE_MAX_CHARS, ProcessRegistry
+
+
+class FakeProcess:
+    """Stands in for psutil.Process, reading whatever the fake process table holds for its pid."""
+
+    table = {}
+
+    def __init__(self, pid):
+        if pid not in self.table:
+            raise psutil.NoSuchProcess(pid)
+        self.pid = pid
+
+    def _info(self):
+        info = self.table.get(self.pid)
+        if info is None:
+            raise psutil.NoSuchProcess(self.pid)
+        if info.get("denied"):
+            raise psutil.AccessDenied(self.pid)
+        return info
+
+    def oneshot(self):
+        return nullcontext()
+
+    def create_time(self):
+        return self._info()["create_time"]
+
+    def status(self):
+        return self._info().get("status", psutil.STATUS_RUNNING)
+
+    def cpu_times(self):
+        info = self._info()
+        return SimpleNamespace(user=info["cpu"] / 2, system=info["cpu"] / 2)
+
+    def name(self):
+        return self._info()["name"]
+
+    def memory_info(self):
+        return SimpleNamespace(rss=64 * BYTES_PER_MB, vms=128 * BYTES_PER_MB)
+
+    def ppid(self):
+        return self._info().get("ppid", 1)
+
+    def num_threads(self):
+        return 1
+
+    def cmdline(self):
+        self.table[self.pid]["cmdline_reads"] = self.table[self.pid].get("cmdline_reads", 0) + 1
+        return self._info().get("cmdline", [])
+
+
+@pytest.fixture
+def procs(monkeypatch):
+    """Fake process table and clocks; edit the table and advance the clocks between scans."""
+    clock = SimpleNamespace(wall=1100.0, mono=50.0)
+    table = {}
+    monkeypatch.setattr(FakeProcess, "table", table)
+    monkeypatch.setattr(process_registry.psutil, "Process", FakeProcess)
+    monkeypatch.setattr(process_registry.psutil, "pids", lambda: sorted(table))
+    monkeypatch.setattr(process_registry, "time",
+                        SimpleNamespace(time=lambda: clock.wall, monotonic=lambda: clock.mono))
+    monkeypatch.setattr(process_registry, "fd_count", lambda pid: 7)
+
+    def advance(seconds):
+        clock.wall += seconds
+        clock.mono += seconds
+
+    return SimpleNamespace(table=table, advance=advance)
+
+
+def _by_pid(records):
+    return {r["pid"]: r for r in records}
+
+
+def test_first_sighting_reports_the_lifetime_average(procs):
+    procs.table[10] = {"name": "hog", "create_time": 1000.0, "cpu": 50.0}  # 50 s of CPU in 100 s
+    (record,) = ProcessRegistry().scan()
+    assert record["cpu_percent"] == 50.0
+    assert record["create_time"] == 1000.0
+    assert record["cpu_time_s"] == 50.0
+    assert record["rss_mb"] == 64.0 and record["vms_mb"] == 128.0
+
+
+def test_later_scans_use_cpu_time_deltas(procs):
+    procs.table[10] = {"name": "hog", "create_time": 1000.0, "cpu": 50.0}
+    registry = ProcessRegistry()
+    registry.scan()
+    procs.advance(10)
+    procs.table[10]["cpu"] = 52.5
+    (record,) = registry.scan()
+    assert record["cpu_percent"] == 25.0
+    assert len(registry) == 1
+
+
+@pytest.mark.parametrize("successor", [
+    {"name": "cron", "create_time": 1105.0, "cpu": 1.0},  # a different program
+    {"name": "hog", "create_time": 1105.0, "cpu": 1.0},   # same name, but its CPU time went backwards
+])
+def test_reused_pid_starts_a_new_process(procs, successor):
+    procs.table[10] = {"name": "hog", "create_time": 1000.0, "cpu": 50.0, "cmdline": ["hog", "--old"]}
+    registry = ProcessRegistry()
+    registry.scan()
+    procs.advance(10)
+    procs.table[10] = dict(successor, cmdline=["new"])
+    (record,) = registry.scan()
+    # Measured over the new process's own lifetime, not as a delta against the old one
+    assert record["cpu_percent"] == 20.0
+    assert record["create_time"] == 1105.0
+    assert record["name"] == successor["name"]
+    assert record["cmdline"] == "new"
+
+
+def test_zombies_exited_and_inaccessible_processes_are_skipped(procs, monkeypatch):
+    procs.table.update({
+        10: {"name": "alive", "create_time": 1000.0, "cpu": 1.0},
+        11: {"name": "zombie", "create_time": 1000.0, "cpu": 1.0},
+        12: {"name": "gone", "create_time": 1000.0, "cpu": 1.0},
+        13: {"name": "root-only", "create_time": 1000.0, "cpu": 1.0},
+    })
+    registry = ProcessRegistry()
+    assert len(registry.scan()) == 4
+
+    procs.advance(10)
+    procs.table[11]["status"] = psutil.STATUS_ZOMBIE
+    procs.table[13]["denied"] = True
+    # pid 12 exits between listing the pids and reading it
+    pids = sorted(procs.table)
+    del procs.table[12]
+    monkeypatch.setattr(process_registry.psutil, "pids", lambda: pids)
+    assert [r["pid"] for r in registry.scan()] == [10]
+    assert len(registry) == 1
+    assert registry.tree.children(1) == [10]
+
+
+def test_cmdline_is_read_once_and_truncated(procs):
+    procs.table[10] = {"name": "java", "create_time": 1000.0, "cpu": 1.0, "cmdline": ["java"] + ["-Dx=y"] * 100}
+    registry = ProcessRegistry()
+    registry.scan()
+    procs.advance(10)
+    (record,) = registry.scan()
+    assert len(record["cmdline"]) == CMDLINE_MAX_CHARS
+    assert procs.table[10]["cmdline_reads"] == 1
+
+
+def test_fd_counts_only_for_detail_pids_without_fast_counting(procs, monkeypatch):
+    monkeypatch.setattr(process_registry, "FAST_FD_COUNT", False)
+    procs.table.update({10: {"name": "a", "create_time": 1000.0, "cpu": 1.0},
+                        11: {"name": "b", "create_time": 1000.0, "cpu": 1.0}})
+    registry = ProcessRegistry()
+    registry.detail_pids = {11}
+    records = _by_pid(registry.scan())
+    assert "num_fds" not in records[10]
+    assert records[11]["num_fds"] == 7
+
+
+def test_concurrent_callers_share_a_finished_scan(procs):
+    procs.table[10] = {"name": "hog", "create_time": 1000.0, "cpu": 1.0}
+    registry = ProcessRegistry()
+    first = registry.scan()
+    # A scan that finished at or after the request is reused instead of rescanned
+    procs.table[10]["cpu"] = 2.0
+    assert registry.scan() is first
@@ -0,0 +1,90 @@
+import pytest
+
+from process_tree import MAX_CHILDREN_LISTED, ProcessTree
+
+
+def _proc(pid, ppid, name=None, create_time=1.0, rss_mb=10.0, cpu_percent=1.0):
+    return {"pid": pid, "ppid": ppid, "name": name or f"p{pid}", "create_time": create_time,
+            "cpu_percent": cpu_percent, "rss_mb": rss_mb, "num_threads": 1, "cpu_time_s": 0.5}
+
+
+@pytest.fixture
+def tree():
+    tree = ProcessTree()
+    # init -> shell -> (worker, worker2 -> helper)
+    assert tree.update([_proc(1, 0, "init"), _proc(10, 1, "shell"), _proc(11, 10, "worker"),
+                        _proc(12, 10, "worker2"), _proc(13, 12, "helper")]) == \
+        {"started": 5, "exited": 0, "reparented": 0}
+    return tree
+
+
+def test_diff_counts_started_exited_and_reparented(tree):
+    # worker2 exits; its helper is adopted by init; a new worker starts
+    diff = tree.update([_proc(1, 0, "init"), _proc(10, 1, "shell"), _proc(11, 10, "worker"),
+                        _proc(13, 1, "helper"), _proc(14, 10, "worker3")])
+    assert diff == {"started": 1, "exited": 1, "reparented": 1}
+    assert 12 not in tree and len(tree) == 5
+    assert tree.children(10) == [11, 14]
+    assert tree.children(1) == [10, 13]
+    assert tree.children(12) == []
+
+
+def test_unchanged_scan_is_an_empty_diff(tree):
+    records = [dict(tree.get(pid), cpu_percent=50.0) for pid in (1, 10, 11, 12, 13)]
+    assert tree.update(records) == {"started": 0, "exited": 0, "reparented": 0}
+    assert tree.get(11)["cpu_percent"] == 50.0  # the latest record is kept
+
+
+def test_reused_pid_is_a_new_process(tree):
+    diff = tree.update([_proc(1, 0, "init"), _proc(10, 1, "shell"), _proc(11, 1, "cron", create_time=2.0),
+                        _proc(12, 10, "worker2"), _proc(13, 12, "helper")])
+    assert diff == {"started": 1, "exited": 0, "reparented": 0}
+    assert tree.children(10) == [12]
+    assert tree.children(1) == [10, 11]
+    assert tree.get(11)["name"] == "cron"
+
+
+def test_ancestors_and_rollup(tree):
+    assert tree.ancestors(13) == [{"pid": 12, "name": "worker2"}, {"pid": 10, "name": "shell"},
+                                  {"pid": 1, "name": "init"}]
+    assert tree.rollup(10) == {"cpu_percent": 4.0, "rss_mb": 40.0, "num_threads": 4, "cpu_time_s": 2.0,
+                               "processes": 4}
+    assert tree.rollup(99) is None
+
+
+def test_subtree_view(tree):
+    view = tree.subtree(10, depth=1)
+    assert [c["pid"] for c in view["children"]] == [12, 11]  # larger subtree RSS first
+    assert view["children"][0]["omitted_children"] == 1
+    assert "children" not in view["children"][0]
+
+
+def test_subtree_caps_listed_children():
+    tree = ProcessTree()
+    tree.update([_proc(2, 1, "spawner")] + [_proc(100 + i, 2) for i in range(MAX_CHILDREN_LISTED + 5)])
+    view = tree.subtree(2)
+    assert len(view["children"]) == MAX_CHILDREN_LISTED
+    assert view["omitted_children"] == 5
+    assert view["subtree"]["processes"] == MAX_CHILDREN_LISTED + 6
+
+
+def test_top_parents_skips_init(tree):
+    assert tree.top_parents() == [{"pid": 10, "name": "shell", "children": 2},
+                                  {"pid": 12, "name": "worker2", "children": 1}]
+    assert tree.top_parents(limit=1, exclude=()) == [{"pid": 10, "name": "shell", "children": 2}]
+
+
+def test_self_parent_and_cycles_do_not_hang():
+    tree = ProcessTree()
+    # pid 0 is its own parent on macOS (kernel_task)
+    tree.update([_proc(0, 0, "kernel_task"), _proc(1, 0, "launchd"), _proc(5, 1)])
+    assert tree.children(0) == [1]
+    assert tree.rollup(0)["processes"] == 3
+    assert tree.subtree(0)["children"][0]["pid"] == 1
+
+    # A ppid cycle, e.g. pids reused between reading one and the other
+    tree.update([_proc(7, 8), _proc(8, 7)])
+    assert tree.rollup(7)["processes"] == 2
+    view = tree.subtree(7, depth=5)
+    assert view["children"][0]["pid"] == 8
+    assert "children" not in view["children"][0]
@@ -0,0 +1,62 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from query_server import QueryClient, QueryServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    release = threading.Event()
+    handlers = {
+        "echo": lambda args: args,
+        "slow": lambda args: time.sleep(args["s"]) or {"slept": args["s"]},
+        "hang": lambda args: release.wait(10) and {},
+        "fail": lambda args: 1 / 0,
+    }
+    path = tmp_path / "q.sock"
+    server = QueryServer(path, handlers)
+    server.start()
+    yield path
+    release.set()
+    server.stop()
+
+
+def test_round_trip_and_errors(server):
+    client = QueryClient(server)
+    assert client.query("echo", x=1) == {"x": 1}
+    with pytest.raises(RuntimeError, match="division"):
+        client.query("fail")
+    with pytest.raises(RuntimeError, match="Unknown op"):
+        client.query("nope")
+    # The connection survives failed requests
+    assert client.query("echo", y=2) == {"y": 2}
+
+
+def test_clients_per_thread_do_not_serialize(server):
+    results = []
+
+    def worker():
+        results.append(QueryClient(server).query("slow", s=0.5))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 4
+    assert time.monotonic() - started < 1.5
+
+
+def test_hung_query_is_bounded_by_timeout(server):
+    client = QueryClient(server, timeout_s=0.3)
+    started = time.monotonic()
+    with pytest.raises(socket.timeout):
+        client.query("hang")
+    # One timeout, no second attempt on a reconnect
+    assert time.monotonic() - started < 0.6
+    # The out-of-step connection was dropped; the next query starts clean
+    assert client.query("echo", z=3) == {"z": 3}
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+import daemon
+from rollups import MINUTE, QUARTER_HOUR, RAW, RollupStore
+from tsstore import TimeSeriesStore
+
+
+def _snapshot(ts, i):
+    return {"timestamp": ts, "hostname": "host", "cpu_percent": float(i % 7),
+            "memory": {"total_gb": 8.0, "available_gb": 2.0, "percent_used": 50.0 + i % 3},
+            "load_avg": [1.0, 0.5, 0.25]}
+
+
+@pytest.fixture
+def samples():
+    # 40 minutes at 10 s, ending now; crosses two 15-minute boundaries
+    now = time.time()
+    return [_snapshot(now - 2400 + 10 * i, i) for i in range(241)]
+
+
+@pytest.fixture
+def daemon_home(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "get_series_dir", lambda: tmp_path / "series")
+    monkeypatch.setattr(daemon, "get_rollups_file", lambda: tmp_path / "rollups.json")
+    monkeypatch.setattr(daemon, "SERIES_STORE", None)
+    monkeypatch.setattr(daemon, "ROLLUPS", None)
+    return tmp_path
+
+
+def _buckets(rollups):
+    return {name: list(tier.buckets) for name, tier in rollups.tiers.items()}
+
+
+def test_replay_after_restart_matches_uninterrupted_run(samples, daemon_home):
+    series = TimeSeriesStore(daemon_home / "series")
+    uninterrupted = RollupStore()
+    # The first run saves whenever a 15-minute bucket closes, then dies
+    first_run = RollupStore(daemon_home / "rollups.json")
+    for snapshot in samples:
+        series.append(snapshot)
+        uninterrupted.add(snapshot)
+        first_run.add(snapshot)
+    series.close()
+    assert (daemon_home / "rollups.json").exists()
+
+    restarted = daemon.load_rollups()
+    # Samples already in saved buckets are not counted twice; the rest are replayed
+    assert _buckets(restarted) == _buckets(uninterrupted)
+    assert len(restarted.raw) == len(samples)
+    start = samples[0]["timestamp"]
+    assert restarted.query("cpu_percent", start, resolution=MINUTE) == \
+        uninterrupted.query("cpu_percent", start, resolution=MINUTE)
+
+
+def test_replay_skips_samples_inside_saved_buckets(samples, tmp_path):
+    path = tmp_path / "rollups.json"
+    first_run = RollupStore(path)
+    for snapshot in samples:
+        first_run.add(snapshot)
+    first_run.save()
+
+    restarted = RollupStore(path)
+    restarted.load()
+    saved = _buckets(restarted)
+    for snapshot in samples:
+        restarted.add(snapshot)
+    # Replaying everything again leaves the closed buckets as they were
+    for name in saved:
+        assert _buckets(restarted)[name][:len(saved[name])] == saved[name]
+    assert all(b["n"] <= 6 for b in _buckets(restarted)[MINUTE])
+
+
+def test_replay_from_covers_the_raw_hour(tmp_path):
+    rollups = RollupStore(tmp_path / "rollups.json")
+    assert rollups.replay_from() <= time.time() - 3600
+
+
+def test_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / "rollups.json"
+    path.write_text("{not json")
+    rollups = RollupStore(path)
+    rollups.load()
+    assert _buckets(rollups) == {MINUTE: [], QUARTER_HOUR: []}
+
+
+def test_query_picks_finest_covering_resolution(samples):
+    rollups = RollupStore()
+    for snapshot in samples:
+        rollups.add(snapshot)
+    now = samples[-1]["timestamp"]
+    assert rollups.resolution_for(now - 600, now) == RAW
+    assert rollups.resolution_for(now - 7200, now) == MINUTE
+    assert rollups.resolution_for(now - 3 * 86400, now) == QUARTER_HOUR
+
+    minute = rollups.query("cpu_percent", now - 600, resolution=MINUTE)["points"]
+    assert all(p["min"] <= p["avg"] <= p["max"] for p in minute)
+    assert minute[-1]["t"] == now - now % 60  # the open bucket is included
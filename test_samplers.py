@@ -0,0 +1,137 @@
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+import samplers
+from samplers import BYTES_PER_GB, DiskIOSampler, NetIOSampler, SystemSampler
+
+_CpuTimes = namedtuple("scputimes", "user nice system idle iowait irq softirq steal guest guest_nice")
+_DiskIO = namedtuple("sdiskio", "read_count write_count read_bytes write_bytes read_time write_time busy_time")
+_DiskIONoBusy = namedtuple("sdiskio", "read_count write_count read_bytes write_bytes read_time write_time")
+_NetIO = namedtuple("snetio", "bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout")
+
+
+def _cpu(user=0.0, idle=0.0, iowait=0.0, steal=0.0, guest=0.0):
+    return _CpuTimes(user, 0.0, 0.0, idle, iowait, 0.0, 0.0, steal, guest, 0.0)
+
+
+def _disk(reads=0, writes=0, read_bytes=0, write_bytes=0, read_ms=0, write_ms=0, busy_ms=0):
+    return _DiskIO(reads, writes, read_bytes, write_bytes, read_ms, write_ms, busy_ms)
+
+
+def _nic(sent=0, recv=0, packets=0, errors=0, drops=0):
+    return _NetIO(sent, recv, packets, packets, errors, 0, drops, 0)
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    """Fake kernel counters and clock; set attributes on the returned object between samples."""
+    fake = SimpleNamespace(now=1010.0, cpus=[], disks={}, nics={})
+    monkeypatch.setattr(samplers, "time", SimpleNamespace(time=lambda: fake.now))
+    monkeypatch.setattr(samplers.psutil, "boot_time", lambda: 1000.0)
+    monkeypatch.setattr(samplers.psutil, "cpu_times", lambda percpu=False: fake.cpus)
+    monkeypatch.setattr(samplers.psutil, "virtual_memory",
+                        lambda: SimpleNamespace(total=8 * BYTES_PER_GB, available=2 * BYTES_PER_GB, percent=75.0))
+    monkeypatch.setattr(samplers.psutil, "disk_io_counters", lambda perdisk=False: fake.disks)
+    monkeypatch.setattr(samplers.psutil, "net_io_counters", lambda pernic=False: fake.nics)
+    # Only vda and vdb are whole disks in the fake sysfs
+    monkeypatch.setattr(samplers, "os", SimpleNamespace(path=SimpleNamespace(
+        isdir=lambda path: True, exists=lambda path: path in ("/sys/block/vda", "/sys/block/vdb"))))
+    return fake
+
+
+def test_system_first_call_reports_since_boot(counters):
+    # Guest time is already inside user, so it is left out of the total
+    counters.cpus = [_cpu(user=10, idle=80, iowait=5, steal=5, guest=100), _cpu(user=50, idle=50)]
+    sample = SystemSampler().sample()
+    assert sample["cpu_per_core"] == [15.0, 50.0]
+    assert sample["cpu_percent"] == 32.5
+    assert sample["cpu_iowait_percent"] == 2.5
+    assert sample["cpu_steal_percent"] == 2.5
+    assert sample["memory"] == {"total_gb": 8.0, "available_gb": 2.0, "percent_used": 75.0}
+
+
+def test_system_later_calls_report_the_delta(counters):
+    sampler = SystemSampler()
+    counters.cpus = [_cpu(user=10, idle=90), _cpu(user=50, idle=50)]
+    sampler.sample()
+    counters.cpus = [_cpu(user=30, idle=170), _cpu(user=50, idle=150)]
+    sample = sampler.sample()
+    assert sample["cpu_per_core"] == [20.0, 0.0]
+    assert sample["cpu_percent"] == 10.0
+
+
+def test_system_core_count_change_measures_since_boot(counters):
+    sampler = SystemSampler()
+    counters.cpus = [_cpu(user=10, idle=90)]
+    sampler.sample()
+    counters.cpus = [_cpu(user=20, idle=180), _cpu(user=60, idle=40)]  # a CPU came online
+    assert sampler.sample()["cpu_per_core"] == [10.0, 60.0]
+
+
+def test_disk_rates_await_and_utilization(counters):
+    counters.disks = {"vda": _disk(reads=40, writes=60, read_bytes=10240, write_bytes=2048,
+                                   read_ms=100, write_ms=400, busy_ms=2500)}
+    sample = DiskIOSampler().sample()  # 10 s since boot
+    assert sample["interval_s"] == 10.0
+    (disk,) = sample["disks"]
+    assert disk == {"disk": "vda", "read_bytes_per_s": 1024.0, "write_bytes_per_s": 204.8,
+                    "read_iops": 4.0, "write_iops": 6.0, "await_ms": 5.0, "util_percent": 25.0}
+    assert sample["total"] == {"read_bytes_per_s": 1024.0, "write_bytes_per_s": 204.8,
+                               "read_iops": 4.0, "write_iops": 6.0}
+
+
+def test_disk_partitions_loop_and_ram_devices_are_excluded(counters):
+    busy = _disk(reads=10, read_bytes=4096)
+    counters.disks = {"vda": busy, "vda1": busy, "loop0": busy, "ram0": busy}
+    sample = DiskIOSampler().sample()
+    assert [d["disk"] for d in sample["disks"]] == ["vda"]
+    assert sample["total"]["read_bytes_per_s"] == 409.6
+
+
+def test_disk_without_busy_time_or_requests(counters):
+    # Platforms other than Linux and FreeBSD report no busy_time
+    counters.disks = {"vda": _DiskIONoBusy(0, 0, 0, 0, 0, 0)}
+    (disk,) = DiskIOSampler().sample()["disks"]
+    assert disk["await_ms"] == 0.0
+    assert "util_percent" not in disk
+
+
+def test_disk_reset_or_new_device_starts_a_new_baseline(counters):
+    sampler = DiskIOSampler()
+    counters.disks = {"vda": _disk(reads=100, read_bytes=100_000)}
+    sampler.sample()
+
+    counters.now += 2
+    # vda's counters went backwards (driver reset); vdb was hot-plugged with traffic already on it
+    counters.disks = {"vda": _disk(reads=5, read_bytes=500), "vdb": _disk(reads=50, read_bytes=50_000)}
+    sample = sampler.sample()
+    assert sample["interval_s"] == 2.0
+    assert all(d["read_bytes_per_s"] == 0.0 and d["read_iops"] == 0.0 for d in sample["disks"])
+
+    counters.now += 2
+    counters.disks = {"vda": _disk(reads=9, read_bytes=900), "vdb": _disk(reads=60, read_bytes=54_000)}
+    rates = {d["disk"]: (d["read_iops"], d["read_bytes_per_s"]) for d in sampler.sample()["disks"]}
+    assert rates == {"vda": (2.0, 200.0), "vdb": (5.0, 2000.0)}
+
+
+def test_net_rates_errors_and_drops_skip_loopback(counters):
+    sampler = NetIOSampler()
+    counters.nics = {"lo": _nic(sent=10**9, recv=10**9), "eth0": _nic(sent=1000, recv=5000, packets=10)}
+    sampler.sample()
+
+    counters.now += 5
+    counters.nics = {"lo": _nic(sent=2 * 10**9, recv=2 * 10**9),
+                     "eth0": _nic(sent=2000, recv=10000, packets=60, errors=2, drops=1)}
+    sample = sampler.sample()
+    assert sample["nics"] == [{"nic": "eth0", "recv_bytes_per_s": 1000.0, "sent_bytes_per_s": 200.0,
+                               "recv_packets_per_s": 10.0, "sent_packets_per_s": 10.0, "errors": 2, "drops": 1}]
+    assert sample["total"] == {"recv_bytes_per_s": 1000.0, "sent_bytes_per_s": 200.0, "errors": 2, "drops": 1}
+
+
+def test_net_busiest_interfaces_first_up_to_top_n(counters):
+    counters.nics = {f"eth{i}": _nic(recv=1000 * i) for i in range(4)}
+    sample = NetIOSampler().sample(top_n=2)
+    assert [n["nic"] for n in sample["nics"]] == ["eth3", "eth2"]
+    assert sample["total"]["recv_bytes_per_s"] == 600.0  # totals still cover every interface
@@ -0,0 +1,93 @@
+import pytest
+
+import scheduler
+from scheduler import HIGH, LOW, AdaptiveScheduler
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler.time, "sleep", clock.sleep)
+    return clock
+
+
+def _sample(cpu=5.0, mem=40.0, load=0.0):
+    return {"cpu_percent": cpu, "memory": {"percent_used": mem}, "load_avg": [load, load, load]}
+
+
+def test_ticks_stay_on_the_grid(clock):
+    sched = AdaptiveScheduler(low_interval_s=10, clock=clock)
+    for work_s in (0.5, 3.0, 9.9):
+        clock.now += work_s  # time spent sampling does not push the next tick back
+        sched.wait()
+    assert clock.now == 1030.0
+    assert clock.slept == [9.5, 7.0, pytest.approx(0.1)]
+
+
+def test_missed_ticks_are_skipped_not_burst(clock):
+    sched = AdaptiveScheduler(low_interval_s=10, clock=clock)
+    clock.now += 35.0  # a stall across three ticks
+    sched.wait()
+    # Next tick is the first grid point still ahead, not 1010, 1020, 1030 back to back
+    assert clock.now == 1040.0
+    assert clock.slept == [5.0]
+
+
+@pytest.mark.parametrize("sample", [
+    _sample(cpu=90.0),
+    _sample(mem=95.0),
+    _sample(load=10_000.0),
+])
+def test_threshold_switches_to_high_rate(clock, sample):
+    sched = AdaptiveScheduler(low_interval_s=10, high_interval_s=2, clock=clock)
+    sched.observe(_sample())
+    assert (sched.mode, sched.interval_s) == (LOW, 10)
+    sched.observe(sample)
+    assert (sched.mode, sched.interval_s) == (HIGH, 2)
+
+
+def test_sudden_jump_switches_to_high_rate(clock):
+    sched = AdaptiveScheduler(clock=clock)
+    sched.observe(_sample(cpu=5.0))
+    sched.observe(_sample(cpu=40.0))  # under the CPU threshold, but a 35-point jump
+    assert sched.mode == HIGH
+
+
+def test_error_samples_are_ignored(clock):
+    sched = AdaptiveScheduler(clock=clock)
+    sched.observe({"error": "boom", "cpu_percent": 100.0})
+    assert sched.mode == LOW
+
+
+def test_cooldown_after_last_trigger(clock):
+    sched = AdaptiveScheduler(cooldown_s=60, clock=clock)
+    sched.observe(_sample(cpu=90.0))
+    clock.now += 30
+    sched.observe(_sample(cpu=80.0))  # still hot: the cool-down restarts here
+    clock.now += 59
+    sched.observe(_sample(cpu=60.0))
+    assert sched.mode == HIGH  # quiet for 59 s only
+    clock.now += 1
+    sched.observe(_sample(cpu=60.0))
+    assert sched.mode == LOW
+
+
+def test_high_rate_grid_after_switch(clock):
+    sched = AdaptiveScheduler(low_interval_s=10, high_interval_s=2, clock=clock)
+    sched.observe(_sample(cpu=90.0))
+    sched.wait()
+    sched.wait()
+    assert clock.now == 1004.0
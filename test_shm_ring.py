@@ -0,0 +1,105 @@
+import pytest
+
+from shm_ring import _HEADER, _SEQ, SLOT_SIZE, RingReader, RingWriter
+
+
+def _snapshot(i, **extra):
+    snapshot = {"timestamp": 1000.0 + i, "hostname": "host", "cpu_percent": float(i),
+                "memory": {"total_gb": 8.0, "available_gb": 4.0, "percent_used": 50.0},
+                "load_avg": [0.5, 0.25, 0.125], "num_processes": 100 + i,
+                "top_cpu_processes": [{"pid": i, "name": f"p{i}", "cpu_percent": 1.5}],
+                "top_mem_processes": [], "disk_usage": {"usage": []}}
+    snapshot.update(extra)
+    return snapshot
+
+
+@pytest.fixture
+def ring(tmp_path):
+    path = tmp_path / "ring"
+    writer = RingWriter(path, slots=4)
+    reader = RingReader(path)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def _slot_offset(reader, n):
+    return _HEADER.size + (n % reader.slots) * SLOT_SIZE
+
+
+def test_round_trip(ring):
+    writer, reader = ring
+    assert len(reader) == 0 and reader.latest() is None
+    writer.append(_snapshot(1, collected_at={"processes": 999.5}))
+    latest = reader.latest()
+    assert latest["timestamp"] == 1001.0
+    assert latest["cpu_percent"] == 1.0
+    assert latest["top_cpu_processes"] == [{"pid": 1, "name": "p1", "cpu_percent": 1.5}]
+    assert latest["collected_at"] == {"processes": 999.5}
+
+
+def test_error_record_keeps_only_error(ring):
+    writer, reader = ring
+    writer.append({"timestamp": 5.0, "hostname": "host", "error": "boom"})
+    assert reader.latest() == {"timestamp": 5.0, "hostname": "host", "error": "boom"}
+
+
+def test_wraps_keeping_newest_slots(ring):
+    writer, reader = ring
+    for i in range(10):
+        writer.append(_snapshot(i))
+    assert reader.written() == 10
+    assert len(reader) == 4
+    assert [s["timestamp"] for s in reader] == [1006.0, 1007.0, 1008.0, 1009.0]
+    assert [s["timestamp"] for s in reader.last(2)] == [1008.0, 1009.0]
+    assert reader[-1]["timestamp"] == 1009.0
+    with pytest.raises(IndexError):
+        reader[4]
+
+
+def test_record_being_written_is_not_returned(ring):
+    writer, reader = ring
+    writer.append(_snapshot(0))
+    # Odd sequence number: the writer is part way through record 0
+    _SEQ.pack_into(writer._map, _slot_offset(reader, 0), 1)
+    assert reader._read(0) is None
+    with pytest.raises(IndexError):
+        reader[0]
+
+
+def test_lapped_record_is_not_returned(ring):
+    writer, reader = ring
+    writer.append(_snapshot(0))
+    # The slot now holds record 4 (same slot, one lap later)
+    _SEQ.pack_into(writer._map, _slot_offset(reader, 0), 2 * 4 + 2)
+    assert reader._read(0) is None
+    assert reader[:] == []
+
+
+def test_writer_resumes_after_restart(tmp_path):
+    path = tmp_path / "ring"
+    writer = RingWriter(path, slots=4)
+    for i in range(3):
+        writer.append(_snapshot(i))
+    writer.close()
+
+    writer = RingWriter(path, slots=4)
+    writer.append(_snapshot(3))
+    reader = RingReader(path)
+    assert [s["timestamp"] for s in reader] == [1000.0, 1001.0, 1002.0, 1003.0]
+    reader.close()
+    writer.close()
+
+    # A different slot count is a new layout and starts empty
+    writer = RingWriter(path, slots=8)
+    reader = RingReader(path)
+    assert len(reader) == 0
+    reader.close()
+    writer.close()
+
+
+def test_reader_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-ring"
+    path.write_bytes(bytes(64))
+    with pytest.raises(ValueError):
+        RingReader(path)
@@ -0,0 +1,82 @@
+import pytest
+
+from tool_cache import ToolCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(clock):
+    return ToolCache(clock=clock)
+
+
+def procs(n):
+    return [{"pid": i, "name": f"p{i}", "cpu_percent": 100 - i} for i in range(n)]
+
+
+def test_exact_hit_until_ttl(cache, clock):
+    cache.put("get_top_cpu_processes", {"n": 5}, {"top_cpu_processes": procs(5), "num_processes": 300})
+    assert cache.get("get_top_cpu_processes", {"n": 5})["num_processes"] == 300
+    clock.now += 5.1
+    assert cache.get("get_top_cpu_processes", {"n": 5}) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_uncached_tools_and_errors_are_skipped(cache):
+    cache.put("run_shell", {}, {"out": "x"})
+    cache.put("get_top_cpu_processes", {"n": 5}, {"error": "boom"})
+    assert len(cache) == 0
+
+
+def test_derives_shorter_ranking_from_deeper_one(cache):
+    cache.put("get_top_cpu_processes", {"n": 20}, {"top_cpu_processes": procs(20), "num_processes": 300})
+    derived = cache.get("get_top_cpu_processes", {"n": 3})
+    assert [p["pid"] for p in derived["top_cpu_processes"]] == [0, 1, 2]
+    assert derived["num_processes"] == 300
+    # Deeper than what is cached: a miss
+    assert cache.get("get_top_cpu_processes", {"n": 25}) is None
+
+
+def test_derives_from_cached_snapshot(cache, clock):
+    snapshot = {"top_cpu_processes": procs(10), "top_mem_processes": [], "num_processes": 42,
+                "disk_usage": {"usage": [{"location": "/", "percent_used": 50}]}}
+    cache.put("get_current_snapshot", {}, snapshot)
+    assert len(cache.get("get_top_cpu_processes", {})["top_cpu_processes"]) == 10
+    assert cache.get("check_disk_usage", {"top_n": 1}) == {"usage": snapshot["disk_usage"]["usage"]}
+    # Explicit paths are never derived
+    assert cache.get("check_disk_usage", {"paths": ["/"]}) is None
+    # The derived result expires with the tool's own TTL
+    clock.now += 5.1
+    assert cache.get("get_top_cpu_processes", {"n": 3}) is None
+
+
+@pytest.mark.parametrize("n", [None, "ten", "", 2.5, -1, True, float("inf"), [3]])
+def test_bad_size_is_a_miss(cache, n):
+    cache.put("get_top_cpu_processes", {"n": 20}, {"top_cpu_processes": procs(20), "num_processes": 300})
+    assert cache.get("get_top_cpu_processes", {"n": n}) is None
+
+
+def test_numeric_string_size_is_coerced(cache):
+    cache.put("get_top_cpu_processes", {"n": 20}, {"top_cpu_processes": procs(20), "num_processes": 300})
+    assert len(cache.get("get_top_cpu_processes", {"n": "4"})["top_cpu_processes"]) == 4
+
+
+def test_lru_eviction(clock):
+    cache = ToolCache(max_entries=2, clock=clock)
+    for pid in (1, 2):
+        cache.put("get_process_info", {"pid": pid}, {"pid": pid})
+    cache.get("get_process_info", {"pid": 1})
+    cache.put("get_process_info", {"pid": 3}, {"pid": 3})
+    assert cache.get("get_process_info", {"pid": 2}) is None
+    assert cache.get("get_process_info", {"pid": 1}) == {"pid": 1}
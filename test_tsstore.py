@@ -0,0 +1,110 @@
+from tsstore import ERROR_TEXT, TimeSeriesStore
+
+
+def _snapshot(ts, **extra):
+    snapshot = {"timestamp": ts, "hostname": "host", "cpu_percent": 12.5,
+                "memory": {"total_gb": 8.0, "available_gb": 2.0, "percent_used": 75.0},
+                "load_avg": [1.0, 0.5, 0.25], "num_processes": 42,
+                "top_cpu_processes": [{"pid": 7, "name": "python", "cpu_percent": 9.5}],
+                "top_mem_processes": [{"pid": 7, "name": "python", "rss_mb": 64.0, "vms_mb": 128.0}],
+                "disk_usage": {"usage": [{"location": "/", "device": "/dev/sda1", "fstype": "ext4",
+                                          "total_gb": 100.0, "free_gb": 40.0, "percent_used": 60.0}]}}
+    snapshot.update(extra)
+    return snapshot
+
+
+def _segments(directory):
+    return sorted(directory.glob("seg-*.dat"))
+
+
+def test_round_trip(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    store.append(_snapshot(1000.0))
+    store.close()
+    (record,) = TimeSeriesStore(tmp_path).last(5)
+    assert record["timestamp"] == 1000.0
+    assert record["hostname"] == "host"
+    assert record["cpu_percent"] == 12.5
+    assert record["top_mem_processes"] == [{"pid": 7, "name": "python", "rss_mb": 64.0, "vms_mb": 128.0}]
+    assert record["disk_usage"]["usage"][0]["location"] == "/"
+    assert record["partial"] is True
+
+
+def test_only_collected_tiers_come_back(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    fast = _snapshot(1000.0)
+    for key in ("num_processes", "top_cpu_processes", "top_mem_processes", "disk_usage"):
+        del fast[key]
+    store.append(fast)
+    store.close()
+    (record,) = TimeSeriesStore(tmp_path).last(1)
+    assert record["cpu_percent"] == 12.5
+    assert "num_processes" not in record and "top_cpu_processes" not in record
+    assert "disk_usage" not in record
+
+
+def test_error_records_do_not_intern_the_message(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    store.append({"timestamp": 1000.0, "hostname": "host", "error": "permission denied at 0x7f3a"})
+    store.close()
+    (record,) = TimeSeriesStore(tmp_path).last(1)
+    assert record == {"timestamp": 1000.0, "hostname": "host", "error": ERROR_TEXT}
+    assert "0x7f3a" not in (tmp_path / "strings.txt").read_text()
+
+
+def test_torn_tail_is_dropped_on_resume(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    for i in range(3):
+        store.append(_snapshot(1000.0 + i))
+    store.close()
+    (segment,) = _segments(tmp_path)
+    with open(segment, "ab") as f:
+        f.write(b"\x01" * 17)  # the writer died part way through a record
+
+    # Readers skip the incomplete record
+    assert [r["timestamp"] for r in TimeSeriesStore(tmp_path).last(10)] == [1000.0, 1001.0, 1002.0]
+
+    # The next writer truncates it, so later records stay aligned
+    store = TimeSeriesStore(tmp_path)
+    store.append(_snapshot(1003.0))
+    store.close()
+    assert [r["timestamp"] for r in TimeSeriesStore(tmp_path).last(10)] == [1000.0, 1001.0, 1002.0, 1003.0]
+
+
+def test_range_across_segments(tmp_path):
+    store = TimeSeriesStore(tmp_path, segment_max_age_s=10)
+    for i in range(35):
+        store.append(_snapshot(1000.0 + i))
+    store.close()
+    assert len(_segments(tmp_path)) == 4
+
+    reader = TimeSeriesStore(tmp_path)
+    assert [r["timestamp"] for r in reader.range(1008.0, 1012.0)] == [1008.0, 1009.0, 1010.0, 1011.0, 1012.0]
+    assert [r["timestamp"] for r in reader.range(1031.5)] == [1032.0, 1033.0, 1034.0]
+    assert reader.range(2000.0) == []
+    assert [r["timestamp"] for r in reader.last(3)] == [1032.0, 1033.0, 1034.0]
+    assert len(reader.last(100)) == 35
+
+
+def test_old_segments_are_dropped_past_retention(tmp_path):
+    store = TimeSeriesStore(tmp_path, segment_max_age_s=10, retention_s=15)
+    for i in range(40):
+        store.append(_snapshot(1000.0 + i))
+    store.close()
+    remaining = TimeSeriesStore(tmp_path).range(0)
+    assert remaining[0]["timestamp"] >= 1010.0
+    assert remaining[-1]["timestamp"] == 1039.0
+
+
+def test_string_table_counts_toward_the_size_budget(tmp_path):
+    store = TimeSeriesStore(tmp_path, segment_max_age_s=10, max_total_bytes=30_000)
+    for i in range(40):
+        # Distinct long names early on: about 20 KB of strings, more than the segments hold
+        names = [f"{'x' * 200}-{i}-{j}" for j in range(10)] if i < 10 else ["python"]
+        store.append(_snapshot(1000.0 + i, top_cpu_processes=[{"pid": 1, "name": n, "cpu_percent": 1.0}
+                                                               for n in names]))
+    store.close()
+    segments = sum(p.stat().st_size for p in _segments(tmp_path))
+    assert segments < 30_000  # the records alone would fit
+    assert segments + (tmp_path / "strings.txt").stat().st_size <= 30_000 + 10 * 460  # within one open segment
+    assert TimeSeriesStore(tmp_path).range(0)[0]["timestamp"] > 1000.0
@@ -0,0 +1,145 @@
+"""
+Short-lived cache of LLM tool results.
+
+Models often ask for a snapshot, then top CPU, then top memory within a
+second or two. Results are cached per (tool, arguments) for a per-tool TTL,
+with least-recently-used eviction past MAX_ENTRIES. A ranking request is
+also answered from any fresh cached result that already holds it: top-5 CPU
+from a cached top-20, or from the top-10 lists inside a cached snapshot.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+MAX_ENTRIES = 64
+
+# Seconds a result stays usable; tools not listed are never cached
+TOOL_TTLS_S = {
+    "get_current_snapshot": 5.0,
+    "get_top_cpu_processes": 5.0,
+    "get_top_memory_processes": 5.0,
+    "check_disk_usage": 30.0,
+    "get_disk_io": 5.0,
+    "get_network_io": 5.0,
+    "get_network_connections": 10.0,
+    "get_process_info": 5.0,
+    "get_process_tree": 5.0,
+    "get_open_files": 5.0,
+    "get_snapshot_history": 5.0,
+    "analyze_trends": 15.0,
+    "find_process_history": 5.0,
+}
+
+# Ranking tools: tool -> (size argument, its default, list key, count key)
+RANKED_TOOLS = {
+    "get_top_cpu_processes": ("n", 10, "top_cpu_processes", "num_processes"),
+    "get_top_memory_processes": ("n", 10, "top_mem_processes", "total_processes"),
+    "check_disk_usage": ("top_n", 5, "usage", None),
+}
+
+# Where each ranking sits inside a get_current_snapshot result
+SNAPSHOT_LISTS: Dict[str, Callable[[Dict[str, Any]], Tuple[Optional[list], Optional[int]]]] = {
+    "get_top_cpu_processes": lambda s: (s.get("top_cpu_processes"), s.get("num_processes")),
+    "get_top_memory_processes": lambda s: (s.get("top_mem_processes"), s.get("num_processes")),
+    "check_disk_usage": lambda s: ((s.get("disk_usage") or {}).get("usage"), None),
+}
+
+
+def _size(value: Any) -> Optional[int]:
+    """A ranking size argument as a non-negative int; None if it is not one (e.g. null or "ten")."""
+    if isinstance(value, bool):
+        return None
+    try:
+        size = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return size if size >= 0 and size == float(value) else None
+
+
+class ToolCache:
+    """LRU of tool results with per-tool TTLs; safe to share between tool threads."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttls_s: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttls_s = TOOL_TTLS_S if ttls_s is None else ttls_s
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any], Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(arguments, sort_keys=True)
+
+    def _fresh(self, tool_name: str, stored_at: float, now: float) -> bool:
+        return now - stored_at <= self.ttls_s.get(tool_name, 0)
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """A fresh result for this call, exact or derived; None on a miss."""
+        if tool_name not in self.ttls_s:
+            return None
+        now = self._clock()
+        with self._lock:
+            key = self._key(tool_name, arguments)
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(tool_name, entry[0], now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            result = self._derive(tool_name, arguments, now)
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return result
+
+    def _derive(self, tool_name: str, arguments: Dict[str, Any], now: float) -> Optional[Dict[str, Any]]:
+        """Slice a ranking out of a deeper cached ranking or a cached snapshot."""
+        if tool_name not in RANKED_TOOLS or set(arguments) - {RANKED_TOOLS[tool_name][0]}:
+            return None  # e.g. disk usage for explicit paths
+        size_arg, default, list_key, count_key = RANKED_TOOLS[tool_name]
+        n = _size(arguments.get(size_arg, default))
+        if n is None:
+            return None  # the tool itself reports the bad argument
+        ttl_s = self.ttls_s[tool_name]
+        for (name, _), (stored_at, args, result) in reversed(self._entries.items()):
+            if now - stored_at > ttl_s:
+                continue
+            if name == tool_name and not set(args) - {size_arg} and (_size(args.get(size_arg, default)) or 0) >= n:
+                items, count = result.get(list_key), result.get(count_key) if count_key else None
+            elif name == "get_current_snapshot":
+                items, count = SNAPSHOT_LISTS[tool_name](result)
+                if items is None or len(items) < n:
+                    continue
+            else:
+                continue
+            if items is None:
+                continue
+            derived = {list_key: items[:n]}
+            if count_key:
+                derived[count_key] = count
+            return derived
+        return None
+
+    def put(self, tool_name: str, arguments: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Remember a result; errors and uncacheable tools are skipped."""
+        if tool_name not in self.ttls_s or not isinstance(result, dict) or "error" in result:
+            return
+        with self._lock:
+            key = self._key(tool_name, arguments)
+            self._entries[key] = (self._clock(), dict(arguments), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,381 @@
+"""
+Append-only binary time-series store for daemon snapshots.
+
+Layout under the store directory:
+- seg-<first_ts>.dat: segment header followed by fixed-width records, one per sample
+- strings.txt: string table (process names, mounts, hostnames), one JSON string per line
+- index.json: first/last timestamp and record count per segment
+
+Appending a sample is a single write to the active segment. Reading the last N
+samples or a time range seeks straight to the records it needs; timestamps
+within a segment are ascending, so a range start is a binary search by offset.
+Segments roll on size or age, and old segments are dropped on roll once they
+fall outside the retention window or total size budget. The string table
+is never pruned (ids are line numbers), so it counts toward that budget.
+
+Records hold the headline system fields, the top process lists and the
+fullest mounts, not everything a live snapshot carries (per-core CPU, I/O
+rates, connections, sampling mode); snapshots read back are marked
+"partial". An error record keeps only the fact that the sample failed: error
+text is free-form, and interning it would grow the string table without bound.
+"""
+
+import json
+import logging
+import math
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b'SDTS'
+VERSION = 1
+
+# Fixed slots per record; snapshots carry at most this many entries per list
+TOP_N = 10
+DISK_N = 5
+
+# timestamp, hostname, error, cpu, iowait, steal, mem total/avail/percent,
+# load 1/5/15, process count, entries used in each of the three lists,
+# section flags. The error field is 1 for a failed sample, else 0.
+_HEAD = struct.Struct('<dIIfffffffffIBBBB')
+_CPU_SLOT = struct.Struct('<IIf')        # name, pid, cpu_percent
+_MEM_SLOT = struct.Struct('<IIff')       # name, pid, rss_mb, vms_mb
+_DISK_SLOT = struct.Struct('<IIIfff')    # location, device, fstype, total_gb, free_gb, percent_used
+_SEGMENT_HEADER = struct.Struct('<4sHH')  # magic, version, record size
+
+# Section flags: the process and disk sections are stored, and read back,
+# only when the snapshot has them, so a sample without them does not read
+# back as one with empty lists
+PROCESSES_SECTION = 0x01
+DISKS_SECTION = 0x02
+
+# What a failed sample reads back as; the daemon log has the details
+ERROR_TEXT = "sample not collected"
+
+RECORD_SIZE = _HEAD.size + TOP_N * _CPU_SLOT.size + TOP_N * _MEM_SLOT.size + DISK_N * _DISK_SLOT.size
+_NAN = float('nan')
+
+
+def _num(value: Any) -> float:
+    return _NAN if value is None else float(value)
+
+
+def _val(value: float, digits: int = 3) -> Optional[float]:
+    return None if math.isnan(value) else round(value, digits)
+
+
+class TimeSeriesStore:
+    """Segmented store of fixed-width snapshot records plus a string table."""
+
+    def __init__(self, directory: Path,
+                 segment_max_bytes: int = 8 * 1024 * 1024,
+                 segment_max_age_s: float = 6 * 3600,
+                 retention_s: float = 30 * 24 * 3600,
+                 max_total_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age_s = segment_max_age_s
+        self.retention_s = retention_s
+        self.max_total_bytes = max_total_bytes
+
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._strings_offset = 0
+        self._index: List[Dict[str, Any]] = []
+        self._index_mtime: Optional[float] = None
+        self._active = None  # append handle, writer side only
+
+    # -- files -----------------------------------------------------------
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    def _refresh(self) -> None:
+        """Pick up strings and segments written since the last call."""
+        strings_file = self._path("strings.txt")
+        if strings_file.exists():
+            with open(strings_file, "rb") as f:
+                f.seek(self._strings_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # writer is mid-line; pick it up next time
+                    self._strings_offset += len(line)
+                    value = json.loads(line)
+                    self._strings.append(value)
+                    self._string_ids.setdefault(value, len(self._strings))
+
+        index_file = self._path("index.json")
+        try:
+            mtime = index_file.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._index_mtime:
+            try:
+                with open(index_file, "r") as f:
+                    self._index = json.load(f)
+                self._index_mtime = mtime
+            except (json.JSONDecodeError, IOError):
+                pass
+
+    def _save_index(self) -> None:
+        tmp = self._path("index.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._path("index.json"))
+        self._index_mtime = self._path("index.json").stat().st_mtime
+
+    def _intern(self, value: Optional[str]) -> int:
+        """String table id for value (0 means None)."""
+        if value is None:
+            return 0
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            # Written before any record that references it, so readers never
+            # see an id they cannot resolve
+            with open(self._path("strings.txt"), "ab") as f:
+                line = (json.dumps(value) + "\n").encode()
+                f.write(line)
+            self._strings_offset += len(line)
+            self._strings.append(value)
+            string_id = len(self._strings)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _lookup(self, string_id: int) -> Optional[str]:
+        if string_id == 0:
+            return None
+        if string_id > len(self._strings):
+            self._refresh()
+        return self._strings[string_id - 1] if string_id <= len(self._strings) else None
+
+    def _record_count(self, segment: Dict[str, Any]) -> int:
+        try:
+            size = self._path(segment["name"]).stat().st_size
+        except FileNotFoundError:
+            return 0
+        # A partially written trailing record is ignored until complete
+        return max(size - _SEGMENT_HEADER.size, 0) // RECORD_SIZE
+
+    # -- writer ----------------------------------------------------------
+
+    def _open_segment(self, first_ts: float) -> None:
+        name = f"seg-{first_ts:.3f}.dat"
+        self._active = open(self._path(name), "ab")
+        if self._active.tell() == 0:
+            self._active.write(_SEGMENT_HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+        self._index.append({"name": name, "first_ts": first_ts, "last_ts": None, "records": None})
+        self._save_index()
+
+    def _resume_segment(self) -> None:
+        """Reopen the newest segment for appending, dropping any torn tail."""
+        segment = self._index[-1]
+        path = self._path(segment["name"])
+        records = self._record_count(segment)
+        if path.exists():
+            with open(path, "r+b") as f:
+                f.truncate(_SEGMENT_HEADER.size + records * RECORD_SIZE)
+        self._active = open(path, "ab")
+
+    def _roll(self, timestamp: float) -> None:
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+            segment = self._index[-1]
+            segment["records"] = self._record_count(segment)
+            last = self._read_records(segment, segment["records"] - 1, 1)
+            segment["last_ts"] = last[0][0] if last else segment["first_ts"]
+        self._compact(timestamp)
+        self._open_segment(timestamp)
+
+    def _compact(self, now: float) -> None:
+        """Drop sealed segments past retention or beyond the total size budget (string table included)."""
+        sealed = [s for s in self._index if s["last_ts"] is not None]
+        total = sum(self._path(s["name"]).stat().st_size for s in sealed if self._path(s["name"]).exists())
+        strings_file = self._path("strings.txt")
+        if strings_file.exists():
+            total += strings_file.stat().st_size
+        dropped = []
+        for segment in sealed:
+            if segment["last_ts"] >= now - self.retention_s and total <= self.max_total_bytes:
+                break
+            path = self._path(segment["name"])
+            if path.exists():
+                total -= path.stat().st_size
+                path.unlink()
+            dropped.append(segment["name"])
+        if dropped:
+            self._index = [s for s in self._index if s["name"] not in dropped]
+            logging.debug(f"TimeSeriesStore: compacted {len(dropped)} segments")
+
+    def append(self, snapshot: Dict[str, Any]) -> None:
+        """Append one snapshot as a fixed-width record."""
+        timestamp = snapshot.get("timestamp") or time.time()
+        if self._active is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._refresh()
+            if self._index and self._index[-1]["last_ts"] is None:
+                self._resume_segment()
+        if self._active is None:
+            self._open_segment(timestamp)
+        else:
+            segment = self._index[-1]
+            if (self._active.tell() >= self.segment_max_bytes
+                    or timestamp - segment["first_ts"] >= self.segment_max_age_s):
+                self._roll(timestamp)
+
+        self._active.write(self._pack(snapshot, timestamp))
+        self._active.flush()
+
+    def close(self) -> None:
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+
+    def _pack(self, snapshot: Dict[str, Any], timestamp: float) -> bytes:
+        memory = snapshot.get("memory") or {}
+        load_avg = list(snapshot.get("load_avg") or ())[:3]
+        load_avg += [None] * (3 - len(load_avg))
+        cpu_procs = (snapshot.get("top_cpu_processes") or [])[:TOP_N]
+        mem_procs = (snapshot.get("top_mem_processes") or [])[:TOP_N]
+        disks = ((snapshot.get("disk_usage") or {}).get("usage") or [])[:DISK_N]
+
+        parts = [_HEAD.pack(
+            timestamp,
+            self._intern(snapshot.get("hostname")),
+            1 if snapshot.get("error") else 0,
+            _num(snapshot.get("cpu_percent")),
+            _num(snapshot.get("cpu_iowait_percent")),
+            _num(snapshot.get("cpu_steal_percent")),
+            _num(memory.get("total_gb")),
+            _num(memory.get("available_gb")),
+            _num(memory.get("percent_used")),
+            *(_num(v) for v in load_avg),
+            snapshot.get("num_processes") or 0,
+            len(cpu_procs), len(mem_procs), len(disks),
+            (PROCESSES_SECTION if "num_processes" in snapshot else 0)
+            | (DISKS_SECTION if "disk_usage" in snapshot else 0)
+        )]
+        for i in range(TOP_N):
+            p = cpu_procs[i] if i < len(cpu_procs) else {}
+            parts.append(_CPU_SLOT.pack(self._intern(p.get("name")), p.get("pid", 0), _num(p.get("cpu_percent"))))
+        for i in range(TOP_N):
+            p = mem_procs[i] if i < len(mem_procs) else {}
+            parts.append(_MEM_SLOT.pack(self._intern(p.get("name")), p.get("pid", 0),
+                                        _num(p.get("rss_mb")), _num(p.get("vms_mb"))))
+        for i in range(DISK_N):
+            d = disks[i] if i < len(disks) else {}
+            parts.append(_DISK_SLOT.pack(self._intern(d.get("location")), self._intern(d.get("device")),
+                                         self._intern(d.get("fstype")), _num(d.get("total_gb")),
+                                         _num(d.get("free_gb")), _num(d.get("percent_used"))))
+        return b"".join(parts)
+
+    # -- reader ----------------------------------------------------------
+
+    def _read_records(self, segment: Dict[str, Any], start: int, count: int) -> List[Tuple]:
+        """Raw head tuples plus payload for records [start, start + count)."""
+        if count <= 0 or start < 0:
+            return []
+        with open(self._path(segment["name"]), "rb") as f:
+            f.seek(_SEGMENT_HEADER.size + start * RECORD_SIZE)
+            data = f.read(count * RECORD_SIZE)
+        return [(_HEAD.unpack_from(data, off)[0], data[off:off + RECORD_SIZE])
+                for off in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE)]
+
+    def _timestamp_at(self, f, i: int) -> float:
+        f.seek(_SEGMENT_HEADER.size + i * RECORD_SIZE)
+        return struct.unpack('<d', f.read(8))[0]
+
+    def _lower_bound(self, segment: Dict[str, Any], count: int, ts: float) -> int:
+        """First record index with timestamp >= ts, by binary search on disk."""
+        lo, hi = 0, count
+        with open(self._path(segment["name"]), "rb") as f:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._timestamp_at(f, mid) < ts:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        return lo
+
+    def _unpack(self, record: bytes) -> Dict[str, Any]:
+        head = _HEAD.unpack_from(record, 0)
+        (timestamp, host_id, failed, cpu, iowait, steal, mem_total, mem_avail, mem_pct,
+         load1, load5, load15, num_processes, n_cpu, n_mem, n_disk, sections) = head
+        snapshot = {"timestamp": timestamp, "hostname": self._lookup(host_id)}
+        if failed:
+            snapshot["error"] = ERROR_TEXT
+            return snapshot
+
+        offset = _HEAD.size
+        cpu_procs = []
+        for i in range(TOP_N):
+            name_id, pid, cpu_percent = _CPU_SLOT.unpack_from(record, offset + i * _CPU_SLOT.size)
+            if i < n_cpu:
+                cpu_procs.append({"pid": pid, "name": self._lookup(name_id), "cpu_percent": _val(cpu_percent, 1)})
+        offset += TOP_N * _CPU_SLOT.size
+        mem_procs = []
+        for i in range(TOP_N):
+            name_id, pid, rss, vms = _MEM_SLOT.unpack_from(record, offset + i * _MEM_SLOT.size)
+            if i < n_mem:
+                mem_procs.append({"pid": pid, "name": self._lookup(name_id), "rss_mb": _val(rss), "vms_mb": _val(vms)})
+        offset += TOP_N * _MEM_SLOT.size
+        disks = []
+        for i in range(n_disk):
+            loc, dev, fstype, total, free, pct = _DISK_SLOT.unpack_from(record, offset + i * _DISK_SLOT.size)
+            disks.append({"location": self._lookup(loc), "type": "mount" if dev else "path",
+                          "device": self._lookup(dev), "fstype": self._lookup(fstype),
+                          "total_gb": _val(total), "free_gb": _val(free), "percent_used": _val(pct, 1)})
+
+        snapshot.update({
+            "cpu_percent": _val(cpu, 1),
+            "cpu_iowait_percent": _val(iowait, 1),
+            "cpu_steal_percent": _val(steal, 1),
+            "memory": {"total_gb": _val(mem_total), "available_gb": _val(mem_avail), "percent_used": _val(mem_pct, 1)},
+            "load_avg": [_val(load1, 2), _val(load5, 2), _val(load15, 2)],
+            "num_processes": num_processes,
+            "top_cpu_processes": cpu_procs,
+            "top_mem_processes": mem_procs,
+            "disk_usage": {"usage": disks},
+            "partial": True,
+        })
+        if not sections & PROCESSES_SECTION:
+            for key in ("num_processes", "top_cpu_processes", "top_mem_processes"):
+                del snapshot[key]
+        if not sections & DISKS_SECTION:
+            del snapshot["disk_usage"]
+        return snapshot
+
+    def last(self, n: int) -> List[Dict[str, Any]]:
+        """Most recent n snapshots, oldest first."""
+        self._refresh()
+        records: List[bytes] = []
+        for segment in reversed(self._index):
+            if len(records) >= n:
+                break
+            count = self._record_count(segment)
+            take = min(n - len(records), count)
+            records[:0] = [raw for _, raw in self._read_records(segment, count - take, take)]
+        return [self._unpack(raw) for raw in records]
+
+    def iter_range(self, start_ts: float, end_ts: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Snapshots with start_ts <= timestamp <= end_ts, oldest first."""
+        self._refresh()
+        end_ts = math.inf if end_ts is None else end_ts
+        for i, segment in enumerate(self._index):
+            next_first = self._index[i + 1]["first_ts"] if i + 1 < len(self._index) else math.inf
+            if next_first < start_ts or segment["first_ts"] > end_ts:
+                continue
+            count = self._record_count(segment)
+            pos = self._lower_bound(segment, count, start_ts)
+            while pos < count:
+                batch = self._read_records(segment, pos, min(256, count - pos))
+                for timestamp, raw in batch:
+                    if timestamp > end_ts:
+                        return
+                    yield self._unpack(raw)
+                pos += len(batch)
+
+    def range(self, start_ts: float, end_ts: Optional[float] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_range(start_ts, end_ts))